@@ -1,63 +1,52 @@
 # app/api/V1/routers/router_document.py
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, BackgroundTasks
+import asyncio
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
 from typing import Annotated
 
-# Importar los puertos y adaptadores necesarios
-from app.core.domain.ports.storage_port import StoragePort
-from app.core.domain.ports.vector_port import VectorPort
-from app.core.domain.ports.embedding_port import EmbeddingPort
-from app.core.domain.ports.chunking_port import ChunkingPort
-from app.core.domain.ports.client_repository_port import ClientRepositoryPort as SaveInfoClientPort
-# los adaptadores
-from app.infrastructure.adapters.minio_storage_adapter import MinioStorageAdapter
-from app.infrastructure.adapters.qdrant_adapter import QdrantVectorAdapter
-from app.infrastructure.adapters.openai_embedding_adapter import OpenAIEmbeddingAdapter
-from app.infrastructure.adapters.langchain_chunking_adapter import LangChainChunkingAdapter
-from app.infrastructure.adapters.postgres_saveinfo_adapter import PostgresSaveInfoClientAdapter
 # El servicio de procesamiento
-from app.application.process_document_service import ProcessingDocumentService
+from app.application.process_document_service import ProcessingDocumentService, REINDEX_DIFF, REINDEX_MODES
 from app.application.storage_service import StorageService
+from app.application.ingestion_jobs import IngestionJobService
+from app.core.domain.ports.ingestion_job_port import JOB_QUEUED
+from app.application.collection_layout import ingest_collection
+# Contenedor con los adaptadores de vida larga (lifespan)
+from app.main.container import AppContainer, get_container
 
 router = APIRouter(prefix="/document", tags=["documents"])
 
-def get_storage_port() -> StoragePort:
-    try:
-        return MinioStorageAdapter()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Storage init error: {e}")
+def get_storage_service(container: AppContainer = Depends(get_container)) -> StorageService:
+    if container.storage_service is None:
+        raise HTTPException(status_code=500, detail="Storage init error: servicio no inicializado")
+    return container.storage_service
 
-def get_storage_service(storage_port: StoragePort = Depends(get_storage_port)) -> StorageService:
-    return StorageService(storage_port)
-def get_process_document_service(
-    storage_port: StoragePort = Depends(get_storage_port),
-    chunking_port: ChunkingPort = Depends(lambda: LangChainChunkingAdapter()),
-    embedding_port: EmbeddingPort = Depends(lambda: OpenAIEmbeddingAdapter()),
-    vector_port: VectorPort = Depends(lambda: QdrantVectorAdapter()),
-    save_info_port: SaveInfoClientPort = Depends(lambda: PostgresSaveInfoClientAdapter()),
-) -> ProcessingDocumentService:
-    return ProcessingDocumentService(
-        storage_port=storage_port,
-        chunking_port=chunking_port,
-        embeddingPort=embedding_port,
-        vector_port=vector_port,
-        save_info=save_info_port,
-        batch_size=128,
-    )
+def get_process_document_service(container: AppContainer = Depends(get_container)) -> ProcessingDocumentService:
+    if container.document_service is None:
+        raise HTTPException(status_code=500, detail="Init error: servicio no inicializado")
+    return container.document_service
+
+def get_ingestion_service(container: AppContainer = Depends(get_container)) -> IngestionJobService:
+    if container.ingestion_service is None:
+        raise HTTPException(status_code=500, detail="Init error: servicio no inicializado")
+    return container.ingestion_service
 
 @router.post("/upload", summary="Subir documento y/o actualizar prompt del agente")
 async def upload_document(
-    background_tasks: BackgroundTasks,
     client_id: Annotated[str, Form()],                 # requerido
     agent_id: Annotated[str, Form()],                  # requerido
     token_auth: Annotated[str, Form()],                # requerido
     file: Annotated[UploadFile | None, File()] = None, # opcional (UploadFile para .read() y .filename)
     file_name: Annotated[str | None, Form()] = None,   # opcional
     prompt: Annotated[str | None, Form()] = None,      # opcional
+    doc_id: Annotated[str | None, Form()] = None,      # opcional: por defecto el nombre del archivo
+    reindex: Annotated[str, Form()] = REINDEX_DIFF,    # diff | full (si el documento ya estaba indexado)
     storage_svc: StorageService = Depends(get_storage_service),
     proc_svc: ProcessingDocumentService = Depends(get_process_document_service),
+    jobs: IngestionJobService = Depends(get_ingestion_service),
 ):
     if not file and not (prompt and prompt.strip()):
         raise HTTPException(status_code=400, detail="Debe enviar un archivo o un prompt (o ambos).")
+    if reindex not in REINDEX_MODES:
+        raise HTTPException(status_code=400, detail=f"reindex debe ser uno de {', '.join(REINDEX_MODES)}")
 
     object_key = None
     if file is not None:
@@ -74,17 +63,65 @@ async def upload_document(
         else:
             file = None  # equivale a no enviar archivo
 
-    collection = f"client_{client_id}"
-    doc_id = object_key or ""
+    collection = ingest_collection(client_id)
+    # Identidad estable del documento: volver a subir el mismo archivo re-indexa (diff) en lugar de
+    # duplicar; el object_key no sirve porque cambia en cada subida
+    doc_id = (doc_id or file_name or (file.filename if file else None) or object_key or "").strip()
+
+    if object_key is None:
+        # Solo prompt: un upsert barato, se hace en el momento (no espera detrás de ingestas en cola)
+        await asyncio.to_thread(
+            proc_svc.process_and_store_vector_document,
+            client_id=client_id,
+            agent_id=agent_id,
+            prompt=prompt,
+        )
+        return {"message": "Prompt actualizado", "object_key": None, "job_id": None}
 
-    background_tasks.add_task(
-        proc_svc.process_and_store_vector_document,
+    # Documento: trabajo durable en la cola de ingesta; el estado se consulta en /document/jobs/{job_id}
+    job = await jobs.submit(
+        client_id,
+        agent_id,
         object_key=object_key,
         file_name=(file_name or (file.filename if file else None)),
-        client_id=client_id,
-        agent_id=agent_id,
         collection=collection,
         doc_id=doc_id,
+        reindex=reindex,
         prompt=prompt,
     )
-    return {"message": "Tarea encolada", "object_key": object_key}
\ No newline at end of file
+    return {"message": "Tarea encolada", "object_key": object_key, "doc_id": doc_id, "job_id": job.id}
+
+
+@router.delete("", summary="Borrar del índice todos los chunks de un documento")
+async def delete_document(
+    client_id: str,
+    agent_id: str,
+    doc_id: str,
+    proc_svc: ProcessingDocumentService = Depends(get_process_document_service),
+):
+    deleted = await asyncio.to_thread(
+        proc_svc.delete_document, client_id=client_id, agent_id=agent_id, doc_id=doc_id
+    )
+    return {"doc_id": doc_id, "deleted_chunks": deleted}
+
+
+@router.get("/jobs/{job_id}", summary="Estado de un trabajo de ingesta")
+async def get_job(job_id: str, jobs: IngestionJobService = Depends(get_ingestion_service)):
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "client_id": job.client_id,
+        "agent_id": job.agent_id,
+        "object_key": job.payload.get("object_key"),
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "last_error": job.last_error,
+        "result": job.result,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "next_attempt_at": job.run_after if job.status == JOB_QUEUED else None,
+    }
\ No newline at end of file
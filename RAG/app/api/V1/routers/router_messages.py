@@ -1,12 +1,13 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+from typing import AsyncIterator, List, Optional
+import json
 import logging
+import os
 
-from app.application.procces_query_service import ProcessQueryService
-from app.infrastructure.adapters.llm_adapter import OpenAILLMAdapter
-from app.infrastructure.adapters.openai_embedding_adapter import OpenAIEmbeddingAdapter
-from app.infrastructure.adapters.qdrant_adapter import QdrantVectorAdapter
-from app.infrastructure.adapters.postgres_saveinfo_adapter import PostgresSaveInfoClientAdapter
+from app.application.procces_query_service import ProcessQueryService, BatchQuery
+from app.main.container import AppContainer, get_container
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/message", tags=["messages"])
@@ -24,21 +25,35 @@ class RunResponse(BaseModel):
     answer: str
 
 
-def get_process_query_service() -> ProcessQueryService:
-    try:
-        llm = OpenAILLMAdapter()
-        embed = OpenAIEmbeddingAdapter()
-        vector = QdrantVectorAdapter()
-        repo = PostgresSaveInfoClientAdapter()
-        return ProcessQueryService(response_llm=llm, embedding_port=embed, vector_port=vector, saveinfo_port=repo)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Init error: {e}")
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+
+
+class BatchRequest(BaseModel):
+    items: List[RunRequest] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+    concurrency: Optional[int] = Field(None, ge=1, le=64, description="Llamadas simultáneas al LLM")
+
+
+class BatchItemResponse(BaseModel):
+    answer: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResponse]
+
+
+def get_process_query_service(container: AppContainer = Depends(get_container)) -> ProcessQueryService:
+    # El servicio (y su caché de prompts) se comparte entre requests
+    if container.query_service is None:
+        raise HTTPException(status_code=500, detail="Init error: servicio no inicializado")
+    return container.query_service
 
 
 @router.post("/response", response_model=RunResponse, summary="Process a user message with RAG and per-agent prompt")
 async def process_message(req: RunRequest, svc: ProcessQueryService = Depends(get_process_query_service)):
     try:
-        answer = svc.process_query(
+        answer = await svc.process_query(
             query=req.message,
             client_id=req.client_id,
             agent_id=req.agent_id,
@@ -48,4 +63,48 @@ async def process_message(req: RunRequest, svc: ProcessQueryService = Depends(ge
         return RunResponse(answer=answer)
     except Exception as e:
         logger.exception("process_message failed")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/batch", response_model=BatchResponse, summary="Process N messages (any sessions/agents) in one request")
+async def process_batch(req: BatchRequest, svc: ProcessQueryService = Depends(get_process_query_service)):
+    # Los errores por mensaje van en su resultado; solo un fallo global devuelve 500
+    try:
+        results = await svc.process_batch(
+            [BatchQuery(query=it.message, client_id=it.client_id, agent_id=it.agent_id, client_cel=it.cel_id) for it in req.items],
+            concurrency=req.concurrency or BATCH_LLM_CONCURRENCY,
+        )
+        return BatchResponse(results=[BatchItemResponse(answer=r.answer, error=r.error) for r in results])
+    except Exception as e:
+        logger.exception("process_batch failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _sse(data: dict, event: str | None = None) -> str:
+    # JSON por evento: los saltos de línea del token no rompen el framing SSE
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/stream", summary="Same as /response but streams tokens as Server-Sent Events")
+async def stream_message(req: RunRequest, svc: ProcessQueryService = Depends(get_process_query_service)):
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for token in svc.stream_query(
+                query=req.message,
+                client_id=req.client_id,
+                agent_id=req.agent_id,
+                client_cel=req.cel_id,
+                timpestap=req.timestamp,
+            ):
+                yield _sse({"token": token})
+            yield _sse({}, event="done")
+        except Exception as e:
+            logger.exception("stream_message failed")
+            yield _sse({"detail": str(e)}, event="error")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,67 @@
+# app/application/chunk_embedding_cache.py
+import hashlib
+import logging
+import unicodedata
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core import metrics
+from app.core.domain.ports.embedding_store_port import EmbeddingStorePort
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(text: str) -> str:
+    # A diferencia de la caché de consultas no se pasa a minúsculas: en un documento el caso
+    # forma parte del contenido que se embebe
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def chunk_key(fingerprint: str, dimensions: Optional[int], text: str) -> str:
+    # fingerprint: EmbeddingPort.document_fingerprint() (modelo + preparación de la entrada)
+    return hashlib.sha256(f"{fingerprint}\x00{dimensions or 0}\x00{_normalize(text)}".encode("utf-8")).hexdigest()
+
+
+class ChunkEmbeddingCache:
+    """
+    Caché de embeddings de chunks direccionada por contenido: al volver a subir un documento con
+    pocos cambios solo se embeben los chunks nuevos o editados. Un fallo del almacén no corta la
+    ingesta; esos chunks se embeben como si no estuvieran en caché.
+    """
+
+    def __init__(self, store: EmbeddingStorePort) -> None:
+        self._store = store
+
+    def resolve(
+        self,
+        texts: List[str],
+        fingerprint: str,
+        dimensions: Optional[int],
+        embed: Callable[[List[int]], List[List[float]]],
+    ) -> Tuple[List[List[float]], int]:
+        """
+        Vectores de `texts` en orden y cuántos salieron de la caché. `embed` recibe los índices de los
+        textos que faltan (sin repetir contenido) y devuelve sus vectores.
+        """
+        keys = [chunk_key(fingerprint, dimensions, t) for t in texts]
+        try:
+            found = self._store.get_many(list(dict.fromkeys(keys)))
+        except Exception as e:
+            logger.warning("chunk embedding cache read failed: %s", e)
+            found = {}
+
+        missing: Dict[str, int] = {}
+        for i, key in enumerate(keys):
+            if key not in found and key not in missing:
+                missing[key] = i
+        if missing:
+            vectors = embed(list(missing.values()))
+            fresh = {key: list(vec) for key, vec in zip(missing, vectors)}
+            try:
+                self._store.put_many(fresh)
+            except Exception as e:
+                logger.warning("chunk embedding cache write failed: %s", e)
+            found.update(fresh)
+
+        hits = len(keys) - len(missing)
+        metrics.count_cache("chunk_embedding", hits=hits, misses=len(missing))
+        return [found[k] for k in keys], hits
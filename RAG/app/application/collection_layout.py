@@ -0,0 +1,150 @@
+# app/application/collection_layout.py
+"""
+Dónde viven los vectores de cada cliente en Qdrant.
+
+- per_client (legado): una colección `client_{client_id}` por cliente, sin filtro por agente.
+- shared: una única colección multi-tenant; el aislamiento se hace con filtros sobre
+  `client_id` / `agent_id`, que tienen índices de payload.
+
+Además, cada colección tiene un perfil de almacenamiento (StorageProfile): dimensiones pedidas
+al modelo, cuantización y vectores originales en disco. Se configura con
+QDRANT_STORAGE_PROFILE (por defecto para todas) y QDRANT_COLLECTION_PROFILES
+("client_acme=compact,rag_chunks=binary,client_*=compact:512"; patrones tipo glob, gana el primero).
+Un perfil puede llevar dimensiones explícitas con "nombre:dims" y backend de embeddings con
+"nombre@backend" (p. ej. "client_demo*=full@onnx"); sin backend se usa EMBEDDING_BACKEND
+(por defecto "openai"). Consulta e ingesta de una colección usan siempre el mismo backend.
+"""
+import fnmatch
+import math
+import os
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.domain.models import StorageProfile
+
+PER_CLIENT_MODE = "per_client"
+SHARED_MODE = "shared"
+
+
+def storage_mode() -> str:
+    mode = os.getenv("QDRANT_STORAGE_MODE", PER_CLIENT_MODE).strip().lower()
+    return SHARED_MODE if mode == SHARED_MODE else PER_CLIENT_MODE
+
+
+def shared_collection_name() -> str:
+    return os.getenv("QDRANT_SHARED_COLLECTION", "rag_chunks")
+
+
+def legacy_collection_name(client_id: str) -> str:
+    return f"client_{client_id}"
+
+
+def ingest_collection(client_id: str) -> str:
+    """Colección destino al indexar un documento de `client_id`."""
+    if storage_mode() == SHARED_MODE:
+        return shared_collection_name()
+    return legacy_collection_name(client_id)
+
+
+def search_targets(client_id: str, agent_id: str) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+    """Pares (colección, filtro) a consultar, en orden de preferencia."""
+    if storage_mode() == SHARED_MODE:
+        return [(shared_collection_name(), {"client_id": client_id, "agent_id": agent_id})]
+    return [
+        (legacy_collection_name(client_id), None),
+        (legacy_collection_name(agent_id), None),   # fallback si se indexó por agent_id por error
+    ]
+
+
+# ---------------- Perfiles de almacenamiento ----------------
+STORAGE_PROFILES: Dict[str, StorageProfile] = {
+    # float32 completo en RAM (comportamiento original)
+    "full": StorageProfile(name="full"),
+    # 1024 dims + int8 en RAM (~12x menos que 3072 float32); originales en disco para reordenar
+    "compact": StorageProfile(name="compact", dimensions=1024, quantization="scalar", on_disk=True, oversampling=2.0),
+    # 1 bit por dimensión en RAM (~32x menos); necesita más sobremuestreo para recuperar recall
+    "binary": StorageProfile(name="binary", quantization="binary", on_disk=True, oversampling=3.0),
+}
+
+
+EMBEDDING_BACKENDS = ("openai", "onnx", "hashing")
+
+
+def default_embedder() -> str:
+    return os.getenv("EMBEDDING_BACKEND", "openai").strip().lower()
+
+
+def parse_profile(spec: str) -> StorageProfile:
+    """'compact', 'compact:512' o 'compact:512@onnx' -> StorageProfile.
+    ValueError si el perfil o el backend no existen."""
+    spec, _, embedder = spec.strip().lower().partition("@")
+    name, _, dims = spec.partition(":")
+    base = STORAGE_PROFILES.get(name)
+    if base is None:
+        raise ValueError(f"Perfil de almacenamiento desconocido: '{name}' (válidos: {', '.join(STORAGE_PROFILES)})")
+    embedder = embedder or default_embedder()
+    if embedder not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Backend de embeddings desconocido: '{embedder}' (válidos: {', '.join(EMBEDDING_BACKENDS)})")
+    return replace(
+        base,
+        name=f"{name}:{int(dims)}" if dims else name,
+        dimensions=int(dims) if dims else base.dimensions,
+        embedder=embedder,
+    )
+
+
+def configured_embedders() -> List[str]:
+    """Backends que aparecen en la configuración (para construir solo esos al arrancar)."""
+    specs = [os.getenv("QDRANT_STORAGE_PROFILE", "full")] + [spec for _, spec in _collection_overrides()]
+    return sorted({parse_profile(spec).embedder for spec in specs})
+
+
+def _collection_overrides() -> List[Tuple[str, str]]:
+    raw = os.getenv("QDRANT_COLLECTION_PROFILES", "")
+    pairs = []
+    for item in raw.split(","):
+        pattern, sep, spec = item.partition("=")
+        if sep and pattern.strip() and spec.strip():
+            pairs.append((pattern.strip(), spec.strip()))
+    return pairs
+
+
+def storage_profile(collection: str) -> StorageProfile:
+    """Perfil con el que se crea / consulta `collection`."""
+    for pattern, spec in _collection_overrides():
+        if fnmatch.fnmatchcase(collection, pattern):
+            return parse_profile(spec)
+    return parse_profile(os.getenv("QDRANT_STORAGE_PROFILE", "full"))
+
+
+def query_dimensions(collections: Sequence[str], embedder: Optional[str] = None) -> Optional[int]:
+    """Dimensiones con las que embeber una consulta que se buscará en `collections` (solo las de
+    `embedder`, si se indica): None (nativas) si alguna las usa, si no la mayor; fit_vector
+    recorta para las demás."""
+    profiles = [storage_profile(c) for c in collections]
+    dims = [p.dimensions for p in profiles if embedder is None or p.embedder == embedder]
+    if not dims or any(d is None for d in dims):
+        return None
+    return max(dims)
+
+
+# Backends con embeddings Matryoshka: los primeros n componentes (renormalizados) son el embedding
+# de n dimensiones. Los de onnx/hashing no: hay que pedirlos al modelo con esas dimensiones.
+MATRYOSHKA_EMBEDDERS = ("openai",)
+
+
+def can_fit_vector(vector: List[float], dimensions: Optional[int], embedder: str) -> bool:
+    """Si `fit_vector` puede llevar `vector` a `dimensions` sin volver a embeber."""
+    return not dimensions or len(vector) <= dimensions or embedder in MATRYOSHKA_EMBEDDERS
+
+
+def fit_vector(vector: List[float], dimensions: Optional[int], embedder: str = "openai") -> List[float]:
+    """Recorta un embedding Matryoshka a `dimensions` y lo vuelve a normalizar (L2).
+    Es lo mismo que hace la API con el parámetro `dimensions`. ValueError si el backend no es Matryoshka."""
+    if not dimensions or len(vector) <= dimensions:
+        return vector
+    if embedder not in MATRYOSHKA_EMBEDDERS:
+        raise ValueError(f"Los vectores de '{embedder}' no se pueden recortar a {dimensions} dimensiones: hay que re-indexar")
+    head = vector[:dimensions]
+    norm = math.sqrt(sum(x * x for x in head))
+    return [x / norm for x in head] if norm else head
@@ -0,0 +1,125 @@
+# app/application/context_packer.py
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from app.application.token_counter import count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+_TEXT_KEYS = ("text", "content", "page_content", "text_preview")
+
+
+def _text_of(payload: Dict[str, Any]) -> str:
+    for k in _TEXT_KEYS:
+        if payload.get(k):
+            return str(payload[k])
+    return ""
+
+
+def _chunk_index(payload: Dict[str, Any]) -> Optional[int]:
+    try:
+        return int(payload.get("chunk_index"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ContextPacker:
+    """
+    Prepara el contexto que se envía al LLM:
+      1. agrupa los matches por documento y une los chunks contiguos (por `chunk_index`),
+         quitando el solape que el splitter repite al inicio de cada chunk;
+      2. ordena los bloques por su mejor score;
+      3. añade bloques hasta agotar el presupuesto de tokens (el último se recorta).
+    Devuelve matches con la misma forma ({"id","score","payload"}) que entiende el adaptador LLM.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 3000,
+        model: Optional[str] = None,
+        max_overlap_chars: int = 400,
+        min_overlap_chars: int = 16,
+        min_tail_tokens: int = 64,
+    ) -> None:
+        self.token_budget = token_budget
+        self._model = model
+        self._max_overlap = max_overlap_chars
+        self._min_overlap = min_overlap_chars
+        self._min_tail = min_tail_tokens
+
+    def _merge_text(self, prev: str, nxt: str) -> str:
+        # Mayor sufijo de `prev` que es prefijo de `nxt`
+        limit = min(len(prev), len(nxt), self._max_overlap)
+        for k in range(limit, self._min_overlap - 1, -1):
+            if prev.endswith(nxt[:k]):
+                return prev + nxt[k:]
+        return prev + "\n" + nxt
+
+    def _blocks(self, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        by_doc: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        loose: List[Dict[str, Any]] = []
+        for m in matches:
+            if not isinstance(m, dict):
+                continue
+            payload = m.get("payload") or {}
+            doc = payload.get("doc_id") or payload.get("source")
+            if doc and _chunk_index(payload) is not None and _text_of(payload):
+                by_doc[str(doc)].append(m)
+            elif _text_of(payload):
+                loose.append(m)
+
+        blocks: List[Dict[str, Any]] = []
+        for doc, items in by_doc.items():
+            items.sort(key=lambda m: _chunk_index(m["payload"]))
+            run: List[Dict[str, Any]] = []
+            for m in items:
+                idx = _chunk_index(m["payload"])
+                if run and idx == _chunk_index(run[-1]["payload"]):
+                    continue  # mismo chunk repetido
+                if run and idx != _chunk_index(run[-1]["payload"]) + 1:
+                    blocks.append(self._block_from_run(run))
+                    run = []
+                run.append(m)
+            if run:
+                blocks.append(self._block_from_run(run))
+
+        for m in loose:
+            blocks.append(self._block_from_run([m]))
+        blocks.sort(key=lambda b: b["score"], reverse=True)
+        return blocks
+
+    def _block_from_run(self, run: List[Dict[str, Any]]) -> Dict[str, Any]:
+        text = _text_of(run[0]["payload"])
+        for m in run[1:]:
+            text = self._merge_text(text, _text_of(m["payload"]))
+        first = run[0]["payload"]
+        payload = {k: v for k, v in first.items() if k not in _TEXT_KEYS and k != "has_more"}
+        payload["text"] = text
+        if len(run) > 1:
+            payload["chunk_indexes"] = [str(_chunk_index(m["payload"])) for m in run]
+        return {
+            "id": ",".join(str(m.get("id", "")) for m in run),
+            "score": max(float(m.get("score") or 0.0) for m in run),
+            "payload": payload,
+        }
+
+    def pack(self, matches: List[Dict[str, Any]], token_budget: Optional[int] = None) -> List[Dict[str, Any]]:
+        budget = token_budget if token_budget is not None else self.token_budget
+        packed: List[Dict[str, Any]] = []
+        used = 0
+        for block in self._blocks(matches or []):
+            text = block["payload"]["text"]
+            n = count_tokens(text, self._model)
+            if used + n <= budget:
+                packed.append(block)
+                used += n
+                continue
+            remaining = budget - used
+            if remaining >= self._min_tail:
+                block["payload"]["text"] = truncate_tokens(text, remaining, self._model)
+                packed.append(block)
+                used += remaining
+            break
+        logger.debug("packed blocks=%s from matches=%s tokens~%s budget=%s", len(packed), len(matches or []), used, budget)
+        return packed
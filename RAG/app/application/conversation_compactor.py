@@ -0,0 +1,97 @@
+# app/application/conversation_compactor.py
+import logging
+import os
+from typing import Dict, List, Optional, Set
+
+from app.application.token_counter import count_tokens
+from app.core.domain.ports.chat_memory_port import ChatMemoryPort
+from app.core.domain.ports.llm_port import LLMPort
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationCompactor:
+    """
+    Historial compacto para el LLM: resumen acumulado de los turnos viejos + los turnos recientes
+    literales dentro de un presupuesto de tokens.
+
+    El resumen se guarda en la memoria junto a la sesión con el número de mensajes que cubre,
+    así se calcula una sola vez: `fold` (en segundo plano, tras responder) solo integra los
+    mensajes que aún no están resumidos, dejando fuera los `keep_recent` más nuevos.
+
+    `fold` lee mensajes y total juntos (`get_range`), y el resumen se guarda solo si nadie lo cambió
+    mientras se generaba (`replace_summary`): dos procesos que resumen la misma sesión no se pisan.
+    """
+
+    def __init__(
+        self,
+        llm: LLMPort,
+        memory: ChatMemoryPort,
+        token_budget: int = 1500,
+        keep_recent: int = 6,
+        min_fold: int = 6,
+        model: Optional[str] = None,
+    ) -> None:
+        self._llm = llm
+        self._memory = memory
+        self._budget = token_budget
+        self._keep_recent = keep_recent
+        self._min_fold = min_fold
+        self._model = model
+        self._folding: Set[str] = set()
+
+    @classmethod
+    def from_env(cls, llm: LLMPort, memory: ChatMemoryPort, model: Optional[str] = None) -> "ConversationCompactor":
+        return cls(
+            llm,
+            memory,
+            token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "1500")),
+            keep_recent=int(os.getenv("HISTORY_KEEP_RECENT", "6")),
+            min_fold=int(os.getenv("HISTORY_MIN_FOLD", "6")),
+            model=model,
+        )
+
+    async def history(self, session_id: str, limit: int) -> List[Dict[str, str]]:
+        # resumen, total y turnos recientes en una sola lectura: está en la ruta de cada turno
+        summary, recent = await self._memory.aget_history(session_id, limit)
+
+        used = count_tokens(summary or "", self._model)
+        kept: List[Dict[str, str]] = []
+        for m in reversed(recent):
+            n = count_tokens(m.get("content") or "", self._model)
+            if kept and used + n > self._budget:
+                break
+            kept.append(m)
+            used += n
+        kept.reverse()
+
+        out: List[Dict[str, str]] = []
+        if summary:
+            out.append({"role": "system", "content": f"Resumen de la conversación anterior:\n{summary}"})
+        out.extend(kept)
+        return out
+
+    async def fold(self, session_id: str) -> None:
+        """Integra en el resumen los mensajes no resumidos salvo los `keep_recent` más nuevos."""
+        if session_id in self._folding:
+            return
+        self._folding.add(session_id)
+        try:
+            summary, covered = await self._memory.aget_summary(session_id)
+            msgs, total = await self._memory.aget_range(session_id, covered)
+            if total - covered - self._keep_recent < self._min_fold:
+                return
+            # msgs ocupa las posiciones [total - len(msgs), total): lo resumido acaba en total - keep_recent
+            to_fold = msgs[: max(0, len(msgs) - self._keep_recent)]
+            if not to_fold:
+                return
+            folded_to = total - (len(msgs) - len(to_fold))
+            new_summary = await self._llm.asummarize(summary, to_fold)
+            if not await self._memory.areplace_summary(session_id, new_summary, folded_to, covered):
+                logger.debug("fold superseded sid=%s", session_id)
+                return
+            logger.debug("folded sid=%s msgs=%s covered=%s", session_id, len(to_fold), folded_to)
+        except Exception as e:
+            logger.exception("fold failed sid=%s: %s", session_id, e)
+        finally:
+            self._folding.discard(session_id)
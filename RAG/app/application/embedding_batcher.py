@@ -0,0 +1,130 @@
+# app/application/embedding_batcher.py
+import logging
+import os
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from app.application.token_counter import count_tokens
+from app.core import metrics
+from app.core.domain.ports.embedding_port import EmbeddingPort
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Fragmentos con los que la API de embeddings rechaza una petición demasiado grande
+# (OpenAI: "maximum context length", "max 300000 tokens per request", "too many inputs")
+_TOO_LARGE_HINTS = ("token", "too large", "too many", "maximum", "max ")
+
+
+def _is_too_large(e: Exception) -> bool:
+    status = getattr(e, "status_code", None)
+    if status not in (400, 413):
+        return False
+    message = str(e).lower()
+    return any(hint in message for hint in _TOO_LARGE_HINTS)
+
+
+class EmbeddingStats:
+    """Acumulado de una ingesta (las peticiones pueden correr en varios hilos del pipeline)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens = 0
+        self.splits = 0
+        self.seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def record(self, tokens: int, seconds: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.tokens += tokens
+            self.seconds += seconds
+
+    def split(self) -> None:
+        with self._lock:
+            self.splits += 1
+
+    def cache(self, hits: int, misses: int) -> None:
+        with self._lock:
+            self.cache_hits += hits
+            self.cache_misses += misses
+
+    def cache_hit_ratio(self) -> float:
+        total = self.cache_hits + self.cache_misses
+        return self.cache_hits / total if total else 0.0
+
+    def tokens_per_request(self) -> float:
+        return self.tokens / self.requests if self.requests else 0.0
+
+
+class EmbeddingBatcher:
+    """
+    Arma los lotes de embedding por tokens y no por número de chunks: se llena cada petición hasta
+    `max_tokens` (contados con el tokenizer del modelo) o `max_items` textos, lo que llegue antes.
+    Chunks cortos viajan en pocas peticiones grandes y los largos no superan el límite por petición
+    de la API.
+
+    Si aun así la API rechaza un lote por tamaño (el conteo local es aproximado sin tiktoken),
+    se parte en dos y se reintenta cada mitad; un único texto rechazado propaga el error.
+    """
+
+    def __init__(self, max_tokens: int = 50_000, max_items: int = 512) -> None:
+        self._max_tokens = max(1, max_tokens)
+        self._max_items = max(1, max_items)
+
+    @classmethod
+    def from_env(cls, max_items: int = 512) -> "EmbeddingBatcher":
+        return cls(
+            max_tokens=int(os.getenv("INGEST_EMBED_MAX_TOKENS", "50000")),
+            max_items=int(os.getenv("INGEST_EMBED_MAX_ITEMS", str(max_items))),
+        )
+
+    def pack(
+        self, items: Iterable[T], text: Callable[[T], str], model: Optional[str] = None
+    ) -> Iterator[Tuple[List[T], List[int]]]:
+        """Agrupa `items` en orden; devuelve cada lote con los tokens de cada texto."""
+        batch: List[T] = []
+        tokens: List[int] = []
+        total = 0
+        for item in items:
+            n = count_tokens(text(item), model)
+            if batch and (total + n > self._max_tokens or len(batch) >= self._max_items):
+                yield batch, tokens
+                batch, tokens, total = [], [], 0
+            batch.append(item); tokens.append(n)
+            total += n
+        if batch:
+            yield batch, tokens
+
+    def embed(
+        self,
+        embedding: EmbeddingPort,
+        texts: List[str],
+        tokens: List[int],
+        dimensions: Optional[int] = None,
+        stats: Optional[EmbeddingStats] = None,
+    ) -> List[List[float]]:
+        t0 = time.perf_counter()
+        try:
+            with metrics.stage("ingest_embed"):
+                vectors = embedding.create_embeddings(texts, dimensions=dimensions)
+        except Exception as e:
+            if len(texts) < 2 or not _is_too_large(e):
+                raise
+            mid = len(texts) // 2
+            logger.warning("embedding batch rejected as too large (texts=%s tokens=%s); splitting: %s", len(texts), sum(tokens), e)
+            metrics.count_embedding_split()
+            if stats is not None:
+                stats.split()
+            return (
+                self.embed(embedding, texts[:mid], tokens[:mid], dimensions, stats)
+                + self.embed(embedding, texts[mid:], tokens[mid:], dimensions, stats)
+            )
+        metrics.observe_embedding_request(sum(tokens))
+        if stats is not None:
+            stats.record(sum(tokens), time.perf_counter() - t0)
+        return vectors
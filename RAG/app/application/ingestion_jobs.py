@@ -0,0 +1,179 @@
+# app/application/ingestion_jobs.py
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+from app.application.process_document_service import ProcessingDocumentService
+from app.core import metrics
+from app.core.domain.models import IngestionJob
+from app.core.domain.ports.ingestion_job_port import IngestionJobPort
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionJobService:
+    """Alta y consulta de trabajos de ingesta; despierta a los workers del mismo proceso si los hay."""
+
+    def __init__(self, queue: IngestionJobPort, max_attempts: int = 5) -> None:
+        self._queue = queue
+        self._max_attempts = max_attempts
+        self._workers: Optional["IngestionWorkerPool"] = None
+
+    def attach(self, workers: "IngestionWorkerPool") -> None:
+        self._workers = workers
+
+    async def submit(self, client_id: str, agent_id: str, **payload: Any) -> IngestionJob:
+        job = await self._queue.aenqueue(client_id, agent_id, payload, self._max_attempts)
+        if self._workers is not None:
+            self._workers.wake()
+        return job
+
+    async def get(self, job_id: str) -> Optional[IngestionJob]:
+        return await self._queue.aget(job_id)
+
+
+class IngestionWorkerPool:
+    """
+    N workers que reclaman trabajos de la cola y ejecutan la ingesta en un pool de hilos propio:
+    embeddings y upserts de documentos grandes no ocupan los hilos de asyncio.to_thread de la ruta
+    de chat. En producción corre en su propio proceso (app.main.ingestion_worker); la API solo
+    arranca workers propios con INGEST_INPROCESS_WORKERS > 0 (desarrollo).
+
+    Un fallo vuelve a la cola con backoff exponencial (con jitter) hasta `max_attempts`; después el
+    trabajo queda en `dead` con el último error. Mientras un trabajo corre se renueva su lease; si el
+    proceso muere, el lease vence y otro worker lo retoma.
+    """
+
+    def __init__(
+        self,
+        queue: IngestionJobPort,
+        document_service: ProcessingDocumentService,
+        concurrency: int = 2,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 600.0,
+        backoff_base: float = 5.0,
+        backoff_max: float = 600.0,
+    ) -> None:
+        self._queue = queue
+        self._documents = document_service
+        self._concurrency = max(1, concurrency)
+        self._poll_interval = poll_interval
+        self._lease = lease_seconds
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._executor = ThreadPoolExecutor(max_workers=self._concurrency, thread_name_prefix="ingest")
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks: List[asyncio.Task] = []
+        self._running: Set[str] = set()
+        self._worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    @classmethod
+    def from_env(cls, queue: IngestionJobPort, document_service: ProcessingDocumentService, concurrency: int) -> "IngestionWorkerPool":
+        return cls(
+            queue,
+            document_service,
+            concurrency=concurrency,
+            poll_interval=float(os.getenv("INGEST_POLL_SECONDS", "1.0")),
+            lease_seconds=float(os.getenv("INGEST_LEASE_SECONDS", "600")),
+            backoff_base=float(os.getenv("INGEST_RETRY_BACKOFF_SECONDS", "5")),
+            backoff_max=float(os.getenv("INGEST_RETRY_BACKOFF_MAX_SECONDS", "600")),
+        )
+
+    def start(self) -> None:
+        for i in range(self._concurrency):
+            self._tasks.append(asyncio.create_task(self._run(f"{self._worker_prefix}:{i}")))
+        logger.info("ingestion workers started n=%s", self._concurrency)
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self._concurrency, "running": len(self._running)}
+
+    async def stop(self, grace_seconds: float = 30.0) -> None:
+        """Deja de reclamar y espera a los trabajos en curso; los que no terminen se retoman al vencer su lease."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=grace_seconds)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _retry_delay(self, attempts: int) -> float:
+        delay = min(self._backoff_base * (2 ** max(0, attempts - 1)), self._backoff_max)
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _run(self, worker_id: str) -> None:
+        while not self._stopping:
+            # se limpia antes de reclamar: un wake() que llegue durante el reclamo no se pierde
+            self._wakeup.clear()
+            try:
+                job = await self._queue.aclaim(worker_id, self._lease)
+            except Exception as e:
+                logger.warning("claim failed worker=%s: %s", worker_id, e)
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._execute(worker_id, job)
+
+    async def _heartbeat(self, job_id: str, worker_id: str) -> None:
+        while True:
+            await asyncio.sleep(self._lease / 3)
+            try:
+                if not await self._queue.aextend_lease(job_id, worker_id, self._lease):
+                    logger.warning("lease lost job=%s worker=%s", job_id, worker_id)
+                    return
+            except Exception as e:
+                logger.warning("lease renewal failed job=%s: %s", job_id, e)
+
+    async def _execute(self, worker_id: str, job: IngestionJob) -> None:
+        metrics.set_tenant(job.client_id, job.agent_id)
+        if job.created_at is not None and job.attempts == 1:
+            metrics.observe_stage("ingest_queue_wait", max(0.0, time.time() - job.created_at.timestamp()))
+        logger.info("job start id=%s client=%s agent=%s attempt=%s/%s", job.id, job.client_id, job.agent_id, job.attempts, job.max_attempts)
+        self._running.add(job.id)
+        heartbeat = asyncio.create_task(self._heartbeat(job.id, worker_id))
+        loop = asyncio.get_running_loop()
+        try:
+            with metrics.stage("ingest_job"):
+                result = await loop.run_in_executor(
+                    self._executor,
+                    lambda: self._documents.process_and_store_vector_document(
+                        client_id=job.client_id, agent_id=job.agent_id, **job.payload
+                    ),
+                )
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:2000]
+            retry_in = self._retry_delay(job.attempts) if job.attempts < job.max_attempts else None
+            if retry_in is None:
+                logger.error("job dead id=%s attempts=%s: %s", job.id, job.attempts, error)
+            else:
+                logger.warning("job failed id=%s attempt=%s retry_in=%.0fs: %s", job.id, job.attempts, retry_in, error)
+            await self._record(self._queue.afail(job.id, worker_id, error, retry_in), job.id)
+        else:
+            logger.info("job done id=%s result=%s", job.id, result)
+            await self._record(self._queue.acomplete(job.id, worker_id, dict(result)), job.id)
+        finally:
+            heartbeat.cancel()
+            self._running.discard(job.id)
+
+    @staticmethod
+    async def _record(update: Any, job_id: str) -> None:
+        try:
+            if not await update:
+                # otro worker lo retomó tras vencer el lease: su resultado es el que cuenta
+                logger.warning("job %s no longer owned by this worker; outcome discarded", job_id)
+        except Exception as e:
+            logger.error("could not record outcome job=%s: %s", job_id, e)
@@ -3,9 +3,22 @@ from app.core.domain.ports.embedding_port import EmbeddingPort
 from app.core.domain.ports.vector_port import VectorPort
 from app.core.domain.ports.client_repository_port import ClientRepositoryPort
 from app.core.domain.ports.chat_memory_port import ChatMemoryPort
-from typing import Optional, List, Dict, Any
+from app.application.semantic_answer_cache import SemanticAnswerCache, prompt_version
+from app.application import collection_layout
+from app.application.context_packer import ContextPacker
+from app.application.conversation_compactor import ConversationCompactor
+from app.application.single_flight import SingleFlight
+from app.application.prompt_cache import PromptCache
+from app.application.reranker import Reranker
+from app.core.domain.models import AgentProfile
+from app.core import metrics
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple, Set, Coroutine
+import asyncio
+import logging
 import time
-import traceback
+
+logger = logging.getLogger(__name__)
 
 
 class ProcessQueryService:
@@ -16,99 +29,208 @@ class ProcessQueryService:
         vector_port: VectorPort,
         saveinfo_port: ClientRepositoryPort,
         prompt_ttl_seconds: int = 60,
+        prompt_cache: Optional[PromptCache] = None,
         chat_memory: Optional[ChatMemoryPort] = None,
         history_limit: int = 20,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        context_packer: Optional[ContextPacker] = None,
+        compactor: Optional[ConversationCompactor] = None,
+        single_flight: Optional[SingleFlight] = None,
+        embedding_ports: Optional[Dict[str, EmbeddingPort]] = None,
+        reranker: Optional[Reranker] = None,
     ) -> None:
         self._response_llm = response_llm
         self._embedding_port = embedding_port
+        # Backends por nombre ("openai", "onnx", "hashing"); el perfil de cada colección dice cuál usa.
+        # Sin entrada para un backend se usa `embedding_port`.
+        self._embedding_ports = embedding_ports or {}
         self._vector_port = vector_port
         self._saveinfo_port = saveinfo_port
-        self._prompt_ttl = prompt_ttl_seconds
-        self._prompt_cache: dict[tuple[str, str], tuple[str | None, float]] = {}
+        # Sin listener de cambios la caché se comporta como un TTL de `prompt_ttl_seconds`
+        self._prompt_cache = prompt_cache or PromptCache(fallback_ttl=prompt_ttl_seconds)
         self._memory = chat_memory
         self._history_limit = history_limit
+        self._answer_cache = answer_cache
+        self._packer = context_packer
+        self._compactor = compactor
+        # Coalescencia de prompts/embeddings/respuestas idénticos en curso (p. ej. tras una campaña)
+        self._flight = single_flight or SingleFlight()
+        # Sobre-muestreo + corte por score + MMR antes de empaquetar el contexto
+        self._reranker = reranker
+        self._background: Set[asyncio.Task] = set()
         
-    # Caché simple de prompts por client_id y agent_id
-    def _get_prompt(self, client_id: str, agent_id: str) -> str | None:
-        key = (client_id, agent_id)
-        now = time.time()
-        cached = self._prompt_cache.get(key)
-        if cached:
-            value, ts = cached
-            if now - ts < self._prompt_ttl:
-                return value
-        value = self._saveinfo_port.get_prompt_client(client_id=client_id, agent_id=agent_id)
-        self._prompt_cache[key] = (value, now)
+    # Perfil del agente (prompt + ajustes) desde la caché de proceso; solo va a Postgres en un fallo
+    async def _get_profile(self, client_id: str, agent_id: str) -> AgentProfile:
+        cached = self._prompt_cache.get(client_id, agent_id)
+        if cached is not None:
+            metrics.count_cache("prompt", hits=1)
+            return cached
+        metrics.count_cache("prompt", misses=1)
+        generation = self._prompt_cache.generation(client_id, agent_id)
+        with metrics.stage("prompt"):
+            value = await self._flight.do(
+                ("prompt", client_id, agent_id),
+                lambda: self._saveinfo_port.aget_agent_profile(client_id=client_id, agent_id=agent_id),
+            )
+        self._prompt_cache.put(client_id, agent_id, value, generation)
         return value
 
+    async def _get_history(self, session_id: str) -> List[Dict[str, str]]:
+        if not self._memory:
+            return []
+        try:
+            with metrics.stage("memory_read"):
+                if self._compactor is not None:
+                    # resumen acumulado + turnos recientes dentro del presupuesto de tokens
+                    return await self._compactor.history(session_id, limit=self._history_limit)
+                return await self._memory.aget_recent(session_id, limit=self._history_limit)
+        except Exception as e:
+            logger.warning("get_recent failed sid=%s: %s", session_id, e, exc_info=True)
+            return []
+
+    def _port(self, embedder: Optional[str]) -> EmbeddingPort:
+        return self._embedding_ports.get(embedder, self._embedding_port)
+
+    async def _embed_query(self, query: str, embedder: Optional[str] = None, dimensions: Optional[int] = None) -> List[float]:
+        with metrics.stage("embedding"):
+            vectors = await self._flight.do(
+                ("embed", embedder, dimensions, " ".join(query.split())),
+                lambda: self._port(embedder).acreate_query_embeddings([query], dimensions=dimensions),
+            )
+        return vectors[0]
+
+    def _spawn(self, coro: Coroutine[Any, Any, None]) -> None:
+        # Tareas en segundo plano fuera de la ruta crítica; se guarda la referencia para que no las recolecte el GC
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"single_flight": self._flight.stats(), "prompts": self._prompt_cache.stats()}
+
+    async def drain(self) -> None:
+        """Espera a las tareas en segundo plano pendientes (apagado ordenado)."""
+        if self._background:
+            await asyncio.gather(*list(self._background), return_exceptions=True)
+
     def _make_session_id(self, client_id: str, agent_id: str, client_cel: str) -> str:
         # Diferencia sesión por agente + número
         return f"{client_id}:{agent_id}:{client_cel}"
 
-    def _candidate_collections(self, client_id: str, agent_id: str) -> List[str]:
-        # Unifica estrategia y agrega fallback para entornos donde se mezcló client_id/agent_id
-        return [
-            f"client_{client_id}",
-            f"client_{agent_id}",   # fallback si se indexó por agent_id por error
-            # Si tu estrategia fuese por agente, invierte el orden de esta lista
-            # f"agent_{agent_id}", f"agent_{client_id}",
-        ]
-
-    def process_query(self, query: str, client_id: str, agent_id: str, client_cel: str, timpestap: str, top_k: int = 5) -> str:
-        # 0) Construir session id y recuperar historial reciente (solo Q/A previos)
+    def _search_targets(self, client_id: str, agent_id: str) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+        # (colección, filtro) según el modo de almacenamiento: per_client (legado) o shared multi-tenant
+        return collection_layout.search_targets(client_id, agent_id)
+
+    def _embedding_plan(self, client_id: str, agent_id: str) -> Tuple[str, Optional[int]]:
+        # Backend de la colección principal y dimensiones que sirvan a todas las candidatas de ese backend
+        cols = [col for col, _ in self._search_targets(client_id, agent_id)]
+        embedder = collection_layout.storage_profile(cols[0]).embedder
+        return embedder, collection_layout.query_dimensions(cols, embedder)
+
+    async def _vector_for(self, col: str, query: str, query_vec: List[float], embedder: str) -> List[float]:
+        # Cada colección tiene las dimensiones (y el backend) de su perfil de almacenamiento
+        profile = collection_layout.storage_profile(col)
+        if profile.embedder == embedder and collection_layout.can_fit_vector(query_vec, profile.dimensions, embedder):
+            return collection_layout.fit_vector(query_vec, profile.dimensions, embedder)
+        return await self._embed_query(query, profile.embedder, profile.dimensions)
+
+    def _fetch_k(self, top_k: int) -> int:
+        return self._reranker.fetch_k(top_k) if self._reranker is not None else top_k
+
+    def _context_budget(self, profile: AgentProfile) -> Optional[int]:
+        # Presupuesto por agente (agents.settings.context_token_budget); si no, el del packer
+        try:
+            value = profile.settings.get("context_token_budget")
+            return int(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _as_list(x: Any) -> List[Dict[str, Any]]:
+        # normalizar a lista
+        if isinstance(x, list):
+            return x
+        if isinstance(x, dict):
+            for k in ("points", "result", "matches"):
+                v = x.get(k)
+                if isinstance(v, list):
+                    return v
+        return []
+
+    async def _search(
+        self, query: str, query_vec: List[float], embedder: str, client_id: str, agent_id: str, top_k: int
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        for col, filters in self._search_targets(client_id, agent_id):
+            vec = await self._vector_for(col, query, query_vec, embedder)
+            with metrics.stage("vector_search"):
+                ctx = await self._vector_port.asearch(
+                    vector=vec,
+                    collection=col,
+                    top_k=self._fetch_k(top_k),
+                    filters=filters,
+                    with_vectors=self._reranker is not None,
+                )
+
+            cand = self._as_list(ctx)
+            logger.debug("vector search collection=%s filters=%s top_k=%s matches=%s", col, filters, top_k, len(cand))
+
+            if cand:
+                return cand, col
+        return [], None
+
+    async def _prepare(
+        self,
+        query: str,
+        client_id: str,
+        agent_id: str,
+        client_cel: str,
+        top_k: int,
+        query_vec: Optional[List[float]] = None,
+        matches: Optional[List[Dict[str, Any]]] = None,
+    ) -> "_QueryContext":
+        # 0) Construir session id
         session_id = self._make_session_id(client_id=client_id, agent_id=agent_id, client_cel=client_cel)
-        print(f"[query] start sid={session_id} top_k={top_k} q_len={len(query)} q_preview={query[:120]!r}")
-        history: List[Dict[str, str]] = []
-        if self._memory:
-            try:
-                history = self._memory.get_recent(session_id, limit=self._history_limit)
-            except Exception as e:
-                print(f"[query][warn] get_recent failed: {e}")
-                traceback.print_exc()
-                history = []
-        print(f"[query] history_len={len(history)}")
-
-        # 1) Embedding del query (siempre se recalcula)
-        t0 = time.time()
-        query_vec = self._embedding_port.create_embeddings([query])[0]
-        t1 = time.time()
-        dim = len(query_vec) if hasattr(query_vec, "__len__") else "unknown"
-        print(f"[query] embedding computed dim={dim} dt_ms={int((t1-t0)*1000)}")
+        metrics.set_tenant(client_id, agent_id)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("start sid=%s top_k=%s q_len=%s q_preview=%r", session_id, top_k, len(query), query[:120])
+
+        # 1) Prompt del agente, historial reciente (solo Q/A previos) y embedding del query en paralelo:
+        #    ninguno depende de los otros, así que no tiene sentido esperarlos uno tras otro.
+        #    En lote el embedding y la búsqueda ya vienen calculados (query_vec / matches).
+        embedder, dimensions = self._embedding_plan(client_id, agent_id)
+        if query_vec is None:
+            profile, history, query_vec = await asyncio.gather(
+                self._get_profile(client_id=client_id, agent_id=agent_id),
+                self._get_history(session_id),
+                self._embed_query(query, embedder, dimensions),
+            )
+        else:
+            profile, history = await asyncio.gather(
+                self._get_profile(client_id=client_id, agent_id=agent_id),
+                self._get_history(session_id),
+            )
+        system_prompt = profile.prompt
+        version = profile.version or prompt_version(system_prompt)
+        logger.debug("history_len=%s system_prompt_len=%s", len(history), len(system_prompt) if system_prompt else 0)
 
         # 2) Búsqueda vectorial probando colecciones candidatas
-        matches: List[Dict[str, Any]] = []
-        used_collection: Optional[str] = None
-
-        for col in self._candidate_collections(client_id, agent_id):
-            print(f"[query] vector search -> collection={col} top_k={top_k}")
-            t2 = time.time()
-            ctx = self._vector_port.search(vector=query_vec, collection=col, top_k=top_k)
-            t3 = time.time()
-            print(f"[query] vector search done dt_ms={int((t3-t2)*1000)} raw_type={type(ctx).__name__}")
-
-            # normalizar a lista
-            def _as_list(x) -> List[Dict[str, Any]]:
-                if isinstance(x, list):
-                    return x
-                if isinstance(x, dict):
-                    for k in ("points", "result", "matches"):
-                        v = x.get(k)
-                        if isinstance(v, list):
-                            return v
-                return []
-            cand = _as_list(ctx)
-            print(f"[query] matches_count in {col} = {len(cand)}")
+        if matches is None:
+            matches, used_collection = await self._search(query, query_vec, embedder, client_id, agent_id, top_k)
+        else:
+            used_collection = "batch"
 
-            if cand:
-                matches = cand
-                used_collection = col
-                break
+        if self._reranker is not None and matches:
+            fetched = len(matches)
+            with metrics.stage("rerank"):
+                matches = self._reranker.rerank(matches, top_k, profile.settings)
+            logger.debug("rerank candidates=%s kept=%s", fetched, len(matches))
 
+        metrics.count_matches(len(matches))
         if not matches:
-            print("[query][warn] 0 matches from all candidate collections")
-        else:
-            print(f"[query] using_collection={used_collection} matches={len(matches)}")
-            # métricas del primer match
+            logger.info("0 matches from all candidate collections client=%s agent=%s", client_id, agent_id)
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug("using_collection=%s matches=%s", used_collection, len(matches))
+            # detalle del primer match
             sample = matches[0] if isinstance(matches, list) else {}
             payload = sample.get("payload", {}) if isinstance(sample, dict) else {}
             keys_preview = list(payload.keys())[:8] if isinstance(payload, dict) else []
@@ -120,48 +242,294 @@ class ProcessQueryService:
                         break
             score = sample.get("score") if isinstance(sample, dict) else None
             _id = sample.get("id") if isinstance(sample, dict) else None
-            print(f"[query] first_match id={_id} score={score} payload_keys={keys_preview}")
-            if text_preview is not None:
-                print(f"[query] first_match text_preview={text_preview!r}")
+            logger.debug("first_match id=%s score=%s payload_keys=%s text_preview=%r", _id, score, keys_preview, text_preview)
+
+        # 3) Caché semántica de respuestas (opcional). Solo aplica sin historial previo:
+        #    con historial la respuesta depende de la conversación, no solo de la pregunta.
+        cache_key = None
+        cached_answer: Optional[str] = None
+        if self._answer_cache is not None and not history:
+            cache_key = self._answer_cache.make_key(client_id, agent_id, version, matches)
+            cached_answer = self._answer_cache.lookup(cache_key, query_vec)
+            if cached_answer is not None:
+                metrics.count_cache("answer", hits=1)
+                logger.debug("answer cache hit sid=%s", session_id)
+            else:
+                metrics.count_cache("answer", misses=1)
+
+        # Clave de coalescencia de la llamada al LLM (solo sin historial), con los chunks sin empaquetar
+        flight_key = None
+        if not history:
+            flight_key = ("answer",) + SemanticAnswerCache.make_key(
+                client_id, agent_id, version, matches
+            ) + (" ".join(query.split()),)
+
+        # 4) Empaquetar el contexto: unir chunks contiguos sin solape y respetar el presupuesto de tokens
+        if self._packer is not None and cached_answer is None and matches:
+            matches = self._packer.pack(matches, token_budget=self._context_budget(profile))
 
-        # 3) Prompt del agente (cacheado por TTL, no afecta a la búsqueda)
-        system_prompt = self._get_prompt(client_id=client_id, agent_id=agent_id)
-        sp_len = len(system_prompt) if system_prompt else 0
-        print(f"[query] system_prompt_len={sp_len}")
+        return _QueryContext(
+            session_id=session_id,
+            query=query,
+            query_vec=query_vec,
+            history=history,
+            system_prompt=system_prompt,
+            matches=matches,
+            cache_key=cache_key,
+            cached_answer=cached_answer,
+            flight_key=flight_key,
+        )
 
-        # 4) LLM con historial + contexto nuevo de esta búsqueda
+    async def _finish(self, qc: "_QueryContext", answer: str, from_llm: bool) -> None:
+        if logger.isEnabledFor(logging.DEBUG):
+            ans_len = len(answer) if isinstance(answer, str) else 0
+            logger.debug("answer_len=%s answer_preview=%r", ans_len, str(answer)[:200])
+
+        if from_llm and qc.cache_key is not None and self._answer_cache is not None and isinstance(answer, str) and answer:
+            self._answer_cache.store(qc.cache_key, qc.query_vec, answer)
+
+        # 6) Persistir SOLO pregunta y respuesta en la memoria, fuera de la ruta crítica:
+        #    la respuesta ya se puede devolver mientras esto corre en segundo plano.
+        if self._memory:
+            self._spawn(self._persist_turn(qc.session_id, qc.query, answer))
+
+    async def _persist_turn(self, session_id: str, query: str, answer: str) -> None:
         try:
-            if hasattr(self._response_llm, "response_with_history"):
-                answer = getattr(self._response_llm, "response_with_history")(  # type: ignore[attr-defined]
-                    prompt=query,
-                    history=history,
-                    system_prompt=system_prompt,
-                    context=matches,  # lista normalizada
-                )
-            else:
-                answer = self._response_llm.response(prompt=query, context=matches, system_prompt=system_prompt)
+            with metrics.stage("memory_write"):
+                await self._memory.aappend(session_id, "user", query)
+                await self._memory.aappend(session_id, "assistant", answer)
+        except Exception as e:
+            logger.warning("memory append failed sid=%s: %s", session_id, e, exc_info=True)
+            return
+        # Plegar turnos viejos en el resumen
+        if self._compactor is not None:
+            await self._compactor.fold(session_id)
+
+    async def process_query(self, query: str, client_id: str, agent_id: str, client_cel: str, timpestap: str, top_k: int = 5) -> str:
+        with metrics.stage("query_total"):
+            qc = await self._prepare(query, client_id, agent_id, client_cel, top_k)
+            return await self._answer(qc)
+
+    async def _answer(self, qc: "_QueryContext") -> str:
+        if qc.cached_answer is not None:
+            await self._finish(qc, qc.cached_answer, from_llm=False)
+            return qc.cached_answer
+
+        # 5) LLM con historial + contexto nuevo de esta búsqueda.
+        #    Sin historial la respuesta solo depende de (agente, prompt, chunks, pregunta): las
+        #    llamadas idénticas simultáneas comparten una sola petición al LLM.
+        async def call_llm() -> str:
+            return await self._response_llm.aresponse_with_history(
+                prompt=qc.query,
+                history=qc.history,
+                system_prompt=qc.system_prompt,
+                context=qc.matches,  # lista normalizada
+            )
+
+        try:
+            with metrics.stage("llm"):
+                if qc.flight_key is None:
+                    answer = await call_llm()
+                else:
+                    answer = await self._flight.do(qc.flight_key, call_llm)
         except Exception as e:
-            print(f"[query][error] LLM call failed: {e}")
-            traceback.print_exc()
+            logger.exception("LLM call failed sid=%s: %s", qc.session_id, e)
             raise
 
-        ans_len = len(answer) if isinstance(answer, str) else 0
-        print(f"[query] answer_len={ans_len} answer_preview={str(answer)[:200]!r}")
+        await self._finish(qc, answer, from_llm=True)
+        return answer
 
-        # 5) Persistir SOLO pregunta y respuesta en la memoria
-        if self._memory:
+    async def stream_query(
+        self, query: str, client_id: str, agent_id: str, client_cel: str, timpestap: str, top_k: int = 5
+    ) -> AsyncIterator[str]:
+        """Igual que process_query pero entrega los tokens según llegan; la memoria se escribe al terminar."""
+        t_start = time.perf_counter()
+        qc = await self._prepare(query, client_id, agent_id, client_cel, top_k)
+        if qc.cached_answer is not None:
+            yield qc.cached_answer
+            await self._finish(qc, qc.cached_answer, from_llm=False)
+            return
+
+        parts: List[str] = []
+        t0 = time.perf_counter()
+        try:
+            async for delta in self._response_llm.astream_response_with_history(
+                prompt=query,
+                history=qc.history,
+                system_prompt=qc.system_prompt,
+                context=qc.matches,
+            ):
+                if not parts:
+                    metrics.observe_stage("llm_ttft", time.perf_counter() - t0)
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            metrics.count_error("llm")
+            logger.exception("LLM stream failed sid=%s: %s", qc.session_id, e)
+            raise
+        metrics.observe_stage("llm", time.perf_counter() - t0)
+
+        # Solo se persiste una respuesta completa (si el cliente corta el stream no llegamos aquí)
+        await self._finish(qc, "".join(parts), from_llm=True)
+        metrics.observe_stage("query_total", time.perf_counter() - t_start)
+
+    async def process_batch(self, items: List["BatchQuery"], top_k: int = 5, concurrency: int = 8) -> List["BatchResult"]:
+        """Responde N mensajes (de distintas sesiones/agentes) de una vez.
+        Un solo create_query_embeddings para todas las preguntas, una búsqueda por lote y colección,
+        y las llamadas al LLM con concurrencia acotada. Los resultados salen en el orden de entrada;
+        un fallo de un mensaje no tumba al resto."""
+        n = len(items)
+        results: List[Optional[BatchResult]] = [None] * n
+        if n == 0:
+            return []
+        # embeddings y búsquedas del lote mezclan tenants: sin etiquetas (cada mensaje fija las suyas en _prepare)
+        metrics.set_tenant(None, None)
+        logger.debug("batch start items=%s top_k=%s concurrency=%s", n, top_k, concurrency)
+        t0 = time.perf_counter()
+
+        # 1) Embeddings: una sola llamada por backend, normalmente una en total
+        #    (la caché de embeddings solo pide los que falten)
+        plans = [self._embedding_plan(it.client_id, it.agent_id) for it in items]
+        by_embedder: Dict[str, List[int]] = {}
+        for i, (embedder, _) in enumerate(plans):
+            by_embedder.setdefault(embedder, []).append(i)
+        vectors: List[Optional[List[float]]] = [None] * n
+        for embedder, idxs in by_embedder.items():
+            dims = [plans[i][1] for i in idxs]
+            dimensions = None if any(d is None for d in dims) else max(dims)
             try:
-                self._memory.append(session_id, "user", query)
-                self._memory.append(session_id, "assistant", answer)
-                print(f"[query] memory appended (user+assistant) for sid={session_id}")
+                with metrics.stage("embedding"):
+                    out = await self._port(embedder).acreate_query_embeddings([items[i].query for i in idxs], dimensions=dimensions)
             except Exception as e:
-                print(f"[query][warn] memory append failed: {e}")
-                traceback.print_exc()
+                logger.exception("batch embeddings failed backend=%s: %s", embedder, e)
+                for i in idxs:
+                    results[i] = BatchResult(error=f"embedding failed: {e}")
+                continue
+            for i, vec in zip(idxs, out):
+                vectors[i] = vec
+        logger.debug("batch embeddings computed backends=%s dt_ms=%d", len(by_embedder), (time.perf_counter() - t0) * 1000)
+
+        # 2) Búsquedas agrupadas por colección
+        active = [i for i in range(n) if vectors[i] is not None]
+        matches, errors = await self._search_batch(items, vectors, [e for e, _ in plans], active, top_k)
+        for i, err in errors.items():
+            results[i] = BatchResult(error=f"vector search failed: {err}")
+
+        # 3) Prompt/historial por mensaje y LLM con concurrencia acotada, reutilizando la ruta normal
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def run(i: int) -> None:
+            it = items[i]
+            async with sem:
+                try:
+                    qc = await self._prepare(
+                        it.query, it.client_id, it.agent_id, it.client_cel, top_k,
+                        query_vec=vectors[i], matches=matches[i],
+                    )
+                    results[i] = BatchResult(answer=await self._answer(qc))
+                except Exception as e:
+                    logger.warning("batch item=%s failed: %s", i, e)
+                    results[i] = BatchResult(error=str(e) or type(e).__name__)
+
+        await asyncio.gather(*[run(i) for i in range(n) if results[i] is None])
+        failed = sum(1 for r in results if r is not None and r.error is not None)
+        logger.info("batch done items=%s failed=%s dt_ms=%d", n, failed, (time.perf_counter() - t0) * 1000)
+        return [r for r in results if r is not None]
+
+    async def _search_batch(
+        self,
+        items: List["BatchQuery"],
+        vectors: List[Optional[List[float]]],
+        embedders: List[str],
+        active: List[int],
+        top_k: int,
+    ) -> Tuple[List[List[Dict[str, Any]]], Dict[int, Exception]]:
+        # Igual que _search, pero por rondas: en cada ronda cada mensaje sin resultados prueba su
+        # siguiente colección candidata y todos los que apuntan a la misma colección van en una petición.
+        targets = [self._search_targets(it.client_id, it.agent_id) for it in items]
+        matches: List[List[Dict[str, Any]]] = [[] for _ in items]
+        errors: Dict[int, Exception] = {}
+
+        async def search_collection(col: str, idxs: List[int], level: int) -> List[List[Dict[str, Any]]]:
+            profile = collection_layout.storage_profile(col)
+            vecs = {
+                i: collection_layout.fit_vector(vectors[i], profile.dimensions, profile.embedder)
+                for i in idxs
+                if embedders[i] == profile.embedder and collection_layout.can_fit_vector(vectors[i], profile.dimensions, profile.embedder)
+            }
+            other = [i for i in idxs if i not in vecs]
+            if other:
+                # colección de respaldo con otro backend (o con menos dimensiones de un backend que no
+                # se puede recortar): un create_query_embeddings para esos mensajes
+                extra = await self._port(profile.embedder).acreate_query_embeddings(
+                    [items[i].query for i in other], dimensions=profile.dimensions
+                )
+                vecs.update(zip(other, extra))
+            with metrics.stage("vector_search"):
+                return await self._vector_port.asearch_batch(
+                    vectors=[vecs[i] for i in idxs],
+                    collection=col,
+                    top_k=self._fetch_k(top_k),
+                    filters=[targets[i][level][1] for i in idxs],
+                    with_vectors=self._reranker is not None,
+                )
+
+        pending = list(active)
+        level = 0
+        while pending:
+            groups: Dict[str, List[int]] = {}
+            for i in pending:
+                if level < len(targets[i]):
+                    groups.setdefault(targets[i][level][0], []).append(i)
+            if not groups:
+                break
+
+            cols = list(groups)
+            outs = await asyncio.gather(
+                *[search_collection(col, groups[col], level) for col in cols], return_exceptions=True
+            )
+            logger.debug("batch vector search round=%s collections=%s", level, len(cols))
+
+            pending = []
+            for col, out in zip(cols, outs):
+                idxs = groups[col]
+                if isinstance(out, BaseException):
+                    logger.error("batch vector search failed collection=%s: %s", col, out)
+                    for i in idxs:
+                        errors[i] = out
+                    continue
+                for i, res in zip(idxs, out):
+                    cand = self._as_list(res)
+                    if cand:
+                        matches[i] = cand
+                    else:
+                        pending.append(i)
+            level += 1
+        return matches, errors
 
-        print("[query] end")
-        return answer
 
+@dataclass
+class _QueryContext:
+    session_id: str
+    query: str
+    query_vec: List[float]
+    history: List[Dict[str, str]]
+    system_prompt: Optional[str]
+    matches: List[Dict[str, Any]]
+    cache_key: Optional[tuple] = None
+    cached_answer: Optional[str] = None
+    flight_key: Optional[tuple] = None
 
 
+@dataclass
+class BatchQuery:
+    query: str
+    client_id: str
+    agent_id: str
+    client_cel: str
 
 
+@dataclass
+class BatchResult:
+    answer: Optional[str] = None
+    error: Optional[str] = None
@@ -1,12 +1,34 @@
 # app/application/process_document_service.py
-import os, traceback
-from typing import Iterable, List, Optional, Dict
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Dict, Set, Tuple
 from app.core.domain.models import Chunk
 from app.core.domain.ports.storage_port import StoragePort
 from app.core.domain.ports.chunking_port import ChunkingPort
 from app.core.domain.ports.embedding_port import EmbeddingPort
 from app.core.domain.ports.vector_port import VectorPort
 from app.core.domain.ports.client_repository_port import ClientRepositoryPort as SaveInfoClientPort
+from app.core.domain.ports.embedding_store_port import EmbeddingStorePort
+from app.application.chunk_embedding_cache import ChunkEmbeddingCache
+from app.application.embedding_batcher import EmbeddingBatcher, EmbeddingStats
+from app.application.collection_layout import ingest_collection, storage_profile
+from app.application.prompt_cache import PromptCache
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+# Re-indexado de un documento ya indexado (mismo doc_id):
+#   diff: solo se embeben/suben los chunks nuevos o movidos y se borran los que ya no están
+#   full: se vuelven a subir todos los chunks y se borran los que ya no están
+REINDEX_DIFF = "diff"
+REINDEX_FULL = "full"
+REINDEX_MODES = (REINDEX_DIFF, REINDEX_FULL)
 
 class ProcessingDocumentService:
     def __init__(
@@ -16,25 +38,185 @@ class ProcessingDocumentService:
         embeddingPort: EmbeddingPort,
         vector_port: VectorPort,
         save_info: SaveInfoClientPort,
-        batch_size: int = 128,
+        batch_size: int = 512,
+        prompt_cache: Optional[PromptCache] = None,
+        embedding_ports: Optional[Dict[str, EmbeddingPort]] = None,
+        batcher: Optional[EmbeddingBatcher] = None,
+        embedding_store: Optional[EmbeddingStorePort] = None,
     ) -> None:
         self._storage = storage_port
         self._chunking = chunking_port
         self._embedding = embeddingPort
+        self._embedding_ports = embedding_ports or {}
         self._vectors = vector_port
         self._saveinfo = save_info
-        self._batch_size = batch_size
+        # lotes por tokens; batch_size es solo el máximo de textos por petición
+        self._batcher = batcher or EmbeddingBatcher.from_env(max_items=batch_size)
+        self._prompt_cache = prompt_cache
+        # embeddings de chunks ya vistos (re-subidas del mismo documento); None = sin caché
+        self._chunk_cache = ChunkEmbeddingCache(embedding_store) if embedding_store is not None else None
         self.INCLUDE_FULL_TEXT_IN_PAYLOAD = os.getenv("INCLUDE_FULL_TEXT_IN_PAYLOAD", "false").lower() == "true"
         self.MAX_PAYLOAD_CHARS = int(os.getenv("PAYLOAD_PREVIEW_CHARS", "800"))
+        # Peticiones de embedding en vuelo por documento (1 = secuencial, sin pipeline)
+        self.EMBED_CONCURRENCY = max(1, int(os.getenv("INGEST_EMBED_CONCURRENCY", "4")))
+        # Dos re-indexados del mismo documento a la vez se borrarían mutuamente chunks como "viejos".
+        # Lock en proceso (con cuántos lo usan, para soltar la entrada) + advisory lock del repositorio
+        self._doc_locks: Dict[Tuple[str, str, str], Tuple[threading.Lock, int]] = {}
+        self._doc_locks_guard = threading.Lock()
+
+    def _records(self, chunks: Iterable[Chunk]) -> Iterator[Tuple[str, str, dict]]:
+        for c in chunks:
+            full_text = (c.content or "").strip()
+            if not full_text:
+                continue
+            payload = dict(c.metadata or {})
+            payload["text_preview"] = full_text[: self.MAX_PAYLOAD_CHARS]
+            payload["has_more"] = len(full_text) > self.MAX_PAYLOAD_CHARS
+            if self.INCLUDE_FULL_TEXT_IN_PAYLOAD:
+                payload["text"] = full_text
+            yield c.id, full_text, payload
+
+    def _prepared_batches(
+        self, chunks: Iterable[Chunk], model: Optional[str] = None
+    ) -> Iterator[Tuple[List[str], List[str], List[dict], List[int]]]:
+        for batch, tokens in self._batcher.pack(self._records(chunks), text=lambda r: r[1], model=model):
+            ids, texts, payloads = (list(col) for col in zip(*batch))
+            yield ids, texts, payloads, tokens
+
+    def _embed(
+        self,
+        embedding: EmbeddingPort,
+        texts: List[str],
+        tokens: List[int],
+        dimensions: Optional[int],
+        stats: Optional[EmbeddingStats] = None,
+    ) -> List[List[float]]:
+        if self._chunk_cache is None:
+            return self._batcher.embed(embedding, texts, tokens, dimensions, stats)
+        # solo los chunks que no están en la caché llegan a create_embeddings
+        vectors, hits = self._chunk_cache.resolve(
+            texts,
+            embedding.document_fingerprint(),
+            dimensions,
+            lambda missing: self._batcher.embed(
+                embedding, [texts[i] for i in missing], [tokens[i] for i in missing], dimensions, stats
+            ),
+        )
+        if stats is not None:
+            stats.cache(hits, len(texts) - hits)
+        return vectors
+
+    @contextmanager
+    def _doc_lock(self, client_id: str, agent_id: str, doc_id: str) -> Iterator[None]:
+        key = (client_id, agent_id, doc_id)
+        with self._doc_locks_guard:
+            lock, users = self._doc_locks.get(key) or (threading.Lock(), 0)
+            self._doc_locks[key] = (lock, users + 1)
+        try:
+            # primero el de proceso: los hilos que esperan no retienen conexiones del repositorio
+            with lock, self._saveinfo.document_lock(client_id, agent_id, doc_id):
+                yield
+        finally:
+            with self._doc_locks_guard:
+                lock, users = self._doc_locks[key]
+                if users == 1:
+                    del self._doc_locks[key]
+                else:
+                    self._doc_locks[key] = (lock, users - 1)
+
+    def _indexed_chunks(self, collection: str, doc_filter: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """id -> chunk_index de los puntos ya indexados del documento; None si el backend no los lista."""
+        try:
+            points = self._vectors.scroll(collection, doc_filter, payload_fields=["chunk_index"])
+        except NotImplementedError:
+            logger.warning("vector backend %s cannot list points; re-index diff disabled", type(self._vectors).__name__)
+            return None
+        return {p["id"]: p["payload"].get("chunk_index") for p in points}
 
-    def _batched(self, iterable: Iterable[Chunk], n: int) -> Iterable[List[Chunk]]:
-        batch: List[Chunk] = []
-        for item in iterable:
-            batch.append(item)
-            if len(batch) == n:
-                yield batch; batch = []
-        if batch:
-            yield batch
+    @staticmethod
+    def _changed_chunks(chunks: Iterable[Chunk], indexed: Dict[str, Any], seen: Set[str], unchanged: Set[str]) -> Iterator[Chunk]:
+        # mismo id = mismo contenido; si además no cambió de posición (chunk_index, que usa el
+        # ContextPacker para unir chunks contiguos) el punto ya indexado sirve tal cual
+        for c in chunks:
+            seen.add(c.id)
+            if c.id in indexed and indexed[c.id] == (c.metadata or {}).get("chunk_index"):
+                unchanged.add(c.id)
+                continue
+            yield c
+
+    def _upsert(self, ids: List[str], vectors: List[List[float]], payloads: List[dict], collection: str) -> int:
+        with metrics.stage("ingest_upsert"):
+            self._vectors.up_embeddings(ids=ids, vectors=vectors, payloads=payloads, collection=collection)
+        metrics.count_indexed(len(ids))
+        return len(ids)
+
+    def _embed_and_upsert(
+        self,
+        batches: Iterator[Tuple[List[str], List[str], List[dict], List[int]]],
+        embedding: EmbeddingPort,
+        dimensions: Optional[int],
+        collection: str,
+        stats: Optional[EmbeddingStats] = None,
+    ) -> int:
+        """
+        Pipeline de ingesta: hasta EMBED_CONCURRENCY lotes embebiéndose a la vez mientras este hilo
+        hace el upsert del lote más antiguo ya listo. Los upserts se hacen en el orden de los chunks
+        y el primer error corta el pipeline (los lotes pendientes se cancelan).
+        """
+        if self.EMBED_CONCURRENCY == 1:
+            return sum(
+                self._upsert(ids, self._embed(embedding, texts, tokens, dimensions, stats), payloads, collection)
+                for ids, texts, payloads, tokens in batches
+            )
+
+        indexed = 0
+        in_flight: Deque[Tuple[List[str], List[dict], Future]] = deque()
+        executor = ThreadPoolExecutor(max_workers=self.EMBED_CONCURRENCY, thread_name_prefix="ingest-embed")
+        try:
+            for ids, texts, payloads, tokens in batches:
+                # copy_context: el tenant de las métricas (ContextVar) viaja al hilo del pool
+                ctx = contextvars.copy_context()
+                future = executor.submit(ctx.run, self._embed, embedding, texts, tokens, dimensions, stats)
+                in_flight.append((ids, payloads, future))
+                if len(in_flight) >= self.EMBED_CONCURRENCY:
+                    done_ids, done_payloads, future = in_flight.popleft()
+                    indexed += self._upsert(done_ids, future.result(), done_payloads, collection)
+            while in_flight:
+                done_ids, done_payloads, future = in_flight.popleft()
+                indexed += self._upsert(done_ids, future.result(), done_payloads, collection)
+        finally:
+            # en caso de error no se espera a los lotes en vuelo
+            executor.shutdown(wait=not in_flight, cancel_futures=True)
+        return indexed
+
+    def _index_document(
+        self,
+        chunks: Iterable[Chunk],
+        embedding: EmbeddingPort,
+        dimensions: Optional[int],
+        collection: str,
+        doc_filter: Dict[str, Any],
+        reindex: str,
+        stats: EmbeddingStats,
+        unchanged: Set[str],
+    ) -> Tuple[int, int]:
+        """Indexa la versión nueva del documento contra la ya indexada. Devuelve (subidos, borrados)."""
+        # versión anterior del documento (los ids de chunk son deterministas)
+        indexed = self._indexed_chunks(collection, doc_filter)
+        seen: Set[str] = set()
+        if indexed:
+            skip = indexed if reindex == REINDEX_DIFF else {}
+            chunks = self._changed_chunks(chunks, skip, seen, unchanged)
+        upserted = self._embed_and_upsert(
+            self._prepared_batches(chunks, getattr(embedding, "model", None)), embedding, dimensions, collection, stats
+        )
+        # solo tras indexar la versión nueva completa: si algo falla antes, la anterior sigue
+        # entera y el reintento converge (los chunks ya subidos se reconocen por su id)
+        stale = [pid for pid in indexed or {} if pid not in seen]
+        if not stale:
+            return upserted, 0
+        with metrics.stage("ingest_delete"):
+            return upserted, self._vectors.delete(stale, collection)
 
     def process_and_store_vector_document(
         self,
@@ -46,21 +228,26 @@ class ProcessingDocumentService:
         client_id: str,
         agent_id: str,
         doc_id: Optional[str] = None,
+        reindex: str = REINDEX_DIFF,
         # Construcción del prompt
         prompt: Optional[str] = None,
-    ) -> Dict[str, int | bool]:
-        print("=== process_and_store_vector_document: START ===")
+    ) -> Dict[str, int | float | bool]:
+        metrics.set_tenant(client_id, agent_id)
+        logger.debug("ingest start client=%s agent=%s object_key=%s", client_id, agent_id, object_key)
         indexed_total = 0
+        deleted_total = 0
+        unchanged: Set[str] = set()
         prompt_updated = False
+        stats = EmbeddingStats()
 
         # --- A) Procesar DOCUMENTO (solo si object_key viene) ---
         if object_key:
             try:
-                print("[storage] downloading...")
-                document_bytes = self._storage.get_document_client(object_key=object_key)
-                print(f"[storage] bytes={len(document_bytes) if document_bytes else 0}")
+                with metrics.stage("ingest_download"):
+                    document_bytes = self._storage.get_document_client(object_key=object_key)
+                logger.debug("downloaded bytes=%s", len(document_bytes) if document_bytes else 0)
             except Exception as e:
-                print(f"[error:storage] {e}"); traceback.print_exc(); raise
+                logger.exception("storage: %s", e); raise
 
             metadata_base = {
                 "client_id": client_id,
@@ -77,31 +264,28 @@ class ProcessingDocumentService:
                     base_metadata=metadata_base,
                 )
             except Exception as e:
-                print(f"[error:chunking] {e}"); traceback.print_exc(); raise
+                metrics.count_error("ingest_chunking")
+                logger.exception("chunking: %s", e); raise
 
-            batch_index = 0
+            target = collection or ingest_collection(client_id)
+            # backend y dimensiones del embedding según el perfil de almacenamiento de la colección destino
+            profile = storage_profile(target)
+            embedding = self._embedding_ports.get(profile.embedder, self._embedding)
+            doc_filter = {"client_id": client_id, "agent_id": agent_id, "doc_id": metadata_base["doc_id"]}
+            t0 = time.perf_counter()
             try:
-                for batch in self._batched(chunks_iter, self._batch_size):
-                    batch_index += 1
-                    ids, texts, payloads = [], [], []
-                    for c in batch:
-                        full_text = (c.content or "").strip()
-                        if not full_text:
-                            continue
-                        ids.append(c.id); texts.append(full_text)
-                        payload = dict(c.metadata or {})
-                        payload["text_preview"] = full_text[: self.MAX_PAYLOAD_CHARS]
-                        payload["has_more"] = len(full_text) > self.MAX_PAYLOAD_CHARS
-                        if self.INCLUDE_FULL_TEXT_IN_PAYLOAD:
-                            payload["text"] = full_text
-                        payloads.append(payload)
-
-                    if not ids:
-                        continue
-
-                    vectors = self._embedding.create_embeddings(texts)
-                    self._vectors.up_embeddings(ids=ids, vectors=vectors, payloads=payloads, collection=collection or f"client_{client_id}")
-                    indexed_total += len(ids)
+                with self._doc_lock(client_id, agent_id, metadata_base["doc_id"]):
+                    indexed_total, deleted_total = self._index_document(
+                        chunks_iter, embedding, profile.dimensions, target, doc_filter, reindex, stats, unchanged
+                    )
+                elapsed = time.perf_counter() - t0
+                logger.info(
+                    "ingest embeddings requests=%s tokens=%s tokens_per_request=%.0f tokens_per_s=%.0f splits=%s cache_hits=%s/%s",
+                    stats.requests, stats.tokens, stats.tokens_per_request(),
+                    stats.tokens / elapsed if elapsed > 0 else 0.0, stats.splits,
+                    stats.cache_hits, stats.cache_hits + stats.cache_misses,
+                    extra={"embed_requests": stats.requests, "embed_tokens": stats.tokens, "embed_cache_hits": stats.cache_hits},
+                )
 
                 # registrar en Postgres el documento procesado
                 try:
@@ -113,20 +297,44 @@ class ProcessingDocumentService:
                             source_key=object_key,
                         )
                     else:
-                        print("[saveinfo] prompt no viene o está vacío, no se guarda info documento")
+                        logger.debug("prompt no viene o está vacío, no se guarda info documento")
                 except Exception as e:
-                    print(f"[warn:saveinfo:document] {e}")
+                    logger.warning("saveinfo document: %s", e)
 
             except Exception as e:
-                print(f"[error:vectorize-loop] {e}"); traceback.print_exc(); raise
+                logger.exception("vectorize loop: %s", e); raise
 
         # --- B) Actualizar PROMPT (solo si viene y no está vacío) ---
         if prompt is not None and prompt.strip():
             try:
                 self._saveinfo.save_prompt_client(client_id=client_id, agent_id=agent_id, prompt=prompt.strip())
                 prompt_updated = True
+                # Invalidación local inmediata; los demás procesos se enteran por NOTIFY
+                if self._prompt_cache is not None:
+                    self._prompt_cache.invalidate(client_id, agent_id)
             except Exception as e:
-                print(f"[error:saveinfo:prompt] {e}"); traceback.print_exc(); raise
+                metrics.count_error("ingest_prompt")
+                logger.exception("saveinfo prompt: %s", e); raise
+
+        logger.info(
+            "ingest done client=%s agent=%s indexed_chunks=%s unchanged_chunks=%s deleted_chunks=%s prompt_updated=%s",
+            client_id, agent_id, indexed_total, len(unchanged), deleted_total, prompt_updated,
+            extra={"client_id": client_id, "agent_id": agent_id, "indexed_chunks": indexed_total},
+        )
+        return {
+            "indexed_chunks": indexed_total,
+            "unchanged_chunks": len(unchanged),
+            "deleted_chunks": deleted_total,
+            "prompt_updated": prompt_updated,
+            "embedding_cache_hits": stats.cache_hits,
+            "embedding_cache_hit_ratio": round(stats.cache_hit_ratio(), 4),
+        }
 
-        print(f"=== END (indexed_chunks={indexed_total}, prompt_updated={prompt_updated}) ===")
-        return {"indexed_chunks": indexed_total, "prompt_updated": prompt_updated}
+    def delete_document(self, *, client_id: str, agent_id: str, doc_id: str, collection: Optional[str] = None) -> int:
+        """Borra del índice todos los chunks de un documento. Devuelve cuántos se borraron."""
+        metrics.set_tenant(client_id, agent_id)
+        target = collection or ingest_collection(client_id)
+        with metrics.stage("ingest_delete"), self._doc_lock(client_id, agent_id, doc_id):
+            deleted = self._vectors.delete_by_filter(target, {"client_id": client_id, "agent_id": agent_id, "doc_id": doc_id})
+        logger.info("document deleted client=%s agent=%s doc_id=%s chunks=%s", client_id, agent_id, doc_id, deleted)
+        return deleted
@@ -0,0 +1,80 @@
+# app/application/prompt_cache.py
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.core.domain.models import AgentProfile
+
+_Key = Tuple[str, str]
+
+
+class PromptCache:
+    """
+    Caché de perfiles de agente (prompt + ajustes + versión) compartida por todo el proceso.
+
+    Mientras el listener de cambios (LISTEN/NOTIFY) está conectado, las entradas no caducan:
+    solo se invalidan cuando llega un aviso, así la ruta caliente no paga ningún round-trip.
+    Si el listener no está conectado (arranque, caída de la conexión, repositorio sin
+    notificaciones) se vuelve a un TTL de seguridad `fallback_ttl`.
+
+    Para evitar guardar un valor leído antes de una invalidación, cada clave tiene una
+    generación: `generation()` se toma antes de leer y `put` descarta el valor si cambió.
+    """
+
+    def __init__(self, fallback_ttl: float = 60.0) -> None:
+        self._entries: Dict[_Key, Tuple[AgentProfile, float]] = {}
+        self._generations: Dict[_Key, int] = {}
+        self._epoch = 0
+        self._fallback_ttl = fallback_ttl
+        self._lock = threading.Lock()
+        self.listening = False
+        self.invalidations = 0
+
+    def get(self, client_id: str, agent_id: str) -> Optional[AgentProfile]:
+        entry = self._entries.get((client_id, agent_id))
+        if entry is None:
+            return None
+        profile, stored_at = entry
+        if not self.listening and time.monotonic() - stored_at > self._fallback_ttl:
+            return None
+        return profile
+
+    def generation(self, client_id: str, agent_id: str) -> Tuple[int, int]:
+        with self._lock:
+            return self._epoch, self._generations.get((client_id, agent_id), 0)
+
+    def put(self, client_id: str, agent_id: str, profile: AgentProfile, generation: Tuple[int, int]) -> None:
+        key = (client_id, agent_id)
+        with self._lock:
+            if (self._epoch, self._generations.get(key, 0)) != generation:
+                return  # se invalidó mientras se leía: no guardar un valor posiblemente viejo
+            self._entries[key] = (profile, time.monotonic())
+
+    def invalidate(self, client_id: str, agent_id: str) -> None:
+        key = (client_id, agent_id)
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._generations.clear()
+            self._entries.clear()
+            self.invalidations += 1
+
+    # ---------------- PromptChangeListener ----------------
+    def on_connected(self) -> None:
+        # Lo cacheado antes de conectar pudo perderse avisos: se descarta
+        self.invalidate_all()
+        self.listening = True
+
+    def on_disconnected(self) -> None:
+        self.listening = False
+
+    def on_change(self, client_id: str, agent_id: str) -> None:
+        self.invalidate(client_id, agent_id)
+
+    def stats(self) -> Dict[str, object]:
+        return {"entries": len(self._entries), "listening": self.listening, "invalidations": self.invalidations}
@@ -0,0 +1,91 @@
+# app/application/reranker.py
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def _setting(settings: Dict[str, Any], key: str, default: Optional[float]) -> Optional[float]:
+    try:
+        value = settings.get(key)
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+class Reranker:
+    """
+    Etapa posterior a la búsqueda vectorial:
+      1. se piden `fetch_factor * top_k` candidatos (con sus vectores);
+      2. se descartan los que no llegan a `min_score` (por agente: agents.settings.min_score);
+      3. se eligen `top_k` con Maximal Marginal Relevance: en cada paso el candidato que maximiza
+         λ·score − (1−λ)·máx. similitud con los ya elegidos (agents.settings.mmr_lambda; 1 = solo score).
+    Así el LLM recibe menos chunks, más relevantes y sin casi-duplicados.
+    """
+
+    def __init__(
+        self,
+        fetch_factor: int = 4,
+        max_fetch: int = 50,
+        min_score: Optional[float] = None,
+        mmr_lambda: float = 0.7,
+    ) -> None:
+        self._fetch_factor = max(1, fetch_factor)
+        self._max_fetch = max_fetch
+        self._min_score = min_score
+        self._lambda = mmr_lambda
+
+    @classmethod
+    def from_env(cls) -> "Reranker":
+        min_score = os.getenv("RERANK_MIN_SCORE")
+        return cls(
+            fetch_factor=int(os.getenv("RERANK_FETCH_FACTOR", "4")),
+            max_fetch=int(os.getenv("RERANK_MAX_FETCH", "50")),
+            min_score=float(min_score) if min_score else None,
+            mmr_lambda=float(os.getenv("RERANK_MMR_LAMBDA", "0.7")),
+        )
+
+    def fetch_k(self, top_k: int) -> int:
+        """Candidatos a pedir al índice para quedarse luego con `top_k`."""
+        return max(top_k, min(top_k * self._fetch_factor, self._max_fetch))
+
+    def rerank(self, matches: List[Dict[str, Any]], top_k: int, settings: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        settings = settings or {}
+        min_score = _setting(settings, "min_score", self._min_score)
+        lam = _setting(settings, "mmr_lambda", self._lambda)
+
+        cands = [m for m in matches if isinstance(m, dict)]
+        if min_score is not None:
+            cands = [m for m in cands if float(m.get("score") or 0.0) >= min_score]
+        if not cands:
+            return []
+
+        vectors = [m.get("vector") for m in cands]
+        if lam >= 1.0 or len(cands) <= 1 or any(v is None for v in vectors):
+            # sin vectores (o λ=1) no hay diversidad que calcular: top_k por score
+            chosen = sorted(cands, key=lambda m: float(m.get("score") or 0.0), reverse=True)[:top_k]
+        else:
+            chosen = [cands[i] for i in self._mmr(cands, vectors, top_k, lam)]
+        # el vector solo hacía falta aquí; no viaja al packer ni al LLM
+        return [{k: v for k, v in m.items() if k != "vector"} for m in chosen]
+
+    @staticmethod
+    def _mmr(cands: List[Dict[str, Any]], vectors: List[Any], top_k: int, lam: float) -> List[int]:
+        scores = np.asarray([float(m.get("score") or 0.0) for m in cands], dtype=np.float32)
+        emb = np.asarray(vectors, dtype=np.float32)
+        emb /= np.clip(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12, None)
+        sim = emb @ emb.T
+
+        k = min(top_k, len(cands))
+        selected = [int(np.argmax(scores))]
+        max_sim = sim[selected[0]].copy()
+        taken = np.zeros(len(cands), dtype=bool)
+        taken[selected[0]] = True
+        while len(selected) < k:
+            mmr = lam * scores - (1.0 - lam) * max_sim
+            mmr[taken] = -np.inf
+            j = int(np.argmax(mmr))
+            selected.append(j)
+            taken[j] = True
+            np.maximum(max_sim, sim[j], out=max_sim)
+        return selected
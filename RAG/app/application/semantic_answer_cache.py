@@ -0,0 +1,144 @@
+# app/application/semantic_answer_cache.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def prompt_version(system_prompt: Optional[str]) -> str:
+    # Versión del prompt derivada de su contenido: si el prompt cambia, las respuestas viejas no aplican
+    return hashlib.sha1((system_prompt or "").encode("utf-8")).hexdigest()[:16]
+
+
+class _Bucket:
+    __slots__ = ("vectors", "answers", "expires")
+
+    def __init__(self, dim: int) -> None:
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.answers: List[str] = []
+        self.expires: List[float] = []
+
+
+class SemanticAnswerCache:
+    """
+    Caché de respuestas por agente: reutiliza una respuesta si el embedding de la nueva pregunta
+    tiene similitud coseno >= threshold con una pregunta ya respondida bajo la misma clave
+    (client_id, agent_id, versión del prompt, ids de chunks recuperados).
+    Tamaño acotado: LRU de claves con un máximo de entradas totales y por clave.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_entries: int = 5000,
+        max_per_key: int = 32,
+        ttl_seconds: float = 6 * 3600,
+    ) -> None:
+        self._threshold = threshold
+        self._max_entries = max_entries
+        self._max_per_key = max_per_key
+        self._ttl = ttl_seconds
+        self._buckets: "OrderedDict[Hashable, _Bucket]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "SemanticAnswerCache":
+        return cls(
+            threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+            max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000")),
+            max_per_key=int(os.getenv("ANSWER_CACHE_MAX_PER_KEY", "32")),
+            ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(6 * 3600))),
+        )
+
+    @staticmethod
+    def make_key(client_id: str, agent_id: str, version: str, matches: Sequence[Dict[str, Any]]) -> Tuple:
+        chunk_ids = tuple(sorted(str(m.get("id", "")) for m in matches if isinstance(m, dict)))
+        return (client_id, agent_id, version, chunk_ids)
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm > 0 else v
+
+    def lookup(self, key: Hashable, query_vec: Sequence[float]) -> Optional[str]:
+        q = self._unit(query_vec)
+        now = time.time()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket = self._prune(key, bucket, now)
+            if bucket is None or bucket.vectors.shape[1] != q.shape[0]:
+                self.misses += 1
+                return None
+            sims = bucket.vectors @ q
+            best = int(np.argmax(sims))
+            if sims[best] >= self._threshold:
+                self._buckets.move_to_end(key)
+                self.hits += 1
+                return bucket.answers[best]
+            self.misses += 1
+            return None
+
+    def _prune(self, key: Hashable, bucket: _Bucket, now: float) -> Optional[_Bucket]:
+        # Las entradas vencidas se descartan antes del argmax: una vencida más parecida no debe
+        # ocultar a una vigente que también supera el umbral. Una clave sin entradas se elimina.
+        live = np.asarray(bucket.expires, dtype=np.float64) >= now
+        if live.all():
+            return bucket if bucket.answers else None
+        self._size -= int((~live).sum())
+        if not live.any():
+            del self._buckets[key]
+            return None
+        bucket.vectors = bucket.vectors[live]
+        bucket.answers = [a for a, ok in zip(bucket.answers, live) if ok]
+        bucket.expires = [e for e, ok in zip(bucket.expires, live) if ok]
+        return bucket
+
+    def store(self, key: Hashable, query_vec: Sequence[float], answer: str) -> None:
+        q = self._unit(query_vec)
+        now = time.time()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket = self._prune(key, bucket, now)
+            if bucket is None or bucket.vectors.shape[1] != q.shape[0]:
+                if bucket is not None:
+                    self._size -= len(bucket.answers)
+                bucket = _Bucket(q.shape[0])
+                self._buckets[key] = bucket
+            self._buckets.move_to_end(key)
+
+            bucket.vectors = np.vstack([bucket.vectors, q[None, :]])
+            bucket.answers.append(answer)
+            bucket.expires.append(now + self._ttl)
+            self._size += 1
+            if len(bucket.answers) > self._max_per_key:
+                # descarta la entrada más antigua de la clave
+                bucket.vectors = bucket.vectors[1:]
+                bucket.answers.pop(0)
+                bucket.expires.pop(0)
+                self._size -= 1
+
+            # expulsa las claves menos usadas hasta respetar el límite global
+            while self._size > self._max_entries and len(self._buckets) > 1:
+                _, old = self._buckets.popitem(last=False)
+                self._size -= len(old.answers)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+                "entries": self._size,
+                "keys": len(self._buckets),
+            }
@@ -0,0 +1,52 @@
+# app/application/single_flight.py
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalescencia de trabajo idéntico en curso: si llega una llamada con una clave que ya se está
+    resolviendo, espera el mismo futuro en lugar de repetir el trabajo (consulta a Postgres,
+    embedding, llamada al LLM). No es una caché: la clave desaparece en cuanto termina.
+
+    El trabajo corre en su propia tarea; si el request que lo inició se cancela (el cliente corta),
+    los demás que esperan la misma clave siguen recibiendo el resultado.
+    La clave debe empezar por un "tipo" (p. ej. ("embed", ...)) para los contadores.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self.calls: Counter = Counter()
+        self.saved: Counter = Counter()
+
+    @staticmethod
+    def _kind(key: Hashable) -> str:
+        return str(key[0]) if isinstance(key, tuple) and key else "default"
+
+    def _done(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # marca la excepción como recuperada aunque nadie quede esperando
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        kind = self._kind(key)
+        self.calls[kind] += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.saved[kind] += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "calls": dict(self.calls),
+            "saved": dict(self.saved),
+        }
@@ -0,0 +1,63 @@
+# app/application/token_counter.py
+"""
+Conteo de tokens con el tokenizer del modelo destino (tiktoken).
+Si tiktoken no está instalado o no puede cargar el BPE (p. ej. entorno sin red), se usa una
+estimación de ~4 caracteres por token, suficiente para presupuestos aproximados.
+"""
+import logging
+from functools import lru_cache
+from typing import Any, Optional
+
+try:
+    import tiktoken
+except Exception:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+_CHARS_PER_TOKEN = 4
+_DEFAULT_ENCODING = "o200k_base"
+
+
+@lru_cache(maxsize=16)
+def _encoding(model: Optional[str]) -> Any:
+    if tiktoken is None:
+        return None
+    try:
+        if model:
+            try:
+                return tiktoken.encoding_for_model(model)
+            except KeyError:
+                pass
+        return tiktoken.get_encoding(_DEFAULT_ENCODING)
+    except Exception as e:
+        logger.warning("tiktoken no disponible para model=%s: %s; usando estimación", model, e)
+        return None
+
+
+def preload(*models: Optional[str]) -> None:
+    """Carga los BPE de antemano: la primera carga lee (o descarga) el archivo y no debe ocurrir en el event loop."""
+    for model in dict.fromkeys(models):
+        _encoding(model)
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    if not text:
+        return 0
+    enc = _encoding(model)
+    if enc is None:
+        return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Recorta `text` para que no supere `max_tokens`."""
+    if max_tokens <= 0 or not text:
+        return ""
+    enc = _encoding(model)
+    if enc is None:
+        return text[: max_tokens * _CHARS_PER_TOKEN]
+    tokens = enc.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return enc.decode(tokens[:max_tokens])
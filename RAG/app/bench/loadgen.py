@@ -0,0 +1,444 @@
+# app/bench/loadgen.py
+"""
+Generador de carga para /message/response, /message/stream y /document/upload a concurrencia fija,
+con reporte JSON comparable (p50/p90/p99, rps, errores por operación y nivel de concurrencia).
+
+Dos modos:
+  - En proceso (por defecto): la app FastAPI real con BenchContainer (stubs de app/bench/stubs.py
+    con latencias simuladas) servida vía httpx.ASGITransport, sin red ni servicios externos. El
+    reporte incluye además la media por etapa (histogramas de app.core.metrics); la cola de ingesta
+    es la de memoria con --ingest-workers workers en el mismo proceso.
+  - --url http://host:puerto: contra un servicio desplegado (p. ej. con OPENAI_BASE_URL apuntando a
+    app.bench.openai_stub).
+
+La operación "ingest" mide de extremo a extremo: sube el PDF y consulta /document/jobs/{id} hasta
+que el trabajo termina (incluye la espera en cola).
+
+Uso (desde RAG/):
+    python -m app.bench.loadgen --label before --concurrency 1,8,32 --duration 20 --mix chat=0.8,stream=0.1,ingest=0.1
+    python -m app.bench.loadgen --label after ... && python -m app.bench.report bench_reports/before.json bench_reports/after.json
+    # adaptadores OpenAI reales contra el servidor falso lanzado en proceso:
+    python -m app.bench.loadgen --openai-stub --llm-latency 800:200
+
+Con --seed fija, el orden de operaciones, clientes y preguntas es el mismo en cada corrida.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.bench import report
+from app.bench.stubs import (
+    LatencyVectorAdapter,
+    Latency,
+    StubClientRepository,
+    StubEmbeddingAdapter,
+    StubLLMAdapter,
+    StubStorageAdapter,
+)
+from app.core.domain.ports.embedding_port import EmbeddingPort
+from app.infrastructure.adapters.bounded_chat_memory_adapter import BoundedChatMemoryAdapter
+from app.infrastructure.adapters.inmemory_ingestion_job_adapter import InMemoryIngestionJobAdapter
+from app.infrastructure.adapters.langchain_chunking_adapter import LangChainChunkingAdapter
+from app.infrastructure.adapters.llm_adapter import OpenAILLMAdapter
+from app.infrastructure.adapters.mmap_embedding_store_adapter import MmapEmbeddingStoreAdapter
+from app.infrastructure.adapters.numpy_vector_adapter import NumpyVectorAdapter
+from app.main.container import AppContainer
+
+OPS = ("chat", "stream", "ingest")
+
+_TOPICS = [
+    ("envíos", "El envío estándar tarda de tres a cinco días hábiles y el exprés llega al día siguiente en capitales."),
+    ("devoluciones", "Las devoluciones se aceptan durante treinta días con el ticket y el producto sin usar."),
+    ("pagos", "Aceptamos tarjeta de crédito, débito, transferencia y pago contra entrega en pedidos menores a cien dólares."),
+    ("garantía", "La garantía cubre defectos de fábrica durante un año y no incluye daños por mal uso."),
+    ("horarios", "La tienda abre de lunes a sábado de nueve a siete y los domingos de diez a dos."),
+    ("facturas", "La factura electrónica se envía al correo registrado dentro de las veinticuatro horas."),
+    ("cuenta", "Para cambiar la contraseña entra en tu perfil, pulsa seguridad y sigue el enlace del correo."),
+    ("promociones", "Los cupones de descuento no son acumulables y vencen al final del mes de emisión."),
+]
+_QUESTIONS = [
+    "¿Cuánto tarda el envío exprés?", "¿Puedo devolver un producto usado?", "¿Qué medios de pago aceptan?",
+    "¿Qué cubre la garantía?", "¿A qué hora abren los domingos?", "¿Cuándo llega la factura?",
+    "¿Cómo cambio mi contraseña?", "¿Puedo usar dos cupones a la vez?", "¿Hacen envíos al día siguiente?",
+    "¿Aceptan pago contra entrega?",
+]
+
+
+@dataclass
+class Workload:
+    mix: Dict[str, float]
+    clients: int = 4
+    agents_per_client: int = 2
+    sessions: int = 200
+    doc_pages: int = 4
+    paragraphs_per_page: int = 12
+    seed: int = 7
+
+
+@dataclass
+class StubLatencies:
+    llm: Latency = field(default_factory=lambda: Latency(800, 200))
+    embed: Latency = field(default_factory=lambda: Latency(60, 20))
+    vector: Latency = field(default_factory=lambda: Latency(8, 3))
+    db: Latency = field(default_factory=lambda: Latency(3, 1))
+    storage: Latency = field(default_factory=lambda: Latency(10, 4))
+
+
+def make_pdf(pages: List[str]) -> bytes:
+    """PDF mínimo (Helvetica, una línea por párrafo) que pypdf sabe leer; evita depender de ficheros de prueba."""
+    objs: List[bytes] = []
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objs.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objs.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    font_ref = 3 + 2 * len(pages)
+    for i, text in enumerate(pages):
+        lines = []
+        for j, line in enumerate(text.split("\n")):
+            safe = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            lines.append(f"BT /F1 9 Tf 30 {800 - 14 * j} Td ({safe}) Tj ET")
+        stream = "\n".join(lines).encode("latin-1", "replace")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents {4 + 2 * i} 0 R /Resources << /Font << /F1 {font_ref} 0 R >> >> >>".encode())
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objs.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += f"{n} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def make_document(rng: random.Random, pages: int, paragraphs: int) -> bytes:
+    page_texts = []
+    for _ in range(pages):
+        paras = []
+        for _ in range(paragraphs):
+            topic, sentence = rng.choice(_TOPICS)
+            paras.append(f"{topic.capitalize()}: {sentence} Referencia {rng.randint(1000, 9999)}.")
+        page_texts.append("\n".join(paras))
+    return make_pdf(page_texts)
+
+
+class BenchContainer(AppContainer):
+    """AppContainer con adaptadores falsos: mismos servicios, cachés y routers que en producción."""
+
+    def __init__(
+        self,
+        latencies: StubLatencies,
+        openai_base_url: Optional[str] = None,
+        embed_dimensions: int = 3072,
+        ingest_workers: int = 2,
+    ) -> None:
+        super().__init__()
+        self._latencies = latencies
+        self._ingest_workers = ingest_workers
+        self._openai_base_url = openai_base_url
+        self._embed_dimensions = embed_dimensions
+        self._vector_dir = tempfile.mkdtemp(prefix="rag-bench-vectors-")
+
+    def _build_embedder(self, name: str) -> EmbeddingPort:
+        # "openai" sin servidor falso: hashing con la latencia de la API (y la caché de consultas como en producción)
+        if name == "openai" and not self._openai_base_url:
+            return StubEmbeddingAdapter(dimensions=self._embed_dimensions, latency=self._latencies.embed)
+        return AppContainer._build_embedder(name)
+
+    async def startup(self) -> None:
+        lat = self._latencies
+        self.llm = OpenAILLMAdapter() if self._openai_base_url else StubLLMAdapter(latency=lat.llm)
+        self._build_embedders()
+        self.vector = LatencyVectorAdapter(NumpyVectorAdapter(root=self._vector_dir), latency=lat.vector)
+        self.repository = StubClientRepository(latency=lat.db)
+        self.storage = StubStorageAdapter(latency=lat.storage)
+        self.chunking = LangChainChunkingAdapter()
+        self.chat_memory = BoundedChatMemoryAdapter.from_env()
+        self.jobs = InMemoryIngestionJobAdapter()
+        if os.getenv("CHUNK_EMBED_CACHE_BACKEND", "mmap").strip().lower() != "none":
+            self.chunk_embeddings = MmapEmbeddingStoreAdapter(root=os.path.join(self._vector_dir, "chunk-embeddings"))
+        self._build_services()
+        await self.preload_tokenizers()
+        self.start_ingestion_workers(self._ingest_workers)
+
+    async def shutdown(self) -> None:
+        await super().shutdown()
+        shutil.rmtree(self._vector_dir, ignore_errors=True)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_openai_stub(llm: Latency, embed: Latency, embed_dimensions: int) -> str:
+    """Levanta app.bench.openai_stub en un hilo y devuelve su base_url."""
+    import uvicorn
+
+    from app.bench.openai_stub import create_app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(llm_latency=llm, embed_latency=embed, embed_dimensions=embed_dimensions),
+        host="127.0.0.1", port=port, log_level="warning",
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("el servidor OpenAI falso no arrancó")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/v1"
+
+
+class LoadGenerator:
+    def __init__(self, client: httpx.AsyncClient, workload: Workload, job_poll: float = 0.02) -> None:
+        self._client = client
+        self._w = workload
+        self._job_poll = job_poll
+        ops, weights = zip(*[(op, w) for op, w in workload.mix.items() if w > 0])
+        self._ops, self._weights = list(ops), list(weights)
+
+    def _tenant(self, rng: random.Random) -> Tuple[str, str]:
+        c = rng.randrange(self._w.clients)
+        a = rng.randrange(self._w.agents_per_client)
+        return f"bench-c{c}", f"bench-a{a}"
+
+    async def _chat(self, rng: random.Random, stream: bool) -> None:
+        client_id, agent_id = self._tenant(rng)
+        body = {
+            "message": rng.choice(_QUESTIONS),
+            "client_id": client_id,
+            "agent_id": agent_id,
+            "timestamp": str(int(time.time())),
+            "cel_id": str(rng.randrange(self._w.sessions)),
+        }
+        if not stream:
+            resp = await self._client.post("/message/response", json=body)
+            resp.raise_for_status()
+            return
+        async with self._client.stream("POST", "/message/stream", json=body) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if line.startswith("event: error"):
+                    raise RuntimeError("stream error event")
+
+    async def _ingest(
+        self, rng: random.Random, client_id: Optional[str] = None, agent_id: Optional[str] = None, file_name: Optional[str] = None
+    ) -> None:
+        if client_id is None:
+            client_id, agent_id = self._tenant(rng)
+        pdf = make_document(rng, self._w.doc_pages, self._w.paragraphs_per_page)
+        # un nombre distinto por subida: cada ingesta es un documento nuevo, no un re-indexado
+        file_name = file_name or f"bench-{rng.getrandbits(48):012x}.pdf"
+        resp = await self._client.post(
+            "/document/upload",
+            data={"client_id": client_id, "agent_id": agent_id, "token_auth": "bench"},
+            files={"file": (file_name, pdf, "application/pdf")},
+        )
+        resp.raise_for_status()
+        job_id = resp.json()["job_id"]
+        while True:
+            await asyncio.sleep(self._job_poll)
+            status = await self._client.get(f"/document/jobs/{job_id}")
+            status.raise_for_status()
+            job = status.json()
+            if job["status"] == "done":
+                return
+            if job["status"] == "dead":
+                raise RuntimeError(f"ingestion job dead: {job['last_error']}")
+
+    async def seed(self) -> None:
+        # un documento por agente antes de medir, para que las consultas encuentren contexto
+        rng = random.Random(self._w.seed)
+        for c in range(self._w.clients):
+            for a in range(self._w.agents_per_client):
+                await self._ingest(rng, f"bench-c{c}", f"bench-a{a}", "seed.pdf")
+
+    async def run_level(self, concurrency: int, duration: float, warmup: float) -> Dict[str, Any]:
+        samples: Dict[str, List[float]] = {op: [] for op in self._ops}
+        errors: Dict[str, int] = {op: 0 for op in self._ops}
+        error_examples: Dict[str, str] = {}
+        start = time.perf_counter()
+        measure_from = start + warmup
+        stop_at = measure_from + duration
+
+        async def worker(idx: int) -> None:
+            rng = random.Random(self._w.seed * 1000 + concurrency * 10 + idx)
+            while True:
+                t0 = time.perf_counter()
+                if t0 >= stop_at:
+                    return
+                op = rng.choices(self._ops, self._weights)[0]
+                ok = True
+                try:
+                    if op == "ingest":
+                        await self._ingest(rng)
+                    else:
+                        await self._chat(rng, stream=(op == "stream"))
+                except Exception as e:
+                    ok = False
+                    error_examples.setdefault(op, f"{type(e).__name__}: {e}"[:300])
+                t1 = time.perf_counter()
+                # solo cuentan las peticiones que empiezan y terminan dentro de la ventana de medida
+                if t0 >= measure_from and t1 <= stop_at:
+                    if ok:
+                        samples[op].append(t1 - t0)
+                    else:
+                        errors[op] += 1
+
+        stages_before = report.stage_snapshot()
+        await asyncio.gather(*[worker(i) for i in range(concurrency)])
+        all_lat = [v for op in self._ops for v in samples[op]]
+        return {
+            "concurrency": concurrency,
+            "duration_s": duration,
+            "ops": {op: report.summarize(samples[op], errors[op], duration) for op in self._ops},
+            "total": report.summarize(all_lat, sum(errors.values()), duration),
+            "stages": report.stage_delta(stages_before, report.stage_snapshot()),
+            "error_examples": error_examples,
+        }
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in spec.split(","):
+        op, _, weight = part.partition("=")
+        op = op.strip()
+        if op not in OPS:
+            raise argparse.ArgumentTypeError(f"operación desconocida '{op}' (válidas: {', '.join(OPS)})")
+        mix[op] = float(weight or 1)
+    if not any(w > 0 for w in mix.values()):
+        raise argparse.ArgumentTypeError("el mix necesita al menos una operación con peso > 0")
+    return mix
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    workload = Workload(
+        mix=args.mix,
+        clients=args.clients,
+        agents_per_client=args.agents,
+        sessions=args.sessions,
+        doc_pages=args.doc_pages,
+        seed=args.seed,
+    )
+    latencies = StubLatencies(
+        llm=Latency.parse(args.llm_latency),
+        embed=Latency.parse(args.embed_latency),
+        vector=Latency.parse(args.vector_latency),
+        db=Latency.parse(args.db_latency),
+        storage=Latency.parse(args.storage_latency),
+    )
+    container: Optional[BenchContainer] = None
+    if args.url:
+        target = args.url
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=httpx.Limits(max_connections=max(args.concurrency) + 8))
+    else:
+        target = "inproc"
+        # la caché de embeddings en disco sobreviviría entre corridas y falsearía la comparación
+        os.environ.pop("EMBED_CACHE_DISK_PATH", None)
+        base_url = None
+        if args.openai_stub:
+            base_url = start_openai_stub(latencies.llm, latencies.embed, args.embed_dimensions)
+            os.environ["OPENAI_BASE_URL"] = base_url
+            os.environ.setdefault("OPENAI_API_KEY", "bench")
+        # los INFO por ingesta del servicio ensucian la salida; LOG_LEVEL explícito manda
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        from app.main.main import app
+
+        container = BenchContainer(
+            latencies,
+            openai_base_url=base_url,
+            embed_dimensions=args.embed_dimensions,
+            ingest_workers=args.ingest_workers,
+        )
+        await container.startup()
+        app.state.container = container
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=args.timeout)
+
+    gen = LoadGenerator(client, workload, job_poll=args.job_poll)
+    levels = []
+    try:
+        if not args.no_seed:
+            await gen.seed()
+        for c in args.concurrency:
+            level = await gen.run_level(c, args.duration, args.warmup)
+            t = level["total"]
+            print(f"concurrency={c} rps={t['rps']} p50={t['latency_ms']['p50']}ms p99={t['latency_ms']['p99']}ms errors={t['errors']}")
+            levels.append(level)
+    finally:
+        await client.aclose()
+        if container is not None:
+            await container.shutdown()
+
+    return {
+        "label": args.label,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": report.git_commit(),
+        "target": target,
+        "config": {
+            "workload": asdict(workload),
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "stub_latencies_ms": asdict(latencies) if target == "inproc" else None,
+            "openai_stub": bool(args.openai_stub),
+            "ingest_workers": args.ingest_workers if target == "inproc" else None,
+        },
+        "env": report.env_snapshot(),
+        "levels": levels,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Carga mixta chat/ingesta a concurrencia fija con reporte JSON")
+    parser.add_argument("--label", default="run", help="nombre de la corrida (y del fichero de reporte)")
+    parser.add_argument("--out", default=None, help="ruta del reporte (por defecto bench_reports/<label>.json)")
+    parser.add_argument("--url", default=None, help="servicio desplegado; sin él, la app corre en proceso con stubs")
+    parser.add_argument("--concurrency", type=lambda s: [int(x) for x in s.split(",")], default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=20.0, help="segundos medidos por nivel")
+    parser.add_argument("--warmup", type=float, default=3.0, help="segundos por nivel que no cuentan")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("chat=0.8,stream=0.1,ingest=0.1"))
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--agents", type=int, default=2)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--doc-pages", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-seed", action="store_true", help="no indexar un documento por agente antes de medir")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--job-poll", type=float, default=0.02, help="segundos entre consultas del estado de un trabajo de ingesta")
+    parser.add_argument("--ingest-workers", type=int, default=2, help="workers de ingesta en proceso")
+    # latencias simuladas (ms "base:jitter"), solo en proceso
+    parser.add_argument("--llm-latency", default="800:200")
+    parser.add_argument("--embed-latency", default="60:20")
+    parser.add_argument("--vector-latency", default="8:3")
+    parser.add_argument("--db-latency", default="3:1")
+    parser.add_argument("--storage-latency", default="10:4")
+    parser.add_argument("--embed-dimensions", type=int, default=3072)
+    parser.add_argument("--openai-stub", action="store_true", help="adaptadores OpenAI reales contra el servidor falso en proceso")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    out = args.out or os.path.join("bench_reports", f"{args.label}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"report -> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# app/bench/openai_stub.py
+"""
+Servidor compatible con la API de OpenAI para benchmarks: responde /v1/embeddings y /v1/responses
+(con y sin streaming SSE) con latencia configurable y sin coste. Así se puede medir el servicio
+con los adaptadores reales de OpenAI (cliente HTTP, serialización, pools) apuntando aquí.
+
+Uso (desde RAG/):
+    python -m app.bench.openai_stub --port 8900 --llm-latency 800:200 --embed-latency 60:20
+    # en el servicio a medir:
+    OPENAI_BASE_URL=http://localhost:8900/v1 OPENAI_API_KEY=stub uvicorn app.main.main:app
+
+Latencias en ms como "base:jitter". En streaming la latencia del LLM se reparte entre los trozos:
+el primero llega tras `--ttft` ms.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.bench.stubs import Latency
+from app.infrastructure.adapters.hashing_embedding_adapter import HashingEmbeddingAdapter
+
+
+def _usage_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _input_text(payload: Any) -> str:
+    if isinstance(payload, str):
+        return payload
+    parts: List[str] = []
+    for m in payload or []:
+        content = m.get("content") if isinstance(m, dict) else None
+        if isinstance(content, str):
+            parts.append(content)
+    return "\n".join(parts)
+
+
+def create_app(
+    llm_latency: Latency = Latency(800, 200),
+    ttft: Latency = Latency(250, 50),
+    embed_latency: Latency = Latency(60, 20),
+    answer_words: int = 60,
+    stream_chunks: int = 20,
+    embed_dimensions: int = 3072,
+) -> FastAPI:
+    app = FastAPI(title="OpenAI stub")
+    hasher = HashingEmbeddingAdapter(dimensions=embed_dimensions)
+    stats: Dict[str, int] = {"embeddings": 0, "embedding_inputs": 0, "responses": 0, "streams": 0}
+
+    def answer_text(prompt: str) -> str:
+        return f"[stub prompt_chars={len(prompt)}] " + " ".join(["respuesta"] * answer_words)
+
+    def response_body(model: str, text: str, prompt: str) -> Dict[str, Any]:
+        return {
+            "id": f"resp_{uuid.uuid4().hex}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": "completed",
+            "model": model,
+            "output": [{
+                "type": "message",
+                "id": f"msg_{uuid.uuid4().hex}",
+                "status": "completed",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": _usage_tokens(prompt),
+                "output_tokens": _usage_tokens(text),
+                "total_tokens": _usage_tokens(prompt) + _usage_tokens(text),
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens_details": {"reasoning_tokens": 0},
+            },
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request) -> JSONResponse:
+        body = await request.json()
+        inputs = body.get("input")
+        texts = [inputs] if isinstance(inputs, str) else list(inputs or [])
+        stats["embeddings"] += 1
+        stats["embedding_inputs"] += len(texts)
+        await embed_latency.asleep()
+        vectors = hasher.create_embeddings(texts, dimensions=body.get("dimensions"))
+        return JSONResponse({
+            "object": "list",
+            "model": body.get("model", "stub"),
+            "data": [{"object": "embedding", "index": i, "embedding": v} for i, v in enumerate(vectors)],
+            "usage": {"prompt_tokens": sum(map(_usage_tokens, texts)), "total_tokens": sum(map(_usage_tokens, texts))},
+        })
+
+    @app.post("/v1/responses")
+    async def responses(request: Request):
+        body = await request.json()
+        model = body.get("model", "stub")
+        prompt = _input_text(body.get("input"))
+        text = answer_text(prompt)
+        if not body.get("stream"):
+            stats["responses"] += 1
+            await llm_latency.asleep()
+            return JSONResponse(response_body(model, text, prompt))
+
+        stats["streams"] += 1
+
+        async def events() -> AsyncIterator[str]:
+            resp = response_body(model, text, prompt)
+            seq = 0
+
+            def sse(event: Dict[str, Any]) -> str:
+                nonlocal seq
+                event["sequence_number"] = seq
+                seq += 1
+                return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+            yield sse({"type": "response.created", "response": {**resp, "status": "in_progress", "output": []}})
+            await ttft.asleep()
+            step = max(1, len(text) // max(1, stream_chunks))
+            rest = max(0.0, llm_latency.seconds() - ttft.base_ms / 1000.0) / max(1, stream_chunks)
+            item_id = resp["output"][0]["id"]
+            for i in range(0, len(text), step):
+                if i:
+                    await asyncio.sleep(rest)
+                yield sse({
+                    "type": "response.output_text.delta",
+                    "item_id": item_id,
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": text[i:i + step],
+                    "logprobs": [],
+                })
+            yield sse({"type": "response.completed", "response": resp})
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    def get_stats() -> Dict[str, int]:
+        return dict(stats)
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servidor OpenAI falso con latencia configurable")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--llm-latency", default="800:200", help="ms base:jitter de una respuesta completa")
+    parser.add_argument("--ttft", default="250:50", help="ms base:jitter hasta el primer token en streaming")
+    parser.add_argument("--embed-latency", default="60:20", help="ms base:jitter por llamada de embeddings")
+    parser.add_argument("--answer-words", type=int, default=60)
+    parser.add_argument("--embed-dimensions", type=int, default=3072)
+    args = parser.parse_args()
+
+    app = create_app(
+        llm_latency=Latency.parse(args.llm_latency),
+        ttft=Latency.parse(args.ttft),
+        embed_latency=Latency.parse(args.embed_latency),
+        answer_words=args.answer_words,
+        embed_dimensions=args.embed_dimensions,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# app/bench/report.py
+"""
+Resumen de latencias de una corrida del generador de carga y comparación entre reportes.
+
+Uso (desde RAG/):
+    python -m app.bench.report before.json after.json
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core import metrics
+
+# Variables de entorno que cambian el comportamiento medido; se guardan en el reporte para comparar
+# solo corridas equivalentes
+ENV_KEYS = (
+    "EMBEDDING_BACKEND", "OPENAI_EMBED_MODEL", "VECTOR_BACKEND", "QDRANT_STORAGE_PROFILE", "QDRANT_COLLECTION_PROFILES",
+    "QDRANT_STORAGE_MODE", "EMBED_CACHE_ENABLED", "ANSWER_CACHE_ENABLED", "RERANK_ENABLED", "CHAT_MEMORY_BACKEND",
+    "HISTORY_SUMMARY_ENABLED", "CONTEXT_TOKEN_BUDGET", "INGEST_EMBED_CONCURRENCY", "INGEST_EMBED_MAX_TOKENS",
+    "INGEST_EMBED_MAX_ITEMS", "CHUNK_EMBED_CACHE_BACKEND", "LOG_LEVEL",
+)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    # interpolación lineal entre rangos (igual que numpy.percentile por defecto)
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q
+    lo, hi = math.floor(pos), math.ceil(pos)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def summarize(latencies_s: List[float], errors: int, elapsed_s: float) -> Dict[str, Any]:
+    values = sorted(v * 1000.0 for v in latencies_s)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed_s, 3) if elapsed_s > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(sum(values) / len(values), 3) if values else 0.0,
+            "p50": round(percentile(values, 0.50), 3),
+            "p90": round(percentile(values, 0.90), 3),
+            "p99": round(percentile(values, 0.99), 3),
+            "max": round(values[-1], 3) if values else 0.0,
+        },
+    }
+
+
+def stage_snapshot() -> Dict[str, Tuple[float, float]]:
+    """(suma de segundos, observaciones) por etapa del histograma rag_stage_duration_seconds."""
+    if not metrics.ENABLED:
+        return {}
+    out: Dict[str, Tuple[float, float]] = {}
+    for family in metrics.STAGE_SECONDS.collect():
+        for sample in family.samples:
+            stage = sample.labels.get("stage")
+            if sample.name.endswith("_sum"):
+                s, c = out.get(stage, (0.0, 0.0))
+                out[stage] = (s + sample.value, c)
+            elif sample.name.endswith("_count"):
+                s, c = out.get(stage, (0.0, 0.0))
+                out[stage] = (s, c + sample.value)
+    return out
+
+
+def stage_delta(before: Dict[str, Tuple[float, float]], after: Dict[str, Tuple[float, float]]) -> Dict[str, Dict[str, float]]:
+    """Media por etapa entre dos instantáneas (solo en modo en proceso: comparten el registro)."""
+    out: Dict[str, Dict[str, float]] = {}
+    for stage, (s1, c1) in after.items():
+        s0, c0 = before.get(stage, (0.0, 0.0))
+        n = c1 - c0
+        if n > 0:
+            out[stage] = {"count": int(n), "mean_ms": round((s1 - s0) / n * 1000.0, 3)}
+    return out
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def env_snapshot() -> Dict[str, str]:
+    return {k: os.environ[k] for k in ENV_KEYS if k in os.environ}
+
+
+def _delta(a: float, b: float) -> str:
+    if not a:
+        return "n/a"
+    return f"{(b - a) / a * 100.0:+.1f}%"
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]) -> List[str]:
+    lines = [f"before: {before.get('label')} ({before.get('git_commit')})  after: {after.get('label')} ({after.get('git_commit')})"]
+    if before.get("config", {}).get("workload") != after.get("config", {}).get("workload"):
+        lines.append("WARNING: workloads differ; numbers are not directly comparable")
+    by_level = {lvl["concurrency"]: lvl for lvl in before.get("levels", [])}
+    header = f"{'conc':>5} {'op':<8} {'rps':>10} {'Δ':>8} {'p50 ms':>10} {'Δ':>8} {'p99 ms':>10} {'Δ':>8} {'err':>5}"
+    lines.append(header)
+    for lvl in after.get("levels", []):
+        old = by_level.get(lvl["concurrency"])
+        if old is None:
+            continue
+        for op, b in lvl["ops"].items():
+            a = old["ops"].get(op)
+            if a is None:
+                continue
+            lines.append(
+                f"{lvl['concurrency']:>5} {op:<8} "
+                f"{b['rps']:>10.2f} {_delta(a['rps'], b['rps']):>8} "
+                f"{b['latency_ms']['p50']:>10.1f} {_delta(a['latency_ms']['p50'], b['latency_ms']['p50']):>8} "
+                f"{b['latency_ms']['p99']:>10.1f} {_delta(a['latency_ms']['p99'], b['latency_ms']['p99']):>8} "
+                f"{b['errors']:>5}"
+            )
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compara dos reportes del generador de carga")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print("\n".join(compare(before, after)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
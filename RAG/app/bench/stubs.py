@@ -0,0 +1,242 @@
+# app/bench/stubs.py
+"""
+Adaptadores falsos para benchmarks sin red ni servicios externos (ni dinero de OpenAI).
+Cada uno implementa un puerto de app/core/domain/ports y simula la latencia del servicio real
+con `Latency` (base + jitter uniforme), para que los números midan el código de este servicio y
+no la variabilidad de OpenAI/Qdrant/Postgres/MinIO.
+
+Puertos sin stub propio:
+  - ChatMemoryPort: BoundedChatMemoryAdapter ya es en memoria.
+  - ChunkingPort: se usa el LangChainChunkingAdapter real (es CPU local y forma parte de lo que se mide).
+  - EmbeddingPort: HashingEmbeddingAdapter (determinista, sin modelo) con latencia añadida.
+  - WorkflowPort: ningún servicio lo usa.
+"""
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.domain.models import AgentProfile
+from app.core.domain.ports.client_repository_port import ClientRepositoryPort
+from app.core.domain.ports.llm_port import LLMPort
+from app.core.domain.ports.storage_port import StoragePort
+from app.core.domain.ports.vector_port import VectorPort
+from app.infrastructure.adapters.hashing_embedding_adapter import HashingEmbeddingAdapter
+
+
+@dataclass(frozen=True)
+class Latency:
+    """Retardo simulado: `base_ms` ± `jitter_ms` (uniforme, nunca negativo)."""
+    base_ms: float = 0.0
+    jitter_ms: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        # "40" o "40:10" (base:jitter, en ms)
+        base, _, jitter = spec.partition(":")
+        return cls(float(base or 0), float(jitter or 0))
+
+    def seconds(self) -> float:
+        ms = self.base_ms + (random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+        return max(0.0, ms) / 1000.0
+
+    def sleep(self) -> None:
+        s = self.seconds()
+        if s:
+            time.sleep(s)
+
+    async def asleep(self) -> None:
+        s = self.seconds()
+        if s:
+            await asyncio.sleep(s)
+
+
+class StubLLMAdapter(LLMPort):
+    """Respuesta fija tras `latency`; en streaming reparte el texto en `stream_chunks` trozos."""
+
+    def __init__(self, latency: Latency = Latency(), answer_words: int = 60, stream_chunks: int = 20, model: str = "gpt-4o-mini") -> None:
+        self._latency = latency
+        self._answer_words = answer_words
+        self._stream_chunks = max(1, stream_chunks)
+        self.model = model
+
+    def _answer(self, prompt: str, context: Optional[List[Dict[str, Any]]]) -> str:
+        words = ["respuesta"] * self._answer_words
+        return f"[stub ctx={len(context or [])}] {prompt[:40]} " + " ".join(words)
+
+    def response(self, prompt: str, context: List[Dict[str, Any]], system_prompt: Optional[str] = None) -> str:
+        self._latency.sleep()
+        return self._answer(prompt, context)
+
+    async def aresponse(self, prompt: str, context: List[Dict[str, Any]], system_prompt: Optional[str] = None) -> str:
+        await self._latency.asleep()
+        return self._answer(prompt, context)
+
+    async def aresponse_with_history(
+        self,
+        prompt: str,
+        history: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        context: Optional[List[Dict[str, Any]]] = None,
+    ) -> str:
+        await self._latency.asleep()
+        return self._answer(prompt, context)
+
+    async def astream_response_with_history(
+        self,
+        prompt: str,
+        history: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        context: Optional[List[Dict[str, Any]]] = None,
+    ) -> AsyncIterator[str]:
+        # la latencia total se reparte entre los trozos (el primero marca el TTFT)
+        text = self._answer(prompt, context)
+        step = max(1, len(text) // self._stream_chunks)
+        total = self._latency.seconds()
+        for i in range(0, len(text), step):
+            await asyncio.sleep(total / self._stream_chunks)
+            yield text[i:i + step]
+
+    async def asummarize(self, previous_summary: Optional[str], messages: List[Dict[str, str]]) -> str:
+        await self._latency.asleep()
+        return f"{previous_summary or ''} +{len(messages)} mensajes".strip()
+
+
+class StubEmbeddingAdapter(HashingEmbeddingAdapter):
+    """Embeddings por hashing (vectores con sentido para la búsqueda) más la latencia de la API."""
+
+    def __init__(self, dimensions: int = 384, latency: Latency = Latency()) -> None:
+        super().__init__(dimensions=dimensions)
+        self._latency = latency
+
+    def create_embeddings(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        self._latency.sleep()
+        return super().create_embeddings(texts, dimensions)
+
+    async def acreate_embeddings(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        await self._latency.asleep()
+        return super().create_embeddings(texts, dimensions)
+
+
+class LatencyVectorAdapter(VectorPort):
+    """Envuelve un VectorPort real (normalmente el índice NumPy local) añadiendo el viaje de red de Qdrant."""
+
+    def __init__(self, inner: VectorPort, latency: Latency = Latency()) -> None:
+        self._inner = inner
+        self._latency = latency
+
+    def collection_dim(self, collection: str) -> Optional[int]:
+        return self._inner.collection_dim(collection)
+
+    def up_embeddings(self, ids: List[str], vectors: List[List[float]], payloads: List[Dict[str, Any]], collection: str) -> None:
+        self._latency.sleep()
+        self._inner.up_embeddings(ids, vectors, payloads, collection)
+
+    def scroll(self, collection: str, filters: Optional[Dict[str, Any]] = None, payload_fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        self._latency.sleep()
+        return self._inner.scroll(collection, filters, payload_fields)
+
+    def delete(self, ids: List[str], collection: str) -> int:
+        self._latency.sleep()
+        return self._inner.delete(ids, collection)
+
+    def delete_by_filter(self, collection: str, filters: Dict[str, Any]) -> int:
+        self._latency.sleep()
+        return self._inner.delete_by_filter(collection, filters)
+
+    def search(self, vector: List[float], collection: str, top_k: int = 5, filters: Optional[Dict[str, Any]] = None, with_vectors: bool = False) -> List[Dict[str, Any]]:
+        self._latency.sleep()
+        return self._inner.search(vector, collection, top_k, filters, with_vectors)
+
+    async def asearch(self, vector: List[float], collection: str, top_k: int = 5, filters: Optional[Dict[str, Any]] = None, with_vectors: bool = False) -> List[Dict[str, Any]]:
+        await self._latency.asleep()
+        return await self._inner.asearch(vector=vector, collection=collection, top_k=top_k, filters=filters, with_vectors=with_vectors)
+
+    async def asearch_batch(
+        self,
+        vectors: List[List[float]],
+        collection: str,
+        top_k: int = 5,
+        filters: Optional[List[Optional[Dict[str, Any]]]] = None,
+        with_vectors: bool = False,
+    ) -> List[List[Dict[str, Any]]]:
+        await self._latency.asleep()
+        return await self._inner.asearch_batch(vectors=vectors, collection=collection, top_k=top_k, filters=filters, with_vectors=with_vectors)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._inner.stats() if hasattr(self._inner, "stats") else {}
+
+    async def aclose(self) -> None:
+        if hasattr(self._inner, "aclose"):
+            await self._inner.aclose()
+
+
+class StubClientRepository(ClientRepositoryPort):
+    """Prompts, ajustes y registro de documentos en memoria, con la latencia de una consulta a Postgres."""
+
+    def __init__(self, latency: Latency = Latency(), default_prompt: str = "Eres un asistente de pruebas.") -> None:
+        self._latency = latency
+        self._default_prompt = default_prompt
+        self._lock = threading.Lock()
+        self._prompts: Dict[Tuple[str, str], str] = {}
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self.documents: List[Tuple[str, str, str, Optional[str]]] = []
+
+    def save_info_document_client(self, client_id: str, agent_id: str, file_name: str, source_key: str | None = None) -> None:
+        self._latency.sleep()
+        with self._lock:
+            self.documents.append((client_id, agent_id, file_name, source_key))
+
+    def save_prompt_client(self, client_id: str, agent_id: str, prompt: str) -> None:
+        self._latency.sleep()
+        with self._lock:
+            key = (client_id, agent_id)
+            self._prompts[key] = prompt
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def get_prompt_client(self, client_id: str, agent_id: str) -> str | None:
+        self._latency.sleep()
+        return self._prompts.get((client_id, agent_id), self._default_prompt)
+
+    def get_agent_profile(self, client_id: str, agent_id: str) -> AgentProfile:
+        self._latency.sleep()
+        key = (client_id, agent_id)
+        with self._lock:
+            return AgentProfile(
+                prompt=self._prompts.get(key, self._default_prompt),
+                version=str(self._versions.get(key, 0)),
+            )
+
+    async def aget_agent_profile(self, client_id: str, agent_id: str) -> AgentProfile:
+        await self._latency.asleep()
+        key = (client_id, agent_id)
+        with self._lock:
+            return AgentProfile(
+                prompt=self._prompts.get(key, self._default_prompt),
+                version=str(self._versions.get(key, 0)),
+            )
+
+
+class StubStorageAdapter(StoragePort):
+    """Objetos en un dict en lugar de MinIO."""
+
+    def __init__(self, latency: Latency = Latency()) -> None:
+        self._latency = latency
+        self._lock = threading.Lock()
+        self._objects: Dict[str, bytes] = {}
+        self._seq = 0
+
+    def save_document_client(self, client_id: str, agent_id: str, token_auth: str, file: bytes, file_name: str) -> str:
+        self._latency.sleep()
+        with self._lock:
+            self._seq += 1
+            key = f"{client_id}/{agent_id}/{self._seq:08d}_{file_name}"
+            self._objects[key] = file
+        return key
+
+    def get_document_client(self, object_key: str) -> bytes:
+        self._latency.sleep()
+        with self._lock:
+            return self._objects[object_key]
@@ -1,8 +1,53 @@
-from dataclasses import dataclass
-from typing import Dict, Optional
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
 
 @dataclass
 class Chunk:
     id: str
     content: str
-    metadata: Optional[Dict[str, str]] = None
\ No newline at end of file
+    metadata: Optional[Dict[str, str]] = None
+
+
+@dataclass
+class AgentProfile:
+    # Configuración por agente que usa la ruta de consulta: prompt de sistema y ajustes
+    # (p. ej. {"context_token_budget": 2000, "min_score": 0.3, "mmr_lambda": 0.7}) guardados en agents.settings.
+    prompt: Optional[str] = None
+    settings: Dict[str, Any] = field(default_factory=dict)
+    # Versión del prompt (updated_at en Postgres); None si el repositorio no la conoce
+    version: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class StorageProfile:
+    # Cómo se guarda una colección de vectores. `dimensions` se pide al modelo de embeddings
+    # (None = las nativas del modelo); `quantization` ("scalar" | "binary") mantiene en RAM una copia
+    # comprimida y, con `on_disk`, los vectores originales viven en disco y solo se leen para reordenar.
+    name: str = "full"
+    dimensions: Optional[int] = None
+    quantization: Optional[str] = None
+    on_disk: bool = False
+    rescore: bool = True
+    oversampling: float = 2.0
+    # Backend de embeddings que produce los vectores de la colección ("openai" | "onnx" | "hashing")
+    embedder: str = "openai"
+
+
+@dataclass
+class IngestionJob:
+    # Trabajo de ingesta en cola: `payload` son los argumentos de process_and_store_vector_document.
+    # Estados: queued -> running -> done | (queued con backoff) | dead (agotó los intentos).
+    id: str
+    client_id: str
+    agent_id: str
+    payload: Dict[str, Any] = field(default_factory=dict)
+    status: str = "queued"
+    attempts: int = 0
+    max_attempts: int = 5
+    last_error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    run_after: Optional[datetime] = None
@@ -1,5 +1,13 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+
+
+def _uncovered(recent: List[Dict[str, str]], total: int, covered: int, limit: int) -> List[Dict[str, str]]:
+    # `recent` son los últimos mensajes de `total`; el resumen ya incluye los `covered` primeros
+    n = min(limit, total - covered)
+    return recent[-n:] if n > 0 else []
+
 
 class ChatMemoryPort(ABC):
     @abstractmethod
@@ -12,4 +20,65 @@ class ChatMemoryPort(ABC):
 
     @abstractmethod
     def clear(self, session_id: str) -> None:
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    # Historial compactado: resumen acumulado de los turnos viejos + cuántos mensajes cubre.
+    # `count` es el total de mensajes añadidos a la sesión (monótono), para saber qué falta resumir.
+    def count(self, session_id: str) -> int:
+        return len(self.get_recent(session_id, limit=1_000_000))
+
+    def get_range(self, session_id: str, start: int, end: Optional[int] = None) -> Tuple[List[Dict[str, str]], int]:
+        """
+        Mensajes en las posiciones [start, end) de la sesión (0 = el primero añadido) y el total,
+        leídos a la vez. Si la memoria ya descartó los más viejos del rango, solo vienen los últimos.
+        """
+        msgs = self.get_recent(session_id, limit=1_000_000)
+        stop = len(msgs) if end is None else min(end, len(msgs))
+        return msgs[start:stop], len(msgs)
+
+    def get_summary(self, session_id: str) -> Tuple[Optional[str], int]:
+        return None, 0
+
+    def get_history(self, session_id: str, limit: int) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        """
+        Resumen y los últimos `limit` mensajes que aún no cubre, leídos a la vez (una sola
+        lectura en las implementaciones persistentes: es la ruta de cada turno de chat).
+        """
+        summary, covered = self.get_summary(session_id)
+        recent = self.get_recent(session_id, limit=limit)
+        return summary, _uncovered(recent, self.count(session_id), covered, limit)
+
+    def set_summary(self, session_id: str, summary: str, covered: int) -> None:
+        raise NotImplementedError
+
+    def replace_summary(self, session_id: str, summary: str, covered: int, expected_covered: int) -> bool:
+        """`set_summary` solo si el resumen guardado sigue cubriendo `expected_covered` mensajes."""
+        if self.get_summary(session_id)[1] != expected_covered:
+            return False
+        self.set_summary(session_id, summary, covered)
+        return True
+
+    # Variantes async; las implementaciones en memoria pueden sobrescribirlas sin usar hilos.
+    async def aget_recent(self, session_id: str, limit: int = 20) -> List[Dict[str, str]]:
+        return await asyncio.to_thread(self.get_recent, session_id, limit)
+
+    async def aappend(self, session_id: str, role: str, content: str) -> None:
+        await asyncio.to_thread(self.append, session_id, role, content)
+
+    async def acount(self, session_id: str) -> int:
+        return await asyncio.to_thread(self.count, session_id)
+
+    async def aget_range(self, session_id: str, start: int, end: Optional[int] = None) -> Tuple[List[Dict[str, str]], int]:
+        return await asyncio.to_thread(self.get_range, session_id, start, end)
+
+    async def aget_history(self, session_id: str, limit: int) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        return await asyncio.to_thread(self.get_history, session_id, limit)
+
+    async def aget_summary(self, session_id: str) -> Tuple[Optional[str], int]:
+        return await asyncio.to_thread(self.get_summary, session_id)
+
+    async def aset_summary(self, session_id: str, summary: str, covered: int) -> None:
+        await asyncio.to_thread(self.set_summary, session_id, summary, covered)
+
+    async def areplace_summary(self, session_id: str, summary: str, covered: int, expected_covered: int) -> bool:
+        return await asyncio.to_thread(self.replace_summary, session_id, summary, covered, expected_covered)
@@ -1,4 +1,19 @@
+import asyncio
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from typing import ContextManager, Protocol
+from app.core.domain.models import AgentProfile
+
+
+class PromptChangeListener(Protocol):
+    """Receptor de cambios de prompt/ajustes empujados por el repositorio."""
+
+    def on_connected(self) -> None: ...
+
+    def on_disconnected(self) -> None: ...
+
+    def on_change(self, client_id: str, agent_id: str) -> None: ...
+
 
 class ClientRepositoryPort(ABC):
     @abstractmethod
@@ -12,3 +27,23 @@ class ClientRepositoryPort(ABC):
     @abstractmethod
     def get_prompt_client(self, client_id: str, agent_id: str) -> str | None:
         raise NotImplementedError
+
+    # Variante async de la lectura del prompt (ruta caliente del chat)
+    async def aget_prompt_client(self, client_id: str, agent_id: str) -> str | None:
+        return await asyncio.to_thread(self.get_prompt_client, client_id, agent_id)
+
+    # Perfil completo del agente (prompt + ajustes). Por defecto solo trae el prompt.
+    def get_agent_profile(self, client_id: str, agent_id: str) -> AgentProfile:
+        return AgentProfile(prompt=self.get_prompt_client(client_id=client_id, agent_id=agent_id))
+
+    async def aget_agent_profile(self, client_id: str, agent_id: str) -> AgentProfile:
+        return await asyncio.to_thread(self.get_agent_profile, client_id, agent_id)
+
+    # Exclusión entre procesos al (re)indexar un documento. Sin soporte solo queda el lock en proceso
+    # del servicio de ingesta.
+    def document_lock(self, client_id: str, agent_id: str, doc_id: str) -> ContextManager[None]:
+        return nullcontext()
+
+    async def alisten_prompt_changes(self, listener: PromptChangeListener) -> None:
+        """Escucha cambios de prompts hasta ser cancelado. Los repositorios sin notificaciones no lo implementan."""
+        raise NotImplementedError
@@ -1,5 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 
 
 
@@ -9,6 +10,26 @@ class EmbeddingPort(ABC):
    # Puerto para la creación de embeddings.
    # Define la interfaz que cualquier adaptador de embeddings debe implementar.
 
+    # `dimensions` pide vectores reducidos (modelos Matryoshka como text-embedding-3-*);
+    # None = las dimensiones nativas del modelo.
     @abstractmethod
-    def create_embeddings(self, texts: list[str] ) -> List[List[float]]:
-        raise NotImplementedError
\ No newline at end of file
+    def create_embeddings(self, texts: list[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        raise NotImplementedError
+
+    # Variante async; por defecto ejecuta la versión síncrona en un hilo.
+    async def acreate_embeddings(self, texts: list[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        return await asyncio.to_thread(self.create_embeddings, texts, dimensions)
+
+    # Identifica cómo se calculan los embeddings de documentos: modelo y preparación de la entrada
+    # (prefijo, truncado, archivo del modelo). Es parte de la clave de la caché de chunks, así un
+    # cambio de configuración no reutiliza vectores calculados de otra forma.
+    def document_fingerprint(self) -> str:
+        return getattr(self, "model", None) or type(self).__name__
+
+    # Embeddings de consultas de búsqueda. Los modelos asimétricos (p. ej. e5: "query: " / "passage: ")
+    # codifican distinto la pregunta y el documento; por defecto es lo mismo que create_embeddings.
+    def create_query_embeddings(self, texts: list[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        return self.create_embeddings(texts, dimensions)
+
+    async def acreate_query_embeddings(self, texts: list[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        return await self.acreate_embeddings(texts, dimensions)
@@ -0,0 +1,29 @@
+# app/core/domain/ports/embedding_store_port.py
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+
+class EmbeddingStorePort(ABC):
+    """
+    Almacén persistente de embeddings direccionado por contenido. La clave (hex de sha256 de modelo,
+    dimensiones y texto normalizado) la calcula quien lo usa; el almacén solo guarda vectores.
+    Es una caché: perder entradas solo cuesta volver a embeber.
+    """
+
+    @abstractmethod
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Vectores de las claves presentes; las ausentes no aparecen en el resultado."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        """Guarda vectores nuevos; una clave ya guardada no se sobrescribe (mismo contenido, mismo vector)."""
+        raise NotImplementedError
+
+    # Variantes async: por defecto en un hilo
+    async def aget_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        return await asyncio.to_thread(self.get_many, keys)
+
+    async def aput_many(self, items: Dict[str, List[float]]) -> None:
+        await asyncio.to_thread(self.put_many, items)
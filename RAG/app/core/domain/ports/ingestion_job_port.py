@@ -0,0 +1,70 @@
+# app/core/domain/ports/ingestion_job_port.py
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from app.core.domain.models import IngestionJob
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_DEAD = "dead"
+
+
+class IngestionJobPort(ABC):
+    """
+    Cola durable de trabajos de ingesta. Un worker reclama un trabajo con un lease (`locked_until`);
+    si el proceso muere, el lease vence y otro worker lo vuelve a reclamar. Cada reclamo cuenta como
+    intento, así que un documento que tumba al worker también termina en `dead`.
+    """
+
+    @abstractmethod
+    def enqueue(self, client_id: str, agent_id: str, payload: Dict[str, Any], max_attempts: int = 5) -> IngestionJob:
+        raise NotImplementedError
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[IngestionJob]:
+        """Toma el siguiente trabajo listo (o con lease vencido), o None si no hay."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def extend_lease(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Renueva el lease mientras el trabajo corre; False si otro worker ya lo tomó."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str, retry_in_seconds: Optional[float]) -> bool:
+        """Con `retry_in_seconds` vuelve a `queued` para después de ese plazo; con None pasa a `dead`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def count_active(self, client_id: Optional[str] = None) -> int:
+        """Trabajos en cola o en curso (de `client_id`, si se indica)."""
+        raise NotImplementedError
+
+    # Variantes async: por defecto en un hilo (los adaptadores usan drivers síncronos)
+    async def aenqueue(self, client_id: str, agent_id: str, payload: Dict[str, Any], max_attempts: int = 5) -> IngestionJob:
+        return await asyncio.to_thread(self.enqueue, client_id, agent_id, payload, max_attempts)
+
+    async def aclaim(self, worker_id: str, lease_seconds: float) -> Optional[IngestionJob]:
+        return await asyncio.to_thread(self.claim, worker_id, lease_seconds)
+
+    async def aextend_lease(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        return await asyncio.to_thread(self.extend_lease, job_id, worker_id, lease_seconds)
+
+    async def acomplete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        return await asyncio.to_thread(self.complete, job_id, worker_id, result)
+
+    async def afail(self, job_id: str, worker_id: str, error: str, retry_in_seconds: Optional[float]) -> bool:
+        return await asyncio.to_thread(self.fail, job_id, worker_id, error, retry_in_seconds)
+
+    async def aget(self, job_id: str) -> Optional[IngestionJob]:
+        return await asyncio.to_thread(self.get, job_id)
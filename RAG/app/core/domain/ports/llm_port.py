@@ -1,5 +1,11 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
+
+SUMMARY_INSTRUCTIONS = (
+    "Resume la conversación entre el usuario y el asistente en pocas frases. Conserva datos concretos"
+    " (nombres, fechas, cantidades, pedidos, preferencias) y lo que quedó pendiente. No inventes nada."
+)
 
 
 class LLMPort(ABC):
@@ -7,4 +13,42 @@ class LLMPort(ABC):
     def response(self, prompt: str, context: List[Dict[str, Any]], system_prompt: Optional[str] = None) -> str:
         """Genera una respuesta textual; `system_prompt` permite personalizar el rol/estilo por agente."""
         raise NotImplementedError
-    
\ No newline at end of file
+
+    def response_with_history(
+        self,
+        prompt: str,
+        history: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        context: Optional[List[Dict[str, Any]]] = None,
+    ) -> str:
+        """Por defecto ignora el historial; los adaptadores que lo soporten lo sobrescriben."""
+        return self.response(prompt=prompt, context=context or [], system_prompt=system_prompt)
+
+    # Variantes async: por defecto delegan la versión síncrona a un hilo para no bloquear el event loop.
+    async def aresponse(self, prompt: str, context: List[Dict[str, Any]], system_prompt: Optional[str] = None) -> str:
+        return await asyncio.to_thread(self.response, prompt, context, system_prompt)
+
+    async def aresponse_with_history(
+        self,
+        prompt: str,
+        history: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        context: Optional[List[Dict[str, Any]]] = None,
+    ) -> str:
+        return await asyncio.to_thread(self.response_with_history, prompt, history, system_prompt, context)
+
+    async def astream_response_with_history(
+        self,
+        prompt: str,
+        history: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        context: Optional[List[Dict[str, Any]]] = None,
+    ) -> AsyncIterator[str]:
+        """Entrega la respuesta en fragmentos según se generan; por defecto un único fragmento."""
+        yield await self.aresponse_with_history(prompt, history, system_prompt, context)
+
+    async def asummarize(self, previous_summary: Optional[str], messages: List[Dict[str, str]]) -> str:
+        """Integra `messages` en el resumen acumulado de la conversación y devuelve el nuevo resumen."""
+        transcript = "\n".join(f"{m.get('role')}: {m.get('content')}" for m in messages if m.get("content"))
+        prompt = f"Resumen previo:\n{previous_summary or '(vacío)'}\n\nNuevos mensajes:\n{transcript}"
+        return await self.aresponse(prompt=prompt, context=[], system_prompt=SUMMARY_INSTRUCTIONS)
@@ -1,5 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 
 class VectorPort(ABC):
@@ -9,7 +10,46 @@ class VectorPort(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def search(self, vector: List[float], collection: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Busca los top_k puntos más cercanos al vector en la colección indicada."""
+    def search(self, vector: List[float], collection: str, top_k: int = 5, filters: Optional[Dict[str, Any]] = None, with_vectors: bool = False) -> List[Dict[str, Any]]:
+        """Busca los top_k puntos más cercanos al vector en la colección indicada.
+        `filters` restringe por igualdad exacta de campos del payload (p. ej. client_id, agent_id).
+        Con `with_vectors` cada resultado trae además "vector" (para reordenar / MMR)."""
         raise NotImplementedError
-    
\ No newline at end of file
+
+    def collection_dim(self, collection: str) -> Optional[int]:
+        """Dimensión de la colección, o None si no existe."""
+        raise NotImplementedError
+
+    def scroll(self, collection: str, filters: Optional[Dict[str, Any]] = None, payload_fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Todos los puntos que cumplen `filters`, como {"id", "payload"} y sin vectores.
+        `payload_fields` limita los campos del payload que se devuelven."""
+        raise NotImplementedError
+
+    def delete(self, ids: List[str], collection: str) -> int:
+        """Borra los puntos con esos ids. Devuelve cuántos se borraron."""
+        raise NotImplementedError
+
+    def delete_by_filter(self, collection: str, filters: Dict[str, Any]) -> int:
+        """Borra los puntos que cumplen `filters` (igualdad exacta, como en `search`). Devuelve cuántos.
+        Un filtro vacío se rechaza: borraría la colección entera."""
+        raise NotImplementedError
+
+    async def asearch(self, vector: List[float], collection: str, top_k: int = 5, filters: Optional[Dict[str, Any]] = None, with_vectors: bool = False) -> List[Dict[str, Any]]:
+        """Variante async de `search`; por defecto se ejecuta en un hilo."""
+        return await asyncio.to_thread(self.search, vector, collection, top_k, filters, with_vectors)
+
+    async def asearch_batch(
+        self,
+        vectors: List[List[float]],
+        collection: str,
+        top_k: int = 5,
+        filters: Optional[List[Optional[Dict[str, Any]]]] = None,
+        with_vectors: bool = False,
+    ) -> List[List[Dict[str, Any]]]:
+        """Varias búsquedas sobre la misma colección en una sola petición (un resultado por vector, en orden).
+        `filters`, si se da, lleva un filtro por vector. Por defecto lanza las búsquedas en paralelo."""
+        per_item = filters or [None] * len(vectors)
+        return list(await asyncio.gather(*[
+            self.asearch(vector=v, collection=collection, top_k=top_k, filters=f, with_vectors=with_vectors)
+            for v, f in zip(vectors, per_item)
+        ]))
@@ -0,0 +1,62 @@
+# app/core/logging_config.py
+"""
+Logging del servicio con niveles (LOG_LEVEL, por defecto INFO) y formato texto o JSON por línea
+(LOG_FORMAT=text|json). Los campos pasados en `extra=` salen como claves del JSON.
+
+La escritura a stdout la hace un hilo aparte (QueueHandler/QueueListener): la ruta de la consulta
+solo encola el registro. Los mensajes de detalle por consulta son DEBUG y usan argumentos `%s`,
+así que con INFO ni siquiera se formatean.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+_STD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+_configured = False
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def configure_logging() -> None:
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
+    handler = logging.StreamHandler(sys.stdout)
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    if os.getenv("LOG_ASYNC", "true").lower() == "true":
+        q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(q, handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+        root.addHandler(logging.handlers.QueueHandler(q))
+    else:
+        root.addHandler(handler)
+    # el cliente HTTP de OpenAI/Qdrant registra cada request en INFO
+    logging.getLogger("httpx").setLevel(max(logging.WARNING, root.level))
@@ -0,0 +1,143 @@
+# app/core/metrics.py
+"""
+Métricas Prometheus del servicio: histogramas de duración por etapa (embedding, búsqueda vectorial,
+prompt, LLM, memoria, ingesta) y contadores de matches, cachés y errores, con etiquetas
+client_id / agent_id.
+
+El tenant se toma de un ContextVar que fija el servicio al empezar cada consulta/ingesta, así que
+las etapas que corren en tareas hijas (asyncio.gather, tareas en segundo plano) heredan sus
+etiquetas sin pasarlas a mano. METRICS_TENANT_LABELS=false las colapsa a "-" si la cardinalidad
+(clientes x agentes) llega a ser un problema.
+
+prometheus_client es opcional: sin él todo es no-op y /metrics responde 503. Con varios workers de
+uvicorn, definir PROMETHEUS_MULTIPROC_DIR (modo multiproceso de prometheus_client).
+"""
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+    from prometheus_client import multiprocess
+except ImportError:
+    CONTENT_TYPE_LATEST = "text/plain; charset=utf-8"
+    Counter = Histogram = None
+
+
+class _NoopMetric:
+    def labels(self, *args: str, **kwargs: str) -> "_NoopMetric":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+
+ENABLED = Histogram is not None
+_TENANT_LABELS = os.getenv("METRICS_TENANT_LABELS", "true").lower() == "true"
+_TENANT: contextvars.ContextVar[Tuple[str, str]] = contextvars.ContextVar("metrics_tenant", default=("-", "-"))
+
+# De 5 ms (cachés, búsqueda local) a 60 s (LLM / ingesta de un lote grande)
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Tokens por petición de embedding (el techo por defecto del batcher es 50k)
+_TOKEN_BUCKETS = (100, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 300_000)
+
+if ENABLED:
+    STAGE_SECONDS = Histogram(
+        "rag_stage_duration_seconds", "Duración de cada etapa de consulta/ingesta",
+        ["stage", "client_id", "agent_id"], buckets=_BUCKETS,
+    )
+    MATCHES = Counter("rag_matches_total", "Chunks que llegan al LLM como contexto", ["client_id", "agent_id"])
+    EMPTY_RETRIEVALS = Counter("rag_empty_retrievals_total", "Consultas sin ningún chunk relevante", ["client_id", "agent_id"])
+    CACHE = Counter("rag_cache_requests_total", "Consultas a cachés por resultado", ["cache", "result"])
+    ERRORS = Counter("rag_errors_total", "Errores por etapa", ["stage", "client_id", "agent_id"])
+    INDEXED_CHUNKS = Counter("rag_indexed_chunks_total", "Chunks indexados", ["client_id", "agent_id"])
+    # tokens/s de ingesta = rate(rag_embedding_tokens_total)
+    EMBED_REQUEST_TOKENS = Histogram(
+        "rag_embedding_request_tokens", "Tokens por petición de embedding en la ingesta",
+        ["client_id", "agent_id"], buckets=_TOKEN_BUCKETS,
+    )
+    EMBED_TOKENS = Counter("rag_embedding_tokens_total", "Tokens enviados a embeddings en la ingesta", ["client_id", "agent_id"])
+    EMBED_SPLITS = Counter("rag_embedding_batch_splits_total", "Lotes de embedding partidos por exceder el límite de la API")
+    DROPPED = Counter("rag_dropped_total", "Elementos descartados por componente y motivo", ["component", "reason"])
+else:
+    STAGE_SECONDS = MATCHES = EMPTY_RETRIEVALS = CACHE = ERRORS = INDEXED_CHUNKS = _NoopMetric()
+    EMBED_REQUEST_TOKENS = EMBED_TOKENS = EMBED_SPLITS = DROPPED = _NoopMetric()
+
+
+def set_tenant(client_id: Optional[str], agent_id: Optional[str]) -> None:
+    """Etiquetas de tenant para las métricas de la tarea actual (y de las que cree)."""
+    if _TENANT_LABELS:
+        _TENANT.set((client_id or "-", agent_id or "-"))
+
+
+def tenant() -> Tuple[str, str]:
+    return _TENANT.get()
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(stage, *_TENANT.get()).observe(seconds)
+
+
+def count_error(stage: str) -> None:
+    ERRORS.labels(stage, *_TENANT.get()).inc()
+
+
+def count_cache(cache: str, hits: int = 0, misses: int = 0) -> None:
+    if hits:
+        CACHE.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE.labels(cache, "miss").inc(misses)
+
+
+def count_matches(n: int) -> None:
+    if n:
+        MATCHES.labels(*_TENANT.get()).inc(n)
+    else:
+        EMPTY_RETRIEVALS.labels(*_TENANT.get()).inc()
+
+
+def count_indexed(n: int) -> None:
+    INDEXED_CHUNKS.labels(*_TENANT.get()).inc(n)
+
+
+def observe_embedding_request(tokens: int) -> None:
+    EMBED_REQUEST_TOKENS.labels(*_TENANT.get()).observe(tokens)
+    EMBED_TOKENS.labels(*_TENANT.get()).inc(tokens)
+
+
+def count_embedding_split() -> None:
+    EMBED_SPLITS.inc()
+
+
+def count_dropped(component: str, reason: str, n: int = 1) -> None:
+    if n:
+        DROPPED.labels(component, reason).inc(n)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Mide la duración de un bloque (también en corrutinas) y cuenta el error si lanza."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        count_error(name)
+        raise
+    finally:
+        observe_stage(name, time.perf_counter() - t0)
+
+
+def render() -> Tuple[bytes, str]:
+    """Exposición en formato texto de Prometheus para /metrics."""
+    if not ENABLED:
+        return b"prometheus_client no instalado\n", CONTENT_TYPE_LATEST
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
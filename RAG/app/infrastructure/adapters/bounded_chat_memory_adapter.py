@@ -0,0 +1,210 @@
+# app/infrastructure/adapters/bounded_chat_memory_adapter.py
+import os
+import time
+import zlib
+from collections import OrderedDict, deque
+from threading import Lock
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.core.domain.ports.chat_memory_port import ChatMemoryPort, _uncovered
+
+
+class _Session:
+    __slots__ = ("messages", "total", "chars", "summary", "covered", "last_access")
+
+    def __init__(self, max_messages: int) -> None:
+        self.messages: Deque[Dict[str, str]] = deque(maxlen=max_messages)
+        self.total = 0          # mensajes añadidos desde el inicio (monótono)
+        self.chars = 0          # tamaño aproximado retenido (mensajes + resumen)
+        self.summary: Optional[str] = None
+        self.covered = 0
+        self.last_access = time.monotonic()
+
+
+class _Stripe:
+    __slots__ = ("lock", "sessions", "chars")
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.sessions: "OrderedDict[str, _Session]" = OrderedDict()   # orden LRU
+        self.chars = 0
+
+
+class BoundedChatMemoryAdapter(ChatMemoryPort):
+    """
+    Memoria de chat en proceso pensada para producción:
+      - cada sesión es un buffer circular de `max_messages_per_session` mensajes;
+      - tope global de memoria (`max_total_chars`) repartido entre franjas; al superarlo se
+        expulsan las sesiones menos usadas de la franja;
+      - las sesiones inactivas más de `idle_ttl_seconds` se descartan;
+      - lock striping: cada sesión cae en una de `stripes` franjas con su propio lock, así las
+        sesiones concurrentes no compiten por un único lock.
+    """
+
+    def __init__(
+        self,
+        max_messages_per_session: int = 40,
+        max_total_chars: int = 64 * 1024 * 1024,
+        idle_ttl_seconds: float = 6 * 3600,
+        stripes: int = 32,
+    ) -> None:
+        self._max_messages = max_messages_per_session
+        self._stripes = [_Stripe() for _ in range(max(1, stripes))]
+        self._stripe_cap = max(1, max_total_chars // len(self._stripes))
+        self._ttl = idle_ttl_seconds
+
+    @classmethod
+    def from_env(cls) -> "BoundedChatMemoryAdapter":
+        return cls(
+            max_messages_per_session=int(os.getenv("CHAT_MEMORY_MAX_MESSAGES", "40")),
+            max_total_chars=int(os.getenv("CHAT_MEMORY_MAX_CHARS", str(64 * 1024 * 1024))),
+            idle_ttl_seconds=float(os.getenv("CHAT_MEMORY_IDLE_TTL_SECONDS", str(6 * 3600))),
+            stripes=int(os.getenv("CHAT_MEMORY_STRIPES", "32")),
+        )
+
+    def _stripe(self, session_id: str) -> _Stripe:
+        # crc32: reparto estable y barato de sesiones entre franjas
+        return self._stripes[zlib.crc32(session_id.encode("utf-8")) % len(self._stripes)]
+
+    def _touch(self, stripe: _Stripe, session_id: str, create: bool) -> Optional[_Session]:
+        now = time.monotonic()
+        # expulsar por TTL desde el extremo LRU (las más antiguas primero)
+        while stripe.sessions:
+            sid, oldest = next(iter(stripe.sessions.items()))
+            if now - oldest.last_access <= self._ttl:
+                break
+            stripe.sessions.popitem(last=False)
+            stripe.chars -= oldest.chars
+
+        sess = stripe.sessions.get(session_id)
+        if sess is None:
+            if not create:
+                return None
+            sess = _Session(self._max_messages)
+            stripe.sessions[session_id] = sess
+        else:
+            stripe.sessions.move_to_end(session_id)
+        sess.last_access = now
+        return sess
+
+    def _evict(self, stripe: _Stripe, keep: str) -> None:
+        while stripe.chars > self._stripe_cap and len(stripe.sessions) > 1:
+            sid, victim = next(iter(stripe.sessions.items()))
+            if sid == keep:
+                stripe.sessions.move_to_end(sid)
+                continue
+            stripe.sessions.popitem(last=False)
+            stripe.chars -= victim.chars
+
+    def get_recent(self, session_id: str, limit: int = 20) -> List[Dict[str, str]]:
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            sess = self._touch(stripe, session_id, create=False)
+            if sess is None or limit <= 0:
+                return []
+            msgs = list(sess.messages)
+        return msgs[-limit:]
+
+    def append(self, session_id: str, role: str, content: str) -> None:
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            sess = self._touch(stripe, session_id, create=True)
+            if len(sess.messages) == sess.messages.maxlen:
+                dropped = sess.messages[0]
+                sess.chars -= len(dropped["content"])
+                stripe.chars -= len(dropped["content"])
+            sess.messages.append({"role": role, "content": content})
+            sess.total += 1
+            sess.chars += len(content)
+            stripe.chars += len(content)
+            self._evict(stripe, keep=session_id)
+
+    def clear(self, session_id: str) -> None:
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            sess = stripe.sessions.pop(session_id, None)
+            if sess is not None:
+                stripe.chars -= sess.chars
+
+    def count(self, session_id: str) -> int:
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            sess = self._touch(stripe, session_id, create=False)
+            return sess.total if sess else 0
+
+    def get_range(self, session_id: str, start: int, end: Optional[int] = None) -> Tuple[List[Dict[str, str]], int]:
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            sess = self._touch(stripe, session_id, create=False)
+            if sess is None:
+                return [], 0
+            # el buffer guarda las últimas posiciones [first, total)
+            first = sess.total - len(sess.messages)
+            stop = sess.total if end is None else min(end, sess.total)
+            lo, hi = max(start, first) - first, max(stop, first) - first
+            return [sess.messages[i] for i in range(lo, hi)], sess.total
+
+    def get_summary(self, session_id: str) -> Tuple[Optional[str], int]:
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            sess = self._touch(stripe, session_id, create=False)
+            return (sess.summary, sess.covered) if sess else (None, 0)
+
+    def get_history(self, session_id: str, limit: int) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            sess = self._touch(stripe, session_id, create=False)
+            if sess is None or limit <= 0:
+                return (sess.summary if sess else None), []
+            msgs = list(sess.messages)[-limit:]
+            return sess.summary, _uncovered(msgs, sess.total, sess.covered, limit)
+
+    def set_summary(self, session_id: str, summary: str, covered: int) -> None:
+        self.replace_summary(session_id, summary, covered, expected_covered=None)
+
+    def replace_summary(self, session_id: str, summary: str, covered: int, expected_covered: Optional[int]) -> bool:
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            sess = self._touch(stripe, session_id, create=True)
+            if expected_covered is not None and sess.covered != expected_covered:
+                return False
+            delta = len(summary) - len(sess.summary or "")
+            sess.summary = summary
+            sess.covered = covered
+            sess.chars += delta
+            stripe.chars += delta
+            self._evict(stripe, keep=session_id)
+            return True
+
+    def stats(self) -> Dict[str, int]:
+        sessions = chars = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                sessions += len(stripe.sessions)
+                chars += stripe.chars
+        return {"sessions": sessions, "chars": chars}
+
+    # Todo es en memoria y con locks de corta duración: no hace falta delegar a un hilo
+    async def aget_recent(self, session_id: str, limit: int = 20) -> List[Dict[str, str]]:
+        return self.get_recent(session_id, limit)
+
+    async def aappend(self, session_id: str, role: str, content: str) -> None:
+        self.append(session_id, role, content)
+
+    async def acount(self, session_id: str) -> int:
+        return self.count(session_id)
+
+    async def aget_range(self, session_id: str, start: int, end: Optional[int] = None) -> Tuple[List[Dict[str, str]], int]:
+        return self.get_range(session_id, start, end)
+
+    async def aget_history(self, session_id: str, limit: int) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        return self.get_history(session_id, limit)
+
+    async def aget_summary(self, session_id: str) -> Tuple[Optional[str], int]:
+        return self.get_summary(session_id)
+
+    async def aset_summary(self, session_id: str, summary: str, covered: int) -> None:
+        self.set_summary(session_id, summary, covered)
+
+    async def areplace_summary(self, session_id: str, summary: str, covered: int, expected_covered: int) -> bool:
+        return self.replace_summary(session_id, summary, covered, expected_covered)
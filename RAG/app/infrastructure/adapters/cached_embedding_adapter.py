@@ -0,0 +1,277 @@
+# app/infrastructure/adapters/cached_embedding_adapter.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.core import metrics
+from app.core.domain.ports.embedding_port import EmbeddingPort
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(text: str) -> str:
+    # "Horario ", "horario" y "HORARIO" comparten entrada
+    return " ".join((text or "").split()).casefold()
+
+
+class CachedEmbeddingAdapter(EmbeddingPort):
+    """
+    Decorador de EmbeddingPort con caché de dos niveles:
+      - L1: LRU en memoria del proceso con TTL y tamaño acotado.
+      - L2 (opcional): SQLite en disco compartido por todos los workers de uvicorn.
+    La clave es sha256(modelo + dimensiones + texto normalizado); solo se llama al adaptador interno
+    con los textos que no están en ninguna de las dos capas.
+    """
+
+    def __init__(
+        self,
+        inner: EmbeddingPort,
+        max_entries: int = 10_000,
+        ttl_seconds: float = 24 * 3600,
+        disk_path: Optional[str] = None,
+        purge_interval_seconds: float = 3600,
+    ) -> None:
+        self._inner = inner
+        self.model = getattr(inner, "model", type(inner).__name__)
+        # modelos asimétricos: las consultas se embeben distinto y van en otras claves
+        self.query_model = getattr(inner, "query_model", self.model)
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._lru: "OrderedDict[str, Tuple[List[float], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._disk_path = disk_path
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._purge_interval = purge_interval_seconds
+        self._next_purge = 0.0
+        if disk_path:
+            conn = self._disk()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_expires_at ON embeddings (expires_at)")
+            self._purge_expired(time.time())
+
+    def document_fingerprint(self) -> str:
+        return self._inner.document_fingerprint()
+
+    @classmethod
+    def from_env(cls, inner: EmbeddingPort) -> "CachedEmbeddingAdapter":
+        return cls(
+            inner,
+            max_entries=int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "10000")),
+            ttl_seconds=float(os.getenv("EMBED_CACHE_TTL_SECONDS", str(24 * 3600))),
+            disk_path=os.getenv("EMBED_CACHE_DISK_PATH") or None,
+            purge_interval_seconds=float(os.getenv("EMBED_CACHE_PURGE_INTERVAL_SECONDS", "3600")),
+        )
+
+    def _key(self, text: str, dimensions: Optional[int] = None, query: bool = False) -> str:
+        # el mismo texto a 1024 y a 3072 dimensiones son vectores distintos; sin dimensiones
+        # la clave es la de siempre para no invalidar la caché en disco existente
+        model = self.query_model if query else self.model
+        model = f"{model}@{dimensions}" if dimensions else model
+        return hashlib.sha256(f"{model}\x00{_normalize(text)}".encode("utf-8")).hexdigest()
+
+    # ---------------- L1: memoria ----------------
+    def _mem_get(self, key: str, now: float) -> Optional[List[float]]:
+        with self._lock:
+            item = self._lru.get(key)
+            if item is None:
+                return None
+            vec, expires_at = item
+            if expires_at < now:
+                del self._lru[key]
+                return None
+            self._lru.move_to_end(key)
+            return vec
+
+    def _mem_put(self, key: str, vec: List[float], expires_at: float) -> None:
+        with self._lock:
+            self._lru[key] = (vec, expires_at)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self._max_entries:
+                self._lru.popitem(last=False)
+
+    # ---------------- L2: disco (SQLite, una conexión por hilo) ----------------
+    def _disk(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._disk_path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _disk_get_many(self, keys: List[str], now: float) -> Dict[str, Tuple[List[float], float]]:
+        if not self._disk_path or not keys:
+            return {}
+        found: Dict[str, Tuple[List[float], float]] = {}
+        try:
+            marks = ",".join("?" for _ in keys)
+            rows = self._disk().execute(
+                f"SELECT key, vec, expires_at FROM embeddings WHERE key IN ({marks})", keys
+            ).fetchall()
+            for key, blob, expires_at in rows:
+                if expires_at >= now:
+                    found[key] = (array("f", blob).tolist(), expires_at)
+        except Exception as e:
+            logger.warning("embed-cache disk read failed: %s", e)
+        return found
+
+    def _disk_put_many(self, items: List[Tuple[str, List[float], float]]) -> None:
+        if not self._disk_path or not items:
+            return
+        try:
+            self._disk().executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vec, expires_at) VALUES (?, ?, ?)",
+                [(key, array("f", vec).tobytes(), expires_at) for key, vec, expires_at in items],
+            )
+        except Exception as e:
+            logger.warning("embed-cache disk write failed: %s", e)
+        now = time.time()
+        if now >= self._next_purge:
+            self._purge_expired(now)
+
+    def _purge_expired(self, now: float) -> None:
+        # Las claves que no se vuelven a pedir nunca se sobrescriben: sin esta purga el archivo
+        # crecería sin límite. Cada proceso purga como mucho una vez por intervalo.
+        with self._lock:
+            if now < self._next_purge:
+                return
+            self._next_purge = now + self._purge_interval
+        try:
+            deleted = self._disk().execute("DELETE FROM embeddings WHERE expires_at < ?", (now,)).rowcount
+            if deleted:
+                logger.info("embed-cache purged %s expired rows", deleted)
+        except Exception as e:
+            logger.warning("embed-cache disk purge failed: %s", e)
+
+    # ---------------- Resolución ----------------
+    def _lookup(self, keys: List[str], now: float) -> Tuple[Dict[str, List[float]], List[str]]:
+        found: Dict[str, List[float]] = {}
+        pending: List[str] = []
+        for key in keys:
+            if key in found:
+                continue
+            vec = self._mem_get(key, now)
+            if vec is not None:
+                found[key] = vec
+            else:
+                pending.append(key)
+        return found, pending
+
+    def _promote(self, disk_found: Dict[str, Tuple[List[float], float]], found: Dict[str, List[float]]) -> None:
+        for key, (vec, expires_at) in disk_found.items():
+            self._mem_put(key, vec, expires_at)
+            found[key] = vec
+
+    def _misses(self, texts: List[str], keys: List[str], found: Dict[str, List[float]]) -> Tuple[List[str], List[str]]:
+        miss_keys: List[str] = []
+        miss_texts: List[str] = []
+        seen = set()
+        for text, key in zip(texts, keys):
+            if key not in found and key not in seen:
+                seen.add(key)
+                miss_keys.append(key)
+                miss_texts.append(text)
+        return miss_keys, miss_texts
+
+    def _store(self, miss_keys: List[str], vectors: List[List[float]], found: Dict[str, List[float]]) -> List[Tuple[str, List[float], float]]:
+        expires_at = time.time() + self._ttl
+        items = []
+        for key, vec in zip(miss_keys, vectors):
+            vec = list(vec)
+            self._mem_put(key, vec, expires_at)
+            found[key] = vec
+            items.append((key, vec, expires_at))
+        return items
+
+    def _count(self, n_total: int, n_mem: int, n_disk: int) -> None:
+        with self._lock:
+            self.hits += n_mem + n_disk
+            self.disk_hits += n_disk
+            self.misses += n_total - n_mem - n_disk
+        metrics.count_cache("embedding", hits=n_mem + n_disk, misses=n_total - n_mem - n_disk)
+
+    def create_embeddings(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        return self._create(texts, dimensions, query=False)
+
+    async def acreate_embeddings(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        return await self._acreate(texts, dimensions, query=False)
+
+    def create_query_embeddings(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        return self._create(texts, dimensions, query=True)
+
+    async def acreate_query_embeddings(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        return await self._acreate(texts, dimensions, query=True)
+
+    def _create(self, texts: List[str], dimensions: Optional[int], query: bool) -> List[List[float]]:
+        now = time.time()
+        keys = [self._key(t, dimensions, query) for t in texts]
+        found, pending = self._lookup(keys, now)
+        n_mem = sum(1 for k in keys if k in found)
+        disk_found = self._disk_get_many(pending, now)
+        self._promote(disk_found, found)
+        n_disk = sum(1 for k in keys if k in disk_found)
+
+        miss_keys, miss_texts = self._misses(texts, keys, found)
+        if miss_texts:
+            embed = self._inner.create_query_embeddings if query else self._inner.create_embeddings
+            vectors = embed(miss_texts, dimensions)
+            self._disk_put_many(self._store(miss_keys, vectors, found))
+        self._count(len(keys), n_mem, n_disk)
+        return [found[k] for k in keys]
+
+    async def _acreate(self, texts: List[str], dimensions: Optional[int], query: bool) -> List[List[float]]:
+        now = time.time()
+        keys = [self._key(t, dimensions, query) for t in texts]
+        found, pending = self._lookup(keys, now)
+        n_mem = sum(1 for k in keys if k in found)
+        disk_found: Dict[str, Tuple[List[float], float]] = {}
+        if pending and self._disk_path:
+            disk_found = await asyncio.to_thread(self._disk_get_many, pending, now)
+            self._promote(disk_found, found)
+        n_disk = sum(1 for k in keys if k in disk_found)
+
+        miss_keys, miss_texts = self._misses(texts, keys, found)
+        if miss_texts:
+            aembed = self._inner.acreate_query_embeddings if query else self._inner.acreate_embeddings
+            vectors = await aembed(miss_texts, dimensions)
+            items = self._store(miss_keys, vectors, found)
+            if self._disk_path:
+                await asyncio.to_thread(self._disk_put_many, items)
+        self._count(len(keys), n_mem, n_disk)
+        return [found[k] for k in keys]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+                "entries": len(self._lru),
+            }
+
+    async def aclose(self) -> None:
+        # El adaptador interno lo cierra quien lo creó (puede estar compartido)
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
@@ -0,0 +1,45 @@
+# app/infrastructure/adapters/hashing_embedding_adapter.py
+import hashlib
+import re
+from typing import List, Optional
+
+import numpy as np
+
+from app.core.domain.ports.embedding_port import EmbeddingPort
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbeddingAdapter(EmbeddingPort):
+    """
+    Embedder determinista sin modelo ni red, para pruebas de carga y benchmarks.
+    Feature hashing con signo de palabras y trigramas de caracteres: el mismo texto da siempre el
+    mismo vector (en cualquier proceso) y textos que comparten palabras quedan cerca en coseno,
+    así que la búsqueda devuelve resultados con sentido sin depender de OpenAI.
+    """
+
+    def __init__(self, dimensions: int = 384) -> None:
+        self._dim = dimensions
+        self.model = f"hashing-{dimensions}"
+
+    @staticmethod
+    def _features(text: str) -> List[str]:
+        words = _WORD.findall(text.casefold())
+        grams = [w[i:i + 3] for w in words for i in range(max(1, len(w) - 2))]
+        return words + ["#" + g for g in grams]
+
+    def _embed(self, text: str, dim: int) -> List[float]:
+        vec = np.zeros(dim, dtype=np.float32)
+        for feat in self._features(text):
+            h = int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norm = float(np.linalg.norm(vec))
+        return (vec / norm).tolist() if norm else vec.tolist()
+
+    def create_embeddings(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        # Sin cálculo pesado: no hace falta el hilo de la versión async por defecto
+        dim = dimensions or self._dim
+        return [self._embed(t or "", dim) for t in texts]
+
+    async def acreate_embeddings(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        return self.create_embeddings(texts, dimensions)
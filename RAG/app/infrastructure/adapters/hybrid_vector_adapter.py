@@ -0,0 +1,114 @@
+# app/infrastructure/adapters/hybrid_vector_adapter.py
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.core.domain.ports.vector_port import VectorPort
+from app.infrastructure.adapters.numpy_vector_adapter import CollectionDroppedError, NumpyVectorAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class HybridVectorAdapter(VectorPort):
+    """
+    Colecciones pequeñas en el índice local (sin salto de red) y grandes en Qdrant.
+
+    - Una colección nueva empieza en local, salvo que el primer lote ya supere el límite.
+    - Al pasar de `max_local_points` puntos vivos se promueve: se copia a Qdrant y se borra
+      la copia local (las búsquedas siguen yendo a local hasta que termina la copia).
+    - Las colecciones que ya existen en Qdrant se quedan allí.
+
+    Los upserts y borrados en local y la promoción entera (copia + borrado local) se hacen con el
+    lock de escritura de la colección local, que también excluye a los otros procesos: nada se
+    escribe en local mientras se copia. Quien esperaba ese lock y encuentra la colección ya
+    promovida repite la operación, que ahora va a Qdrant.
+    """
+
+    def __init__(self, local: NumpyVectorAdapter, remote: VectorPort, max_local_points: int = 5000, promote_batch: int = 256) -> None:
+        self._local = local
+        self._remote = remote
+        self._max_local = max_local_points
+        self._promote_batch = promote_batch
+
+    def _is_local(self, collection: str) -> bool:
+        return self._local.has_collection(collection)
+
+    def collection_dim(self, collection: str) -> Optional[int]:
+        if self._is_local(collection):
+            return self._local.collection_dim(collection)
+        return self._remote.collection_dim(collection)
+
+    def up_embeddings(self, ids: List[str], vectors: List[List[float]], payloads: List[Dict[str, Any]], collection: str) -> None:
+        try:
+            with self._local.exclusive(collection) as local:
+                if local:
+                    self._local.up_embeddings(ids, vectors, payloads, collection)
+                    if self._local.count(collection) > self._max_local:
+                        self._promote(collection)
+                    return
+        except CollectionDroppedError:
+            logger.info("collection '%s' was promoted while waiting; retrying on remote", collection)
+        if len(ids) > self._max_local or self._remote.collection_dim(collection) is not None:
+            self._remote.up_embeddings(ids, vectors, payloads, collection)
+            return
+        self._local.up_embeddings(ids, vectors, payloads, collection)
+
+    def _promote(self, collection: str) -> None:
+        # llamar dentro de self._local.exclusive(collection)
+        logger.info("promoting '%s' to remote live=%s", collection, self._local.count(collection))
+        moved = 0
+        for ids, vectors, payloads in self._local.iter_points(collection, self._promote_batch):
+            self._remote.up_embeddings(ids, vectors, payloads, collection)
+            moved += len(ids)
+        self._local.drop_collection(collection)
+        logger.info("promoted '%s' n_points=%s", collection, moved)
+
+    def scroll(self, collection: str, filters: Optional[Dict[str, Any]] = None, payload_fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        target = self._local if self._is_local(collection) else self._remote
+        return target.scroll(collection, filters, payload_fields)
+
+    # Los borrados esperan a una promoción en curso: borrar en local mientras se copia a Qdrant
+    # dejaría los puntos vivos en la copia remota
+    def delete(self, ids: List[str], collection: str) -> int:
+        try:
+            with self._local.exclusive(collection) as local:
+                if local:
+                    return self._local.delete(ids, collection)
+        except CollectionDroppedError:
+            pass
+        return self._remote.delete(ids, collection)
+
+    def delete_by_filter(self, collection: str, filters: Dict[str, Any]) -> int:
+        try:
+            with self._local.exclusive(collection) as local:
+                if local:
+                    return self._local.delete_by_filter(collection, filters)
+        except CollectionDroppedError:
+            pass
+        return self._remote.delete_by_filter(collection, filters)
+
+    def search(self, vector: List[float], collection: str, top_k: int = 5, filters: Optional[Dict[str, Any]] = None, with_vectors: bool = False) -> List[Dict[str, Any]]:
+        target = self._local if self._is_local(collection) else self._remote
+        return target.search(vector, collection, top_k, filters, with_vectors)
+
+    async def asearch(self, vector: List[float], collection: str, top_k: int = 5, filters: Optional[Dict[str, Any]] = None, with_vectors: bool = False) -> List[Dict[str, Any]]:
+        target = self._local if await self._local.ahas_collection(collection) else self._remote
+        return await target.asearch(vector=vector, collection=collection, top_k=top_k, filters=filters, with_vectors=with_vectors)
+
+    async def asearch_batch(
+        self,
+        vectors: List[List[float]],
+        collection: str,
+        top_k: int = 5,
+        filters: Optional[List[Optional[Dict[str, Any]]]] = None,
+        with_vectors: bool = False,
+    ) -> List[List[Dict[str, Any]]]:
+        target = self._local if await self._local.ahas_collection(collection) else self._remote
+        return await target.asearch_batch(vectors=vectors, collection=collection, top_k=top_k, filters=filters, with_vectors=with_vectors)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"local": self._local.stats()}
+
+    async def aclose(self) -> None:
+        await self._local.aclose()
+        if hasattr(self._remote, "aclose"):
+            await self._remote.aclose()
@@ -1,10 +1,11 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from threading import RLock
-from app.core.domain.ports.chat_memory_port import ChatMemoryPort
+from app.core.domain.ports.chat_memory_port import ChatMemoryPort, _uncovered
 
 class InMemoryChatMemoryAdapter(ChatMemoryPort):
     def __init__(self) -> None:
         self._store: Dict[str, List[Dict[str, str]]] = {}
+        self._summaries: Dict[str, Tuple[str, int]] = {}
         self._lock = RLock()
 
     def get_recent(self, session_id: str, limit: int = 20) -> List[Dict[str, str]]:
@@ -18,4 +19,57 @@ class InMemoryChatMemoryAdapter(ChatMemoryPort):
 
     def clear(self, session_id: str) -> None:
         with self._lock:
-            self._store.pop(session_id, None)
\ No newline at end of file
+            self._store.pop(session_id, None)
+            self._summaries.pop(session_id, None)
+
+    def count(self, session_id: str) -> int:
+        with self._lock:
+            return len(self._store.get(session_id, []))
+
+    def get_range(self, session_id: str, start: int, end: Optional[int] = None) -> Tuple[List[Dict[str, str]], int]:
+        with self._lock:
+            msgs = self._store.get(session_id, [])
+            return msgs[start:end], len(msgs)
+
+    def get_summary(self, session_id: str) -> Tuple[Optional[str], int]:
+        with self._lock:
+            return self._summaries.get(session_id, (None, 0))
+
+    def get_history(self, session_id: str, limit: int) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        with self._lock:
+            msgs = self._store.get(session_id, [])
+            summary, covered = self._summaries.get(session_id, (None, 0))
+            return summary, _uncovered(msgs[-limit:] if limit > 0 else [], len(msgs), covered, limit)
+
+    def set_summary(self, session_id: str, summary: str, covered: int) -> None:
+        with self._lock:
+            self._summaries[session_id] = (summary, covered)
+
+    def replace_summary(self, session_id: str, summary: str, covered: int, expected_covered: int) -> bool:
+        with self._lock:
+            return super().replace_summary(session_id, summary, covered, expected_covered)
+
+    # Operaciones en memoria: no hace falta delegar a un hilo
+    async def aget_recent(self, session_id: str, limit: int = 20) -> List[Dict[str, str]]:
+        return self.get_recent(session_id, limit)
+
+    async def aappend(self, session_id: str, role: str, content: str) -> None:
+        self.append(session_id, role, content)
+
+    async def acount(self, session_id: str) -> int:
+        return self.count(session_id)
+
+    async def aget_range(self, session_id: str, start: int, end: Optional[int] = None) -> Tuple[List[Dict[str, str]], int]:
+        return self.get_range(session_id, start, end)
+
+    async def aget_history(self, session_id: str, limit: int) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        return self.get_history(session_id, limit)
+
+    async def aget_summary(self, session_id: str) -> Tuple[Optional[str], int]:
+        return self.get_summary(session_id)
+
+    async def aset_summary(self, session_id: str, summary: str, covered: int) -> None:
+        self.set_summary(session_id, summary, covered)
+
+    async def areplace_summary(self, session_id: str, summary: str, covered: int, expected_covered: int) -> bool:
+        return self.replace_summary(session_id, summary, covered, expected_covered)
@@ -0,0 +1,127 @@
+# app/infrastructure/adapters/inmemory_ingestion_job_adapter.py
+import threading
+import uuid
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.domain.models import IngestionJob
+from app.core.domain.ports.ingestion_job_port import JOB_DEAD, JOB_DONE, JOB_QUEUED, JOB_RUNNING, IngestionJobPort
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class InMemoryIngestionJobAdapter(IngestionJobPort):
+    """Misma semántica que la cola de Postgres, en proceso (desarrollo y benchmarks). No es durable."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, IngestionJob] = {}
+        # job_id -> (worker, vencimiento del lease)
+        self._leases: Dict[str, Tuple[str, datetime]] = {}
+
+    def enqueue(self, client_id: str, agent_id: str, payload: Dict[str, Any], max_attempts: int = 5) -> IngestionJob:
+        now = _now()
+        job = IngestionJob(
+            id=str(uuid.uuid4()),
+            client_id=client_id,
+            agent_id=agent_id,
+            payload=dict(payload),
+            max_attempts=max_attempts,
+            created_at=now,
+            run_after=now,
+        )
+        with self._lock:
+            self._jobs[job.id] = job
+        return replace(job)
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[IngestionJob]:
+        now = _now()
+        with self._lock:
+            ready = []
+            for j in self._jobs.values():
+                if j.status == JOB_QUEUED and j.run_after <= now:
+                    ready.append(j)
+                elif j.status == JOB_RUNNING and self._leases[j.id][1] < now:
+                    if j.attempts < j.max_attempts:
+                        ready.append(j)
+                    else:
+                        j.status, j.last_error, j.finished_at = JOB_DEAD, "lease expired", now
+                        self._leases.pop(j.id, None)
+            if not ready:
+                return None
+            job = min(ready, key=lambda j: (j.run_after, j.created_at))
+            job.status = JOB_RUNNING
+            job.attempts += 1
+            job.started_at = now
+            self._leases[job.id] = (worker_id, now + timedelta(seconds=lease_seconds))
+            return replace(job)
+
+    def _owned(self, job_id: str, worker_id: str) -> Optional[IngestionJob]:
+        job = self._jobs.get(job_id)
+        lease = self._leases.get(job_id)
+        if job is None or job.status != JOB_RUNNING or lease is None or lease[0] != worker_id:
+            return None
+        return job
+
+    def extend_lease(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        with self._lock:
+            if self._owned(job_id, worker_id) is None:
+                return False
+            self._leases[job_id] = (worker_id, _now() + timedelta(seconds=lease_seconds))
+            return True
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        with self._lock:
+            job = self._owned(job_id, worker_id)
+            if job is None:
+                return False
+            job.status, job.result, job.last_error, job.finished_at = JOB_DONE, dict(result), None, _now()
+            self._leases.pop(job_id, None)
+            return True
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry_in_seconds: Optional[float]) -> bool:
+        with self._lock:
+            job = self._owned(job_id, worker_id)
+            if job is None:
+                return False
+            job.last_error = error
+            if retry_in_seconds is None:
+                job.status, job.finished_at = JOB_DEAD, _now()
+            else:
+                job.status, job.run_after = JOB_QUEUED, _now() + timedelta(seconds=retry_in_seconds)
+            self._leases.pop(job_id, None)
+            return True
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return replace(job) if job is not None else None
+
+    def count_active(self, client_id: Optional[str] = None) -> int:
+        with self._lock:
+            return sum(
+                1 for j in self._jobs.values()
+                if j.status in (JOB_QUEUED, JOB_RUNNING) and (client_id is None or j.client_id == client_id)
+            )
+
+    # Sin E/S: no hace falta pasar por un hilo
+    async def aenqueue(self, client_id: str, agent_id: str, payload: Dict[str, Any], max_attempts: int = 5) -> IngestionJob:
+        return self.enqueue(client_id, agent_id, payload, max_attempts)
+
+    async def aclaim(self, worker_id: str, lease_seconds: float) -> Optional[IngestionJob]:
+        return self.claim(worker_id, lease_seconds)
+
+    async def aextend_lease(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        return self.extend_lease(job_id, worker_id, lease_seconds)
+
+    async def acomplete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        return self.complete(job_id, worker_id, result)
+
+    async def afail(self, job_id: str, worker_id: str, error: str, retry_in_seconds: Optional[float]) -> bool:
+        return self.fail(job_id, worker_id, error, retry_in_seconds)
+
+    async def aget(self, job_id: str) -> Optional[IngestionJob]:
+        return self.get(job_id)
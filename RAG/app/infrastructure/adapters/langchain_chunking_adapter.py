@@ -1,13 +1,13 @@
 from __future__ import annotations
 
+import bisect
+import hashlib
+import logging
 import io
 import uuid
-import tempfile
-import os
-from typing import Iterable, List, Dict, Any, Optional
+from typing import Generator, Iterable, Iterator, List, Dict, Tuple
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
 
 try:
     from pypdf import PdfReader
@@ -17,74 +17,135 @@ except Exception:
 from app.core.domain.models import Chunk
 from app.core.domain.ports.chunking_port import ChunkingPort
 
+logger = logging.getLogger(__name__)
+
+
+def chunk_id(base_metadata: dict, content_hash: str, occurrence: int) -> str:
+    """
+    Id determinista del chunk: mismo tenant, documento y contenido => mismo id. Volver a subir un
+    documento (o reintentar una ingesta) sobrescribe los puntos en lugar de duplicarlos.
+    `occurrence` distingue textos idénticos repetidos dentro del mismo documento.
+    """
+    doc = base_metadata.get("doc_id") or base_metadata.get("source") or ""
+    name = "\x00".join((str(base_metadata.get("client_id", "")), str(base_metadata.get("agent_id", "")), str(doc), content_hash, str(occurrence)))
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, name))
+
 
 class LangChainChunkingAdapter(ChunkingPort):
+    """
+    Extrae el PDF página a página desde memoria (sin archivo temporal) y va partiendo el texto en
+    una ventana de `window_chars`: los chunks salen en cuanto la ventana se llena, así que la
+    memoria no crece con el tamaño del documento. Cada chunk lleva la página donde empieza y
+    donde termina (`page`, `page_end`).
+    """
+
     def __init__(
         self,
         chunk_size: int = 1000,
         chunk_overlap: int = 120,
         length_function=len,
+        window_chars: int = 0,
     ) -> None:
         self.splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             length_function=length_function,
         )
+        self._window = window_chars or 8 * chunk_size
 
     def split_file(self, file_bytes: bytes, file_name: str, base_metadata: dict) -> Iterable[Chunk]:
-        print(f"[chunking] split_file: bytes_in={len(file_bytes)} name={file_name}")
-
-        with tempfile.NamedTemporaryFile(suffix=self._suffix_from_name(file_name), delete=False) as tmp:
-            tmp.write(file_bytes)
-            tmp.flush()
-            tmp_path = tmp.name
-            print(f"[chunking] temp file created: {tmp.name}")
-
-        text = self._extract_text_from_pdf(tmp_path)
-        if not text.strip():
-            raise ValueError("No se pudo extraer texto del documento PDF.")
-
-        doc = Document(page_content=text, metadata=base_metadata)
-        split_docs = self.splitter.split_documents([doc])
-        print(f"[chunking] splitter.split_documents -> chunks={len(split_docs)}")
-
-        for i, d in enumerate(split_docs):
-            meta = dict(d.metadata or {})
-            meta["chunk_index"] = str(i)
-            meta["length"] = str(len(d.page_content))
-
+        logger.debug("split_file: bytes_in=%s name=%s", len(file_bytes), file_name)
+
+        chunk_index = 0
+        occurrences: Dict[str, int] = {}
+        for text, page, page_end in self._split_pages(self._iter_pages(file_bytes)):
+            meta = dict(base_metadata or {})
+            meta["chunk_index"] = str(chunk_index)
+            meta["length"] = str(len(text))
+            meta["page"] = str(page)
+            meta["page_end"] = str(page_end)
+            content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            meta["content_hash"] = content_hash
+            occurrence = occurrences.get(content_hash, 0)
+            occurrences[content_hash] = occurrence + 1
+            chunk_index += 1
 
             yield Chunk(
-                id=str(uuid.uuid4()),
-                content=d.page_content,
+                id=chunk_id(base_metadata, content_hash, occurrence),
+                content=text,
                 metadata=meta,
-                
             )
 
-        try:
-            os.remove(tmp_path)
-        except Exception as e:
-            print(f"[chunking][WARN] No se pudo eliminar el archivo temporal: {e}")
-
-    def _suffix_from_name(self, filename: str) -> str:
-        dot = filename.rfind(".")
-        return filename[dot:] if dot != -1 else ".pdf"
+        logger.debug("split_file -> chunks=%s", chunk_index)
+        if chunk_index == 0:
+            raise ValueError("No se pudo extraer texto del documento PDF.")
 
-    def _extract_text_from_pdf(self, path: str) -> str:
+    def _iter_pages(self, file_bytes: bytes) -> Iterator[Tuple[int, str]]:
+        """(número de página desde 1, texto) de cada página, de una en una."""
         if not PdfReader:
             raise ImportError("PyPDF no disponible.")
 
         try:
-            reader = PdfReader(path)
+            reader = PdfReader(io.BytesIO(file_bytes))
             if getattr(reader, "is_encrypted", False):
                 reader.decrypt("")
-
-            text = ""
-            for i, page in enumerate(reader.pages):
-                try:
-                    text += page.extract_text() or ""
-                except Exception as e:
-                    print(f"[chunking][ERROR] extract_text page={i} fallo: {e}")
-            return text
+            n_pages = len(reader.pages)
         except Exception as e:
             raise RuntimeError(f"No se pudo extraer texto del PDF: {e}")
+
+        for i in range(n_pages):
+            try:
+                text = reader.pages[i].extract_text() or ""
+            except Exception as e:
+                logger.error("extract_text page=%s fallo: %s", i, e)
+                continue
+            yield i + 1, text
+
+    def _split_pages(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[str, int, int]]:
+        buffer = ""
+        # (offset dentro de buffer, página) de cada página que empieza en la ventana
+        starts: List[Tuple[int, int]] = []
+        for page_no, text in pages:
+            if not text.strip():
+                continue
+            if buffer:
+                buffer += "\n"
+            starts.append((len(buffer), page_no))
+            buffer += text
+            if len(buffer) >= self._window:
+                buffer, starts = yield from self._drain(buffer, starts, final=False)
+        if buffer.strip():
+            yield from self._drain(buffer, starts, final=True)
+
+    def _drain(
+        self, buffer: str, starts: List[Tuple[int, int]], final: bool
+    ) -> Generator[Tuple[str, int, int], None, Tuple[str, List[Tuple[int, int]]]]:
+        """
+        Parte la ventana y emite sus chunks. Salvo al final, el último chunk se retiene: puede estar
+        cortado por el borde de la ventana, así que se vuelve a partir junto con las páginas siguientes.
+        Devuelve la ventana restante y sus inicios de página.
+        """
+        pieces = self.splitter.split_text(buffer)
+        emit = pieces if final else pieces[:-1]
+        cursor = 0
+        for piece in emit:
+            start = self._locate(buffer, piece, cursor)
+            yield piece, self._page_at(starts, start), self._page_at(starts, start + len(piece) - 1)
+            cursor = start + 1
+        if final or not pieces:
+            return "", []
+        tail_start = self._locate(buffer, pieces[-1], cursor)
+        tail_starts = [(0, self._page_at(starts, tail_start))]
+        tail_starts += [(off - tail_start, page) for off, page in starts if off > tail_start]
+        return buffer[tail_start:], tail_starts
+
+    @staticmethod
+    def _locate(buffer: str, piece: str, cursor: int) -> int:
+        # los chunks son subcadenas de la ventana, en orden (con solape, el siguiente empieza después)
+        start = buffer.find(piece, cursor)
+        return start if start >= 0 else cursor
+
+    @staticmethod
+    def _page_at(starts: List[Tuple[int, int]], offset: int) -> int:
+        i = bisect.bisect_right([off for off, _ in starts], offset) - 1
+        return starts[max(i, 0)][1]
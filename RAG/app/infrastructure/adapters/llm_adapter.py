@@ -1,8 +1,11 @@
+import logging
 import os
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+from typing import List, Dict, Any, Optional, AsyncIterator
+from openai import OpenAI, AsyncOpenAI
 
-from app.core.domain.ports.llm_port import LLMPort
+from app.core.domain.ports.llm_port import LLMPort, SUMMARY_INSTRUCTIONS
+
+logger = logging.getLogger(__name__)
 
 
 class OpenAILLMAdapter(LLMPort):
@@ -12,8 +15,13 @@ class OpenAILLMAdapter(LLMPort):
             raise ValueError("OPENAI_API_KEY debe estar configurado en las variables de entorno")
         base_url = os.environ.get("OPENAI_BASE_URL")
         self._client = OpenAI(api_key=api_key, base_url=base_url)
+        self._async_client = AsyncOpenAI(api_key=api_key, base_url=base_url)
         self._model = model
 
+    @property
+    def model(self) -> str:
+        return self._model
+
     @staticmethod
     def _format_context(context: List[Dict[str, Any]]) -> str:
         """
@@ -33,42 +41,33 @@ class OpenAILLMAdapter(LLMPort):
                 parts.append(str(text))
         return "\n\n".join(parts)
 
-    def response(self, prompt: str, context: List[Dict[str, Any]], system_prompt: Optional[str] = None) -> str:
-        ctx_text = self._format_context(context)
-        print(f"[llm] response ctx_items={len(context or [])} ctx_chars={len(ctx_text)} prompt_len={len(prompt)} sys_len={len(system_prompt or '')}")
+    @staticmethod
+    def _system_text(system_prompt: Optional[str]) -> str:
         base_system = (
             "Responde de forma clara y concisa. Usa únicamente el siguiente contexto si es relevante."
             " Si el contexto no contiene la información, dilo explícitamente y evita inventar datos."
         )
-        system = f"{system_prompt}\n\n{base_system}" if system_prompt else base_system
-        user_text = f"Pregunta: {prompt}\n\nContexto:\n{ctx_text}"
+        return f"{system_prompt}\n\n{base_system}" if system_prompt else base_system
 
-        messages = [
-            {"role": "system", "content": system},
+    def _build_messages(self, prompt: str, context: List[Dict[str, Any]], system_prompt: Optional[str]) -> List[Dict[str, str]]:
+        ctx_text = self._format_context(context)
+        logger.debug("response ctx_items=%s ctx_chars=%s prompt_len=%s sys_len=%s", len(context or []), len(ctx_text), len(prompt), len(system_prompt or ''))
+        user_text = f"Pregunta: {prompt}\n\nContexto:\n{ctx_text}"
+        return [
+            {"role": "system", "content": self._system_text(system_prompt)},
             {"role": "user", "content": user_text},
         ]
-        print(f"[llm] sending messages={len(messages)} user_text_chars={len(user_text)}")
-        resp = self._client.responses.create(model=self._model, input=messages)
-        text = getattr(resp, "output_text", None)
-        print(f"[llm] got response output_text_len={len(text) if isinstance(text,str) else 0}")
-        return text if isinstance(text, str) and text else str(resp)
 
-    def response_with_history(
+    def _build_messages_with_history(
         self,
         prompt: str,
         history: List[Dict[str, str]],
-        system_prompt: Optional[str] = None,
-        context: Optional[List[Dict[str, Any]]] = None,
-    ) -> str:
+        system_prompt: Optional[str],
+        context: Optional[List[Dict[str, Any]]],
+    ) -> List[Dict[str, str]]:
         ctx_text = self._format_context(context or [])
-        print(f"[llm] response_with_history history_len={len(history or [])} ctx_items={len(context or [])} ctx_chars={len(ctx_text)} prompt_len={len(prompt)} sys_len={len(system_prompt or '')}")
-        base_system = (
-            "Responde de forma clara y concisa. Usa únicamente el siguiente contexto si es relevante."
-            " Si el contexto no contiene la información, dilo explícitamente y evita inventar datos."
-        )
-        system = f"{system_prompt}\n\n{base_system}" if system_prompt else base_system
-
-        messages: List[Dict[str, str]] = [{"role": "system", "content": system}]
+        logger.debug("response_with_history history_len=%s ctx_items=%s ctx_chars=%s prompt_len=%s sys_len=%s", len(history or []), len(context or []), len(ctx_text), len(prompt), len(system_prompt or ''))
+        messages: List[Dict[str, str]] = [{"role": "system", "content": self._system_text(system_prompt)}]
         for m in history or []:
             role = m.get("role")
             content = m.get("content")
@@ -79,9 +78,90 @@ class OpenAILLMAdapter(LLMPort):
         if ctx_text:
             user_text += f"\n\nContexto:\n{ctx_text}"
         messages.append({"role": "user", "content": user_text})
+        return messages
 
-        print(f"[llm] sending messages={len(messages)} user_text_chars={len(user_text)}")
-        resp = self._client.responses.create(model=self._model, input=messages)
+    @staticmethod
+    def _output_text(resp: Any) -> str:
         text = getattr(resp, "output_text", None)
-        print(f"[llm] got response output_text_len={len(text) if isinstance(text,str) else 0}")
+        logger.debug("got response output_text_len=%s", len(text) if isinstance(text,str) else 0)
         return text if isinstance(text, str) and text else str(resp)
+
+    def response(self, prompt: str, context: List[Dict[str, Any]], system_prompt: Optional[str] = None) -> str:
+        messages = self._build_messages(prompt, context, system_prompt)
+        logger.debug("sending messages=%s user_text_chars=%s", len(messages), len(messages[-1]['content']))
+        resp = self._client.responses.create(model=self._model, input=messages)
+        return self._output_text(resp)
+
+    def response_with_history(
+        self,
+        prompt: str,
+        history: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        context: Optional[List[Dict[str, Any]]] = None,
+    ) -> str:
+        messages = self._build_messages_with_history(prompt, history, system_prompt, context)
+        logger.debug("sending messages=%s user_text_chars=%s", len(messages), len(messages[-1]['content']))
+        resp = self._client.responses.create(model=self._model, input=messages)
+        return self._output_text(resp)
+
+    async def aresponse(self, prompt: str, context: List[Dict[str, Any]], system_prompt: Optional[str] = None) -> str:
+        messages = self._build_messages(prompt, context, system_prompt)
+        logger.debug("sending(async) messages=%s user_text_chars=%s", len(messages), len(messages[-1]['content']))
+        resp = await self._async_client.responses.create(model=self._model, input=messages)
+        return self._output_text(resp)
+
+    async def aresponse_with_history(
+        self,
+        prompt: str,
+        history: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        context: Optional[List[Dict[str, Any]]] = None,
+    ) -> str:
+        messages = self._build_messages_with_history(prompt, history, system_prompt, context)
+        logger.debug("sending(async) messages=%s user_text_chars=%s", len(messages), len(messages[-1]['content']))
+        resp = await self._async_client.responses.create(model=self._model, input=messages)
+        return self._output_text(resp)
+
+    async def astream_response_with_history(
+        self,
+        prompt: str,
+        history: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        context: Optional[List[Dict[str, Any]]] = None,
+    ) -> AsyncIterator[str]:
+        messages = self._build_messages_with_history(prompt, history, system_prompt, context)
+        logger.debug("streaming messages=%s user_text_chars=%s", len(messages), len(messages[-1]['content']))
+        stream = await self._async_client.responses.create(model=self._model, input=messages, stream=True)
+        out_len = 0
+        try:
+            async for event in stream:
+                etype = getattr(event, "type", "")
+                if etype == "response.output_text.delta":
+                    delta = getattr(event, "delta", "")
+                    if delta:
+                        out_len += len(delta)
+                        yield delta
+                elif etype in ("response.failed", "error"):
+                    raise RuntimeError(f"LLM stream error: {event}")
+        finally:
+            # si el consumidor corta el stream, liberamos la conexión HTTP
+            await stream.close()
+        logger.debug("stream done output_text_len=%s", out_len)
+
+    async def asummarize(self, previous_summary: Optional[str], messages: List[Dict[str, str]]) -> str:
+        transcript = "\n".join(f"{m.get('role')}: {m.get('content')}" for m in messages if m.get("content"))
+        user_text = f"Resumen previo:\n{previous_summary or '(vacío)'}\n\nNuevos mensajes:\n{transcript}"
+        logger.debug("summarize messages=%s prev_len=%s", len(messages), len(previous_summary or ''))
+        resp = await self._async_client.responses.create(
+            model=self._model,
+            input=[
+                {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                {"role": "user", "content": user_text},
+            ],
+        )
+        return self._output_text(resp)
+
+    async def aclose(self) -> None:
+        # Cierra los pools HTTP keep-alive de ambos clientes
+        self._client.close()
+        await self._async_client.close()
@@ -1,4 +1,5 @@
 
+import logging
 import os
 import io
 import time
@@ -10,6 +11,8 @@ from minio.error import S3Error
 
 from app.core.domain.ports import storage_port
 
+logger = logging.getLogger(__name__)
+
 def _limpiar_nombre_archivo(nombre: str) -> str:
     #Como minio no soporta ciertos caracteres en los nombres de archivo, limpiamos el nombre con la estructura que
     # acepta S3
@@ -66,7 +69,7 @@ class MinioStorageAdapter(storage_port.StoragePort):
         # Subir el archivo a Minio
         file_size = len(file)
         file_stream = io.BytesIO(file)
-        print(f"[minio] put_object bucket={self.bucket_name} key={object_name} size={file_size}")
+        logger.debug("put_object bucket=%s key=%s size=%s", self.bucket_name, object_name, file_size)
         self.client.put_object(
             bucket_name=self.bucket_name,
             object_name=object_name,
@@ -74,7 +77,7 @@ class MinioStorageAdapter(storage_port.StoragePort):
             length=file_size,
             content_type="application/octet-stream"
         )
-        print(f"[minio] uploaded key={object_name}")
+        logger.debug("uploaded key=%s", object_name)
         return object_name
     
     # Obtiene el documento de un cliente desde minio
@@ -0,0 +1,196 @@
+# app/infrastructure/adapters/mmap_embedding_store_adapter.py
+"""
+Caché de embeddings de chunks en archivos locales mapeados en memoria (sin Postgres).
+
+Dentro de `root`:
+    index.bin            registros fijos de 44 bytes: sha256 (32) + dim (uint32) + fila (uint64)
+    f16-<dim>-<gen>.bin  matriz float16 de `dim` columnas, una fila por vector (solo se añade al final)
+    .lock                flock que serializa a los escritores de todos los procesos
+
+Un escritor añade primero las filas y después los registros del índice, así que un lector que ve
+un registro siempre encuentra su vector. Los lectores solo leen el tramo nuevo del índice.
+
+Como solo se añade, la caché se vacía entera cuando los datos superarían `max_bytes`: se sustituye
+index.bin por uno vacío (os.replace) y se borran las matrices. `<gen>` es el inodo de index.bin, así
+que cada proceso detecta el vaciado al leer el índice y no mezcla filas de generaciones distintas.
+"""
+import glob
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.domain.ports.embedding_store_port import EmbeddingStorePort
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos (un solo worker)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_INDEX = "index.bin"
+_LOCK = ".lock"
+_RECORD = np.dtype([("key", "V32"), ("dim", "<u4"), ("row", "<u8")])
+_DTYPE = np.dtype("<f2")
+
+
+class MmapEmbeddingStoreAdapter(EmbeddingStorePort):
+    def __init__(self, root: str, max_bytes: int = 4 * 1024**3) -> None:
+        self._root = root
+        self._max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.RLock()
+        # sha256 -> (dim, fila)
+        self._index: Dict[bytes, Tuple[int, int]] = {}
+        self._index_bytes = 0
+        self._gen = 0
+        self._maps: Dict[int, np.memmap] = {}
+        open(os.path.join(root, _INDEX), "ab").close()
+        # matrices sin generación (f16-<dim>.bin) de versiones anteriores: se empieza de cero
+        if any(_data_gen(path) is None for path in self._data_files()):
+            with self._file_lock():
+                self._reset()
+
+    @classmethod
+    def from_env(cls) -> "MmapEmbeddingStoreAdapter":
+        return cls(
+            root=os.getenv("CHUNK_EMBED_CACHE_PATH", "./data/chunk_embeddings"),
+            max_bytes=int(os.getenv("CHUNK_EMBED_CACHE_MAX_BYTES", str(4 * 1024**3))),
+        )
+
+    def _data_file(self, dim: int) -> str:
+        return os.path.join(self._root, f"f16-{dim}-{self._gen}.bin")
+
+    def _data_files(self) -> List[str]:
+        return glob.glob(os.path.join(self._root, "f16-*.bin"))
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self._root, _LOCK), "a+b") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _refresh(self) -> None:
+        """Incorpora los registros que otros procesos añadieron al índice (solo registros completos)."""
+        with open(os.path.join(self._root, _INDEX), "rb") as f:
+            st = os.fstat(f.fileno())
+            end = st.st_size - st.st_size % _RECORD.itemsize
+            if st.st_ino != self._gen or end < self._index_bytes:
+                # otro proceso vació la caché: lo leído es de la generación anterior
+                self._gen = st.st_ino
+                self._index.clear()
+                self._maps.clear()
+                self._index_bytes = 0
+            if end <= self._index_bytes:
+                return
+            f.seek(self._index_bytes)
+            records = np.frombuffer(f.read(end - self._index_bytes), dtype=_RECORD)
+        for rec in records:
+            self._index[bytes(rec["key"])] = (int(rec["dim"]), int(rec["row"]))
+        self._index_bytes = end
+
+    def _matrix(self, dim: int, min_rows: int) -> np.memmap:
+        m = self._maps.get(dim)
+        if m is None or m.shape[0] < min_rows:
+            rows = os.path.getsize(self._data_file(dim)) // (dim * _DTYPE.itemsize)
+            m = np.memmap(self._data_file(dim), dtype=_DTYPE, mode="r", shape=(rows, dim))
+            self._maps[dim] = m
+        return m
+
+    def _reset(self) -> None:
+        """Vacía la caché; requiere el flock."""
+        index_path = os.path.join(self._root, _INDEX)
+        tmp = index_path + ".tmp"
+        open(tmp, "wb").close()
+        os.replace(tmp, index_path)
+        self._refresh()
+        for path in self._data_files():
+            if _data_gen(path) != self._gen:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning("chunk embedding cache: no se pudo borrar %s: %s", path, e)
+
+    def _data_bytes(self) -> int:
+        return sum(os.path.getsize(path) for path in self._data_files() if _data_gen(path) == self._gen)
+
+    def _missing(self, items: Dict[str, List[float]]) -> Dict[int, List[Tuple[bytes, List[float]]]]:
+        by_dim: Dict[int, List[Tuple[bytes, List[float]]]] = {}
+        for key, vec in items.items():
+            digest = bytes.fromhex(key)
+            if digest not in self._index:
+                by_dim.setdefault(len(vec), []).append((digest, vec))
+        return by_dim
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        if not keys:
+            return {}
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            self._refresh()
+            for key in keys:
+                loc = self._index.get(bytes.fromhex(key))
+                if loc is None:
+                    continue
+                dim, row = loc
+                try:
+                    found[key] = self._matrix(dim, row + 1)[row].astype(np.float32).tolist()
+                except FileNotFoundError:
+                    # vaciada entre la lectura del índice y la de la matriz: se trata como fallo
+                    continue
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        with self._file_lock():
+            self._refresh()
+            by_dim = self._missing(items)
+            if not by_dim:
+                return
+            incoming = sum(len(vec) * _DTYPE.itemsize for entries in by_dim.values() for _, vec in entries)
+            if self._data_bytes() + incoming > self._max_bytes:
+                logger.info("chunk embedding cache: se superarían %s bytes, se vacía", self._max_bytes)
+                self._reset()
+                by_dim = self._missing(items)
+            records = []
+            for dim, entries in by_dim.items():
+                path = self._data_file(dim)
+                # un escritor que murió a mitad de fila deja bytes sueltos: se recortan
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                row_bytes = dim * _DTYPE.itemsize
+                with open(path, "ab") as f:
+                    if size % row_bytes:
+                        f.truncate(size - size % row_bytes)
+                    first = size // row_bytes
+                    f.write(np.asarray([v for _, v in entries], dtype=_DTYPE).tobytes())
+                for i, (digest, _) in enumerate(entries):
+                    records.append((digest, dim, first + i))
+            index_path = os.path.join(self._root, _INDEX)
+            with open(index_path, "ab") as f:
+                size = os.path.getsize(index_path)
+                if size % _RECORD.itemsize:
+                    f.truncate(size - size % _RECORD.itemsize)
+                f.write(np.array(records, dtype=_RECORD).tobytes())
+            self._refresh()
+
+    async def aclose(self) -> None:
+        with self._lock:
+            self._maps.clear()
+
+
+def _data_gen(path: str) -> Optional[int]:
+    """Generación de una matriz `f16-<dim>-<gen>.bin` (None si es de las antiguas sin generación)."""
+    parts = os.path.basename(path)[: -len(".bin")].split("-")
+    return int(parts[2]) if len(parts) == 3 and parts[2].isdigit() else None
@@ -0,0 +1,595 @@
+# app/infrastructure/adapters/numpy_vector_adapter.py
+"""
+Índice vectorial en proceso (NumPy + archivos mapeados en memoria) para tenants pequeños y para
+entornos de test/benchmark sin Qdrant.
+
+Cada colección vive en `<root>/<colección>/`:
+    meta.json            {"dim", "dtype", "generation"}
+    g<N>/vectors.bin     matriz float32/float16 (filas normalizadas, solo se añade al final)
+    g<N>/alive.bin       un byte por fila: 1 = viva, 0 = borrada (tombstone)
+    g<N>/points.jsonl    una línea {"id", "payload"} por fila
+
+Un upsert añade filas y marca como borradas las versiones anteriores del mismo id; la
+compactación reescribe solo las filas vivas en una nueva generación y cambia meta.json de forma
+atómica. La búsqueda es un producto matriz·vector por bloques sobre el memmap + top-k con
+argpartition. Varios procesos (workers de uvicorn) pueden compartir el directorio: las escrituras
+se serializan con flock y los lectores recargan si los archivos cambiaron.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.domain.ports.vector_port import VectorPort
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos (un solo worker)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_META = "meta.json"
+_VECTORS = "vectors.bin"
+_ALIVE = "alive.bin"
+_POINTS = "points.jsonl"
+_LOCK = ".lock"
+_BLOCK_ROWS = 65536
+_VALID_NAME = re.compile(r"^[A-Za-z0-9_.\-]+$")
+
+
+class CollectionDroppedError(RuntimeError):
+    """La colección se borró (p. ej. otro proceso la promovió a Qdrant) mientras se esperaba su lock."""
+
+
+def _normalize_rows(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    return m / np.clip(norms, 1e-12, None)
+
+
+class _LocalCollection:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.RLock()
+        self.dim = 0
+        self.dtype = np.dtype(np.float32)
+        self.generation = 0
+        self.ids: List[str] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self.rows: Dict[str, int] = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.matrix: Optional[np.ndarray] = None
+        self._columns: Dict[str, np.ndarray] = {}
+        self._points_bytes = 0
+        self._signature: Optional[Tuple[int, ...]] = None
+        # flock ya tomado por el hilo que tiene `lock` (el flock no es reentrante entre descriptores)
+        self._flocked = False
+
+    # ---------------- Archivos ----------------
+    def _file(self, name: str, generation: Optional[int] = None) -> str:
+        gen = self.generation if generation is None else generation
+        return os.path.join(self.path, f"g{gen}", name)
+
+    def _disk_signature(self) -> Optional[Tuple[int, ...]]:
+        try:
+            meta = os.stat(os.path.join(self.path, _META))
+            vec = os.stat(self._file(_VECTORS))
+            alive = os.stat(self._file(_ALIVE))
+            points = os.stat(self._file(_POINTS))
+        except FileNotFoundError:
+            return None
+        # los tamaños delatan un append aunque el mtime (de resolución gruesa) no haya cambiado
+        return (meta.st_ino, meta.st_mtime_ns, vec.st_size, alive.st_size, alive.st_mtime_ns, points.st_size)
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        with self.lock:
+            if fcntl is None or self._flocked:
+                yield
+                return
+            try:
+                fh = open(os.path.join(self.path, _LOCK), "a+b")
+            except FileNotFoundError:
+                raise CollectionDroppedError(self.path) from None
+            with fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                self._flocked = True
+                try:
+                    yield
+                finally:
+                    self._flocked = False
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def is_fresh(self) -> bool:
+        """True si lo cargado coincide con el disco (solo hace stat; no recarga)."""
+        return self._signature is not None and self._disk_signature() == self._signature
+
+    def _write_meta(self, generation: int) -> None:
+        tmp = os.path.join(self.path, _META + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"dim": self.dim, "dtype": self.dtype.name, "generation": generation}, f)
+        os.replace(tmp, os.path.join(self.path, _META))
+
+    @classmethod
+    def create(cls, path: str, dim: int, dtype: np.dtype) -> "_LocalCollection":
+        coll = cls(path)
+        os.makedirs(path, exist_ok=True)
+        with coll._file_lock():
+            if coll.exists():  # la creó otro proceso a la vez
+                coll.load()
+                return coll
+            coll.dim, coll.dtype = dim, np.dtype(dtype)
+            os.makedirs(os.path.join(path, "g0"), exist_ok=True)
+            for name in (_VECTORS, _ALIVE, _POINTS):
+                open(coll._file(name), "ab").close()
+            coll._write_meta(0)
+            coll._signature = coll._disk_signature()
+        return coll
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.path, _META))
+
+    def load(self) -> None:
+        # la firma se toma antes de leer: si otro proceso escribe durante la lectura, la próxima
+        # refresh() vuelve a cargar en vez de dar por buena una vista a medias
+        signature = self._disk_signature()
+        with open(os.path.join(self.path, _META)) as f:
+            meta = json.load(f)
+        self.dim = int(meta["dim"])
+        self.dtype = np.dtype(meta["dtype"])
+        self.generation = int(meta["generation"])
+
+        n_vec = os.path.getsize(self._file(_VECTORS)) // (self.dim * self.dtype.itemsize)
+        with open(self._file(_ALIVE), "rb") as f:
+            alive_raw = f.read()
+        ids: List[str] = []
+        payloads: List[Dict[str, Any]] = []
+        ends: List[int] = []  # offset de fin de cada línea, para truncar una cola incompleta
+        with open(self._file(_POINTS), "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n") or len(ids) >= n_vec:
+                    break  # línea a medio escribir (corte durante un append)
+                rec = json.loads(line)
+                ids.append(str(rec["id"]))
+                payloads.append(rec.get("payload") or {})
+                ends.append((ends[-1] if ends else 0) + len(line))
+
+        # Un append interrumpido deja los tres archivos con longitudes distintas: vale el mínimo
+        n = min(n_vec, len(alive_raw), len(ids))
+        self.ids, self.payloads = ids[:n], payloads[:n]
+        self._points_bytes = ends[n - 1] if n else 0
+        self.alive = np.frombuffer(alive_raw[:n], dtype=np.uint8).astype(bool)
+        self.rows = {}
+        for row, pid in enumerate(self.ids):
+            if not self.alive[row]:
+                continue
+            prev = self.rows.get(pid)
+            if prev is not None:
+                self.alive[prev] = False  # corte entre el append y el tombstone: gana la última versión
+            self.rows[pid] = row
+        self._columns = {}
+        self._map()
+        self._signature = signature
+
+    def refresh(self) -> bool:
+        """Recarga si otro proceso cambió los archivos. False si la colección ya no existe."""
+        sig = self._disk_signature()
+        if sig is None:
+            if not self.exists():
+                return False
+            self.load()  # cambió de generación
+        elif sig != self._signature:
+            self.load()
+        return True
+
+    def _map(self) -> None:
+        n = len(self.ids)
+        self.matrix = np.memmap(self._file(_VECTORS), dtype=self.dtype, mode="r", shape=(n, self.dim)) if n else None
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    @property
+    def live(self) -> int:
+        return int(self.alive.sum())
+
+    # ---------------- Escritura ----------------
+    def _refresh_for_write(self) -> None:
+        if not self.refresh():
+            raise CollectionDroppedError(self.path)
+
+    def append(self, ids: List[str], vectors: np.ndarray, payloads: List[Dict[str, Any]]) -> None:
+        with self._file_lock():
+            self._refresh_for_write()
+            n0 = self.size
+            row_bytes = self.dim * self.dtype.itemsize
+            # descartar una cola a medio escribir antes de añadir, para no desalinear filas
+            os.truncate(self._file(_VECTORS), n0 * row_bytes)
+            os.truncate(self._file(_ALIVE), n0)
+            os.truncate(self._file(_POINTS), self._points_bytes)
+
+            dead: List[int] = []
+            rows = dict(self.rows)
+            for k, pid in enumerate(ids):
+                prev = rows.get(pid)
+                if prev is not None:
+                    dead.append(prev)
+                rows[pid] = n0 + k
+
+            lines = "".join(
+                json.dumps({"id": pid, "payload": p}, ensure_ascii=False, default=str) + "\n"
+                for pid, p in zip(ids, payloads)
+            ).encode("utf-8")
+            with open(self._file(_VECTORS), "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=self.dtype).tobytes())
+            with open(self._file(_ALIVE), "ab") as f:
+                f.write(b"\x01" * len(ids))
+            with open(self._file(_POINTS), "ab") as f:
+                f.write(lines)
+
+            self.ids.extend(ids)
+            self.payloads.extend(payloads)
+            self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+            self.rows = rows
+            self._points_bytes += len(lines)
+            for field, col in list(self._columns.items()):
+                self._columns[field] = np.concatenate([col, self._column_values(field, payloads)])
+            self._map()
+            # el tombstone va después del append: un corte deja un duplicado (se resuelve al cargar), no una pérdida
+            self._tombstone(dead)
+            self._signature = self._disk_signature()
+
+    def _tombstone(self, rows: List[int]) -> None:
+        if not rows:
+            return
+        with open(self._file(_ALIVE), "r+b") as f:
+            for row in sorted(set(rows)):
+                f.seek(row)
+                f.write(b"\x00")
+                self.alive[row] = False
+                if self.rows.get(self.ids[row]) == row:
+                    del self.rows[self.ids[row]]
+
+    def delete_rows(self, select: Callable[[], List[int]]) -> int:
+        with self._file_lock():
+            self._refresh_for_write()
+            rows = [r for r in select() if self.alive[r]]
+            self._tombstone(rows)
+            self._signature = self._disk_signature()
+            return len(rows)
+
+    def compact(self) -> None:
+        """Reescribe solo las filas vivas en una generación nueva y cambia meta.json atómicamente."""
+        with self._file_lock():
+            self._refresh_for_write()
+            keep = np.flatnonzero(self.alive)
+            old_gen, new_gen = self.generation, self.generation + 1
+            os.makedirs(os.path.join(self.path, f"g{new_gen}"), exist_ok=True)
+            with open(self._file(_VECTORS, new_gen), "wb") as f:
+                for start in range(0, len(keep), _BLOCK_ROWS):
+                    f.write(np.ascontiguousarray(self.matrix[keep[start:start + _BLOCK_ROWS]]).tobytes())
+            with open(self._file(_ALIVE, new_gen), "wb") as f:
+                f.write(b"\x01" * len(keep))
+            with open(self._file(_POINTS, new_gen), "wb") as f:
+                for row in keep:
+                    f.write((json.dumps({"id": self.ids[row], "payload": self.payloads[row]}, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+            self.matrix = None
+            self._write_meta(new_gen)
+            self.load()
+            # los lectores de otros procesos pueden tener mapeada la generación vieja hasta recargar
+            shutil.rmtree(os.path.join(self.path, f"g{old_gen}"), ignore_errors=True)
+
+    # ---------------- Lectura ----------------
+    @staticmethod
+    def _column_values(field: str, payloads: List[Dict[str, Any]]) -> np.ndarray:
+        col = np.empty(len(payloads), dtype=object)
+        col[:] = [p.get(field) for p in payloads]
+        return col
+
+    def _mask(self, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        mask = self.alive.copy()
+        for field, value in (filters or {}).items():
+            col = self._columns.get(field)
+            if col is None:
+                col = self._columns[field] = self._column_values(field, self.payloads)
+            mask &= col == value
+        return mask
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        # (n, m) por bloques: con float16 solo se convierte a float32 un bloque cada vez
+        out = np.empty((self.size, queries.shape[0]), dtype=np.float32)
+        for start in range(0, self.size, _BLOCK_ROWS):
+            block = np.asarray(self.matrix[start:start + _BLOCK_ROWS], dtype=np.float32)
+            out[start:start + len(block)] = block @ queries.T
+        return out
+
+    def search_many(
+        self, queries: np.ndarray, top_k: int, filters: List[Optional[Dict[str, Any]]], with_vectors: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        with self.lock:
+            self.refresh()
+            return self.search_loaded(queries, top_k, filters, with_vectors)
+
+    def search_loaded(
+        self, queries: np.ndarray, top_k: int, filters: List[Optional[Dict[str, Any]]], with_vectors: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        """Búsqueda sobre lo ya cargado, sin recargar: llamar con `lock` tomado."""
+        if self.size == 0 or top_k <= 0:
+            return [[] for _ in range(len(queries))]
+        scores = self._scores(queries)
+        results = []
+        for j, flt in enumerate(filters):
+            mask = self._mask(flt)
+            n_ok = int(mask.sum())
+            if n_ok == 0:
+                results.append([])
+                continue
+            col = np.where(mask, scores[:, j], -np.inf)
+            k = min(top_k, n_ok)
+            top = np.argpartition(-col, k - 1)[:k]
+            top = top[np.argsort(-col[top])]
+            hits = [{"id": self.ids[r], "score": float(col[r]), "payload": self.payloads[r]} for r in top]
+            if with_vectors:
+                for hit, vec in zip(hits, np.asarray(self.matrix[top], dtype=np.float32)):
+                    hit["vector"] = vec
+            results.append(hits)
+        return results
+
+    def scroll(self, filters: Optional[Dict[str, Any]], payload_fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+        with self.lock:
+            self.refresh()
+            rows = np.flatnonzero(self._mask(filters))
+            if payload_fields is None:
+                return [{"id": self.ids[r], "payload": dict(self.payloads[r])} for r in rows]
+            return [
+                {"id": self.ids[r], "payload": {f: self.payloads[r][f] for f in payload_fields if f in self.payloads[r]}}
+                for r in rows
+            ]
+
+    def iter_points(self, batch: int) -> Iterator[Tuple[List[str], List[List[float]], List[Dict[str, Any]]]]:
+        with self.lock:
+            self.refresh()
+            keep = np.flatnonzero(self.alive)
+            for start in range(0, len(keep), batch):
+                rows = keep[start:start + batch]
+                yield (
+                    [self.ids[r] for r in rows],
+                    np.asarray(self.matrix[rows], dtype=np.float32).tolist(),
+                    [self.payloads[r] for r in rows],
+                )
+
+
+class NumpyVectorAdapter(VectorPort):
+    def __init__(
+        self,
+        root: str,
+        dtype: str = "float32",
+        compact_ratio: float = 0.3,
+        compact_min_rows: int = 1024,
+        inline_rows: int = 20_000,
+    ) -> None:
+        self._root = root
+        self._dtype = np.dtype(dtype)
+        # compactar cuando las filas borradas superan este porcentaje (y hay suficientes filas)
+        self._compact_ratio = compact_ratio
+        self._compact_min_rows = compact_min_rows
+        # por debajo de este tamaño asearch calcula en el event loop (más barato que saltar a un hilo)
+        self._inline_rows = inline_rows
+        self._collections: Dict[str, _LocalCollection] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "NumpyVectorAdapter":
+        return cls(
+            root=os.getenv("VECTOR_LOCAL_PATH", "./data/vectors"),
+            dtype=os.getenv("VECTOR_LOCAL_DTYPE", "float32"),
+            compact_ratio=float(os.getenv("VECTOR_LOCAL_COMPACT_RATIO", "0.3")),
+            compact_min_rows=int(os.getenv("VECTOR_LOCAL_COMPACT_MIN_ROWS", "1024")),
+        )
+
+    # ---------------- Colecciones ----------------
+    def _get(self, collection: str, create_dim: Optional[int] = None) -> Optional[_LocalCollection]:
+        if not _VALID_NAME.match(collection):
+            raise ValueError(f"Nombre de colección inválido: '{collection}'")
+        with self._lock:
+            coll = self._collections.get(collection)
+        if coll is not None:
+            # sin el lock global: una escritura larga en una colección no frena a las demás
+            with coll.lock:
+                if coll.refresh():
+                    return coll
+            # la borró otro proceso (p. ej. promovida a Qdrant)
+            with self._lock:
+                if self._collections.get(collection) is coll:
+                    del self._collections[collection]
+
+        with self._lock:
+            coll = self._collections.get(collection)
+            if coll is not None:
+                return coll
+            path = os.path.join(self._root, collection)
+            coll = _LocalCollection(path)
+            if coll.exists():
+                coll.load()
+            elif create_dim is not None:
+                logger.info("creating collection '%s' dim=%s dtype=%s", collection, create_dim, self._dtype.name)
+                coll = _LocalCollection.create(path, create_dim, self._dtype)
+            else:
+                return None
+            self._collections[collection] = coll
+            return coll
+
+    def has_collection(self, collection: str) -> bool:
+        return self._get(collection) is not None
+
+    async def ahas_collection(self, collection: str) -> bool:
+        # Desde el event loop: solo stat si la respuesta es obvia; cargar o esperar un lock, en un hilo
+        coll = self._collections.get(collection)
+        if coll is not None and coll.is_fresh():
+            return True
+        if coll is None and _VALID_NAME.match(collection) and not os.path.exists(os.path.join(self._root, collection, _META)):
+            return False
+        return await asyncio.to_thread(self.has_collection, collection)
+
+    @contextmanager
+    def exclusive(self, collection: str) -> Iterator[bool]:
+        """
+        Retiene el lock de escritura de la colección (hilos y procesos) durante el bloque; las
+        escrituras del mismo hilo dentro del bloque no lo vuelven a pedir. Da False si no existe.
+        """
+        coll = self._get(collection)
+        if coll is None:
+            yield False
+            return
+        with coll._file_lock():
+            yield coll.refresh()
+
+    def collection_dim(self, collection: str) -> Optional[int]:
+        coll = self._get(collection)
+        return coll.dim if coll is not None else None
+
+    def count(self, collection: str) -> int:
+        coll = self._get(collection)
+        return coll.live if coll is not None else 0
+
+    def drop_collection(self, collection: str) -> None:
+        coll = self._get(collection)
+        with self._lock:
+            self._collections.pop(collection, None)
+        if coll is not None:
+            with coll.lock:
+                coll.matrix = None
+                shutil.rmtree(coll.path, ignore_errors=True)
+            logger.info("dropped collection '%s'", collection)
+
+    @staticmethod
+    def _check_dim(collection: str, coll: _LocalCollection, dim: int) -> None:
+        if dim != coll.dim:
+            raise ValueError(f"Dimensión del vector ({dim}) distinta a la de la colección '{collection}' ({coll.dim})")
+
+    # ---------------- Escritura ----------------
+    def up_embeddings(self, ids: List[str], vectors: List[List[float]], payloads: List[Dict[str, Any]], collection: str) -> None:
+        if not ids:
+            return
+        matrix = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        coll = self._get(collection, create_dim=matrix.shape[1])
+        self._check_dim(collection, coll, matrix.shape[1])
+        coll.append([str(i) for i in ids], matrix, [dict(p or {}) for p in payloads])
+        logger.debug("upsert collection='%s' n_points=%s live=%s", collection, len(ids), coll.live)
+        self._maybe_compact(collection, coll)
+
+    def delete(self, ids: List[str], collection: str) -> int:
+        """Marca como borrados los puntos con esos ids (tombstone). Devuelve cuántos había."""
+        coll = self._get(collection)
+        if coll is None:
+            return 0
+        wanted = {str(i) for i in ids}
+        n = coll.delete_rows(lambda: [coll.rows[i] for i in wanted if i in coll.rows])
+        self._maybe_compact(collection, coll)
+        return n
+
+    def delete_by_filter(self, collection: str, filters: Dict[str, Any]) -> int:
+        if not filters:
+            raise ValueError("delete_by_filter requiere al menos un filtro")
+        coll = self._get(collection)
+        if coll is None:
+            return 0
+        n = coll.delete_rows(lambda: np.flatnonzero(coll._mask(filters)).tolist())
+        logger.info("deleted collection='%s' filters=%s n_points=%s", collection, filters, n)
+        self._maybe_compact(collection, coll)
+        return n
+
+    def scroll(self, collection: str, filters: Optional[Dict[str, Any]] = None, payload_fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        coll = self._get(collection)
+        return coll.scroll(filters, payload_fields) if coll is not None else []
+
+    def _maybe_compact(self, collection: str, coll: _LocalCollection) -> None:
+        dead = coll.size - coll.live
+        if coll.size >= self._compact_min_rows and dead >= self._compact_ratio * coll.size:
+            logger.info("compacting '%s' rows=%s dead=%s", collection, coll.size, dead)
+            coll.compact()
+
+    def compact(self, collection: str) -> None:
+        coll = self._get(collection)
+        if coll is not None:
+            coll.compact()
+
+    def iter_points(self, collection: str, batch: int = 256) -> Iterator[Tuple[List[str], List[List[float]], List[Dict[str, Any]]]]:
+        coll = self._get(collection)
+        if coll is not None:
+            yield from coll.iter_points(batch)
+
+    # ---------------- Búsqueda ----------------
+    def _search_many(
+        self, vectors: List[List[float]], collection: str, top_k: int, filters: List[Optional[Dict[str, Any]]], with_vectors: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        coll = self._get(collection)
+        if coll is None:
+            return [[] for _ in vectors]
+        queries = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        self._check_dim(collection, coll, queries.shape[1])
+        return coll.search_many(queries, top_k, filters, with_vectors)
+
+    def search(self, vector: List[float], collection: str, top_k: int = 5, filters: Optional[Dict[str, Any]] = None, with_vectors: bool = False) -> List[Dict[str, Any]]:
+        return self._search_many([vector], collection, top_k, [filters], with_vectors)[0]
+
+    async def asearch(self, vector: List[float], collection: str, top_k: int = 5, filters: Optional[Dict[str, Any]] = None, with_vectors: bool = False) -> List[Dict[str, Any]]:
+        return (await self.asearch_batch([vector], collection, top_k, [filters], with_vectors))[0]
+
+    async def asearch_batch(
+        self,
+        vectors: List[List[float]],
+        collection: str,
+        top_k: int = 5,
+        filters: Optional[List[Optional[Dict[str, Any]]]] = None,
+        with_vectors: bool = False,
+    ) -> List[List[Dict[str, Any]]]:
+        # Un solo producto matriz·matriz para todas las consultas del lote
+        if not vectors:
+            return []
+        per_item = filters or [None] * len(vectors)
+        results = self._search_inline(vectors, collection, top_k, per_item, with_vectors)
+        if results is None:
+            results = await asyncio.to_thread(self._search_many, vectors, collection, top_k, per_item, with_vectors)
+        return results
+
+    def _search_inline(
+        self, vectors: List[List[float]], collection: str, top_k: int, filters: List[Optional[Dict[str, Any]]], with_vectors: bool
+    ) -> Optional[List[List[Dict[str, Any]]]]:
+        """
+        Búsqueda en el event loop solo si es pequeña y no hay que esperar a nadie: colección ya
+        cargada y al día, y su lock libre. None si hay que ir a un hilo (lock ocupado por una
+        escritura, recarga pendiente o colección grande).
+        """
+        coll = self._collections.get(collection)
+        if coll is None or coll.size > self._inline_rows or not coll.lock.acquire(blocking=False):
+            return None
+        try:
+            if not coll.is_fresh():
+                return None
+            queries = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+            self._check_dim(collection, coll, queries.shape[1])
+            return coll.search_loaded(queries, top_k, filters, with_vectors)
+        finally:
+            coll.lock.release()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            colls = dict(self._collections)
+        return {name: {"rows": c.size, "live": c.live} for name, c in colls.items()}
+
+    async def aclose(self) -> None:
+        # Cada escritura ya está en disco; solo se sueltan los memmaps
+        with self._lock:
+            colls, self._collections = list(self._collections.values()), {}
+        for coll in colls:
+            coll.matrix = None
@@ -0,0 +1,206 @@
+# app/infrastructure/adapters/onnx_embedding_adapter.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.domain.ports.embedding_port import EmbeddingPort
+
+try:  # dependencias opcionales: solo hacen falta si se usa el backend "onnx"
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+except ImportError:
+    ort = None
+    Tokenizer = None
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+class OnnxEmbeddingAdapter(EmbeddingPort):
+    """
+    Embeddings locales en CPU con un modelo sentence-transformers exportado a ONNX
+    (p. ej. multilingual-e5-small / paraphrase-multilingual-MiniLM, fp32 o cuantizado int8).
+
+    Batching dinámico: las peticiones concurrentes (consultas de varios requests, lotes de
+    ingesta) se juntan en una cola y un hilo colector arma lotes de hasta `max_batch` textos,
+    esperando como mucho `max_wait_ms` a que lleguen más. Cada lote se ejecuta en un pool de
+    `workers` hilos (onnxruntime libera el GIL y su `run` es thread-safe).
+
+    Consultas y documentos llevan cada uno su prefijo (`query_prefix` / `document_prefix`, p. ej.
+    "query: " y "passage: " en e5). El prefijo de documentos forma parte de `model`, y la huella de
+    documentos (`document_fingerprint`) suma el truncado y el contenido del modelo y del tokenizer:
+    la caché de embeddings de chunks no mezcla vectores calculados de otra forma.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        tokenizer_path: Optional[str] = None,
+        max_length: int = 256,
+        max_batch: int = 32,
+        max_wait_ms: float = 5.0,
+        workers: int = 2,
+        intra_op_threads: int = 0,
+        query_prefix: str = "",
+        document_prefix: str = "",
+    ) -> None:
+        if ort is None or Tokenizer is None:
+            raise RuntimeError("El backend onnx necesita 'onnxruntime' y 'tokenizers' instalados")
+        if not os.path.isfile(model_path):
+            raise ValueError(f"Modelo ONNX no encontrado: {model_path}")
+
+        base = f"onnx:{os.path.basename(os.path.dirname(os.path.abspath(model_path)))}/{os.path.basename(model_path)}"
+        self.model = f"{base}#{document_prefix}" if document_prefix else base
+        self.query_model = f"{base}#{query_prefix}" if query_prefix else base
+        tokenizer_path = tokenizer_path or os.path.join(os.path.dirname(model_path), "tokenizer.json")
+        self._tokenizer = Tokenizer.from_file(tokenizer_path)
+        # otro archivo con el mismo nombre (p. ej. re-exportado o cuantizado) da otros vectores
+        self._fingerprint = "|".join(
+            [self.model, f"len={max_length}", _file_digest(model_path), _file_digest(tokenizer_path)]
+        )
+        self._tokenizer.enable_truncation(max_length=max_length)
+        self._tokenizer.enable_padding()
+        self._query_prefix = query_prefix
+        self._document_prefix = document_prefix
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            opts.intra_op_num_threads = intra_op_threads
+        self._session = ort.InferenceSession(model_path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self._session.get_inputs()}
+
+        self._max_batch = max(1, max_batch)
+        self._max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="onnx-embed")
+        self._queue: "queue.Queue[Optional[Tuple[List[str], Future]]]" = queue.Queue()
+        self._closed = False
+        self._collector = threading.Thread(target=self._collect, name="onnx-embed-batcher", daemon=True)
+        self._collector.start()
+
+    def document_fingerprint(self) -> str:
+        return self._fingerprint
+
+    @classmethod
+    def from_env(cls) -> "OnnxEmbeddingAdapter":
+        return cls(
+            model_path=os.environ["ONNX_EMBED_MODEL_PATH"],
+            tokenizer_path=os.getenv("ONNX_EMBED_TOKENIZER_PATH") or None,
+            max_length=int(os.getenv("ONNX_EMBED_MAX_LENGTH", "256")),
+            max_batch=int(os.getenv("ONNX_EMBED_MAX_BATCH", "32")),
+            max_wait_ms=float(os.getenv("ONNX_EMBED_MAX_WAIT_MS", "5")),
+            workers=int(os.getenv("ONNX_EMBED_WORKERS", "2")),
+            intra_op_threads=int(os.getenv("ONNX_EMBED_INTRA_OP_THREADS", "0")),
+            # ONNX_EMBED_PREFIX (un solo prefijo para todo) queda como valor por defecto de ambos
+            query_prefix=os.getenv("ONNX_EMBED_QUERY_PREFIX", os.getenv("ONNX_EMBED_PREFIX", "")),
+            document_prefix=os.getenv("ONNX_EMBED_DOCUMENT_PREFIX", os.getenv("ONNX_EMBED_PREFIX", "")),
+        )
+
+    # ---------------- Inferencia ----------------
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(texts)
+        ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+        mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        hidden = self._session.run(None, feeds)[0]  # (batch, seq, dim)
+
+        # mean pooling sobre los tokens reales + normalización L2 (como sentence-transformers)
+        m = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    # ---------------- Batching dinámico ----------------
+    def _collect(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            size = len(item[0])
+            deadline = time.monotonic() + self._max_wait
+            while size < self._max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._queue.put(None)  # reencolar la señal de cierre para la próxima vuelta
+                    break
+                batch.append(nxt)
+                size += len(nxt[0])
+            self._pool.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch: List[Tuple[List[str], Future]]) -> None:
+        texts = [t for texts, _ in batch for t in texts]
+        try:
+            vectors = self._encode(texts)
+        except Exception as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        start = 0
+        for req_texts, fut in batch:
+            fut.set_result(vectors[start:start + len(req_texts)])
+            start += len(req_texts)
+
+    def _submit(self, texts: List[str], prefix: str) -> List[Future]:
+        if self._closed:
+            raise RuntimeError("OnnxEmbeddingAdapter cerrado")
+        if prefix:
+            texts = [prefix + t for t in texts]
+        # una llamada de ingesta con 1000 textos no debe formar un solo lote: se trocea a max_batch
+        futures = []
+        for i in range(0, len(texts), self._max_batch):
+            fut: Future = Future()
+            self._queue.put((texts[i:i + self._max_batch], fut))
+            futures.append(fut)
+        return futures
+
+    @staticmethod
+    def _finish(parts: List[np.ndarray], dimensions: Optional[int]) -> List[List[float]]:
+        if not parts:
+            return []
+        vectors = np.concatenate(parts, axis=0)
+        if dimensions and dimensions < vectors.shape[1]:
+            vectors = vectors[:, :dimensions]
+            vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors.astype(np.float32).tolist()
+
+    def create_embeddings(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        return self._finish([f.result() for f in self._submit(texts, self._document_prefix)], dimensions)
+
+    async def acreate_embeddings(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        parts = await asyncio.gather(*[asyncio.wrap_future(f) for f in self._submit(texts, self._document_prefix)])
+        return self._finish(list(parts), dimensions)
+
+    def create_query_embeddings(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        return self._finish([f.result() for f in self._submit(texts, self._query_prefix)], dimensions)
+
+    async def acreate_query_embeddings(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        parts = await asyncio.gather(*[asyncio.wrap_future(f) for f in self._submit(texts, self._query_prefix)])
+        return self._finish(list(parts), dimensions)
+
+    async def aclose(self) -> None:
+        self._closed = True
+        self._queue.put(None)
+        await asyncio.to_thread(self._collector.join, 5.0)
+        self._pool.shutdown(wait=False)
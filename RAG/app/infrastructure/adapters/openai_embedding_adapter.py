@@ -1,8 +1,8 @@
 # app/infrastructure/adapters/openai_embedding_adapter.py
 
 import os
-from typing import List
-from openai import OpenAI
+from typing import List, Optional
+from openai import OpenAI, AsyncOpenAI, NOT_GIVEN
 
 from app.core.domain.ports.embedding_port import EmbeddingPort
 
@@ -16,10 +16,24 @@ class OpenAIEmbeddingAdapter(EmbeddingPort):
             raise ValueError("OPENAI_API_KEY debe estar configurado en las variables de entorno")
 
         self.client = OpenAI(api_key=api_key)
+        self.async_client = AsyncOpenAI(api_key=api_key)
 
-    def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def create_embeddings(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
         response = self.client.embeddings.create(
             input=texts,
-            model=self.model
+            model=self.model,
+            dimensions=dimensions or NOT_GIVEN,
         )
         return [item.embedding for item in response.data]
+
+    async def acreate_embeddings(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        response = await self.async_client.embeddings.create(
+            input=texts,
+            model=self.model,
+            dimensions=dimensions or NOT_GIVEN,
+        )
+        return [item.embedding for item in response.data]
+
+    async def aclose(self) -> None:
+        self.client.close()
+        await self.async_client.close()
@@ -0,0 +1,450 @@
+# app/infrastructure/adapters/postgres_chat_memory_adapter.py
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+import psycopg
+from psycopg_pool import ConnectionPool
+
+from app.core import metrics
+from app.core.domain.ports.chat_memory_port import ChatMemoryPort, _uncovered
+from app.infrastructure.adapters.postgres_saveinfo_adapter import _dsn_from_env
+
+logger = logging.getLogger(__name__)
+
+Row = Tuple[str, str, str]
+
+# Errores por el contenido de las filas (p. ej. bytes NUL, texto inválido): reintentar no sirve
+_REJECTED = (psycopg.DataError, psycopg.IntegrityError)
+# Lotes recientes cuyos ids se recuerdan para que una lectura descarte los que ya vio como pendientes
+_FLUSH_HISTORY = 256
+# Filas de más que una lectura pide del tramo posterior a flushed_id para poder descartar las
+# que este proceso escribió tras la copia (se duplica si no alcanza)
+_LATE_MARGIN = 16
+
+
+def _late_truncated(newer: List[int], cap: int, late: Set[int]) -> bool:
+    # Lo escrito tras la copia es lo más nuevo de la sesión: si los `cap` ids más nuevos son todos
+    # de esa escritura puede haber más fuera del recorte
+    return len(newer) == cap and all(i in late for i in newer)
+
+
+class PostgresChatMemoryAdapter(ChatMemoryPort):
+    """
+    Memoria de chat persistente en Postgres (sobrevive a reinicios y se comparte entre workers).
+
+    Las escrituras no tocan la base en la ruta del request: `append` encola el mensaje y un hilo
+    escritor vuelca la cola en lotes (un INSERT multi-fila por transacción) cada
+    `flush_interval` segundos o al llegar a `batch_size` mensajes. Las lecturas combinan lo
+    persistido con lo pendiente de este proceso, así una sesión siempre ve sus propios mensajes.
+
+    Para no contar dos veces un lote que se confirma mientras se lee, el escritor registra los ids
+    que devuelve cada INSERT y la lectura descarta los que se escribieron después de tomar su copia
+    de lo pendiente (si lo copió en vuelo, espera a que el escritor termine ese lote). Un mensaje que Postgres rechaza se aísla partiendo el lote y se descarta; ante
+    una caída de la base la cola se limita a `max_pending` mensajes (se pierden los más viejos).
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        min_size: int = 1,
+        max_size: int = 4,
+        batch_size: int = 200,
+        flush_interval: float = 0.2,
+        max_pending: int = 10_000,
+    ) -> None:
+        self._pool = ConnectionPool(dsn or _dsn_from_env(), min_size=min_size, max_size=max_size, kwargs={"autocommit": True})
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_pending = max(batch_size, max_pending)
+        self._pending: List[Row] = []
+        self._inflight: List[Row] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        # lotes tomados / terminados por el escritor
+        self._taken = 0
+        self._done = 0
+        # id más alto escrito por este proceso (o existente al arrancar) y ids de cada lote escrito, por número de escritura
+        self._flushed_id = 0
+        self._flush_seq = 0
+        self._flushes: Deque[Tuple[int, List[int]]] = deque(maxlen=_FLUSH_HISTORY)
+        try:
+            self._ensure_schema()
+        except Exception as e:
+            logger.warning("no se pudo asegurar las tablas: %s", e)
+        try:
+            # lo anterior al arranque no puede ser una escritura de este proceso: sin esto, hasta el
+            # primer volcado cada lectura trataría toda la sesión como posterior a la copia
+            self._flushed_id = self._max_id()
+        except Exception as e:
+            logger.warning("no se pudo leer el último id de chat_messages: %s", e)
+        self._writer = threading.Thread(target=self._writer_loop, name="chat-memory-writer", daemon=True)
+        self._writer.start()
+
+    def _ensure_schema(self) -> None:
+        ddl = """
+        CREATE TABLE IF NOT EXISTS chat_messages (
+            id BIGSERIAL PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMPTZ DEFAULT NOW()
+        );
+        CREATE INDEX IF NOT EXISTS chat_messages_session_idx ON chat_messages (session_id, id);
+        CREATE TABLE IF NOT EXISTS chat_summaries (
+            session_id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            covered INTEGER NOT NULL,
+            updated_at TIMESTAMPTZ DEFAULT NOW()
+        );
+        """
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(ddl)
+
+    def _max_id(self) -> int:
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT COALESCE(MAX(id), 0) FROM chat_messages")
+            return int(cur.fetchone()[0])
+
+    # ---------------- Escritura por lotes ----------------
+    def _writer_loop(self) -> None:
+        failures = 0
+        while True:
+            with self._cond:
+                if not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._pending and len(self._pending) < self._batch_size and not self._closed:
+                    # pequeña ventana para acumular más mensajes en el mismo lote
+                    self._cond.wait(timeout=self._flush_interval)
+                if not self._pending:
+                    if self._closed:
+                        return
+                    continue
+                batch = self._pending[: self._batch_size]
+                del self._pending[: self._batch_size]
+                self._inflight = batch
+                self._taken += 1
+            ids, consumed, error = self._flush_batch(batch)
+            with self._cond:
+                self._record_flush(ids)
+                self._inflight = []
+                self._done = self._taken
+                if error is not None:
+                    # reintentar lo que falta en el siguiente ciclo conservando el orden
+                    self._pending[:0] = batch[consumed:]
+                    self._trim_pending()
+                self._cond.notify_all()
+                if error is None:
+                    failures = 0
+                    continue
+                failures += 1
+                logger.error("flush failed n=%s attempt=%s: %s", len(batch) - consumed, failures, error)
+                if self._closed:
+                    return
+                self._cond.wait(timeout=min(30.0, 0.5 * 2 ** failures))
+
+    def _flush_batch(self, batch: List[Row]) -> Tuple[List[int], int, Optional[Exception]]:
+        """
+        Escribe `batch` y devuelve los ids insertados, cuántas filas quedaron resueltas (escritas o
+        descartadas, siempre un prefijo del lote) y el error transitorio que detuvo la escritura.
+        Si Postgres rechaza el contenido, el lote se parte en mitades hasta aislar la fila culpable.
+        """
+        ids: List[int] = []
+        consumed = 0
+        parts = [batch]
+        while parts:
+            part = parts.pop()
+            try:
+                ids += self._write(part)
+            except _REJECTED as e:
+                if len(part) > 1:
+                    mid = len(part) // 2
+                    parts += [part[mid:], part[:mid]]
+                    continue
+                logger.error("dropping chat message rejected by postgres session=%s: %s", part[0][0], e)
+                metrics.count_dropped("chat_memory", "rejected")
+            except Exception as e:
+                return ids, consumed, e
+            consumed += len(part)
+        return ids, consumed, None
+
+    def _write(self, batch: List[Row]) -> List[int]:
+        values = ",".join(["(%s, %s, %s)"] * len(batch))
+        params = [v for row in batch for v in row]
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(f"INSERT INTO chat_messages (session_id, role, content) VALUES {values} RETURNING id", params)
+            return [int(r[0]) for r in cur.fetchall()]
+
+    def _record_flush(self, ids: List[int]) -> None:
+        # llamar con self._cond tomado
+        if not ids:
+            return
+        self._flush_seq += 1
+        self._flushes.append((self._flush_seq, ids))
+        self._flushed_id = max(self._flushed_id, max(ids))
+
+    def _trim_pending(self) -> None:
+        # llamar con self._cond tomado; con la base caída se descartan los mensajes más viejos
+        excess = len(self._pending) - self._max_pending
+        if excess > 0:
+            del self._pending[:excess]
+            metrics.count_dropped("chat_memory", "overflow", excess)
+            logger.warning("chat memory queue full (max=%s); dropped %s oldest messages", self._max_pending, excess)
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Bloquea hasta que la cola esté vacía (o venza `timeout`)."""
+        with self._cond:
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: not self._pending and not self._inflight, timeout=timeout)
+
+    # ---------------- Lecturas consistentes ----------------
+    def _snapshot(self, session_id: str) -> Tuple[List[Dict[str, str]], Tuple[int, int, int]]:
+        """
+        Mensajes sin confirmar de la sesión y la marca de la copia: número de la última escritura,
+        id más alto escrito y el lote en vuelo que contiene mensajes de la sesión (0 si ninguno).
+        """
+        with self._cond:
+            rows = self._inflight + self._pending
+            inflight = self._taken if any(row[0] == session_id for row in self._inflight) else 0
+            mark = (self._flush_seq, self._flushed_id, inflight)
+        return [{"role": r, "content": c} for sid, r, c in rows if sid == session_id], mark
+
+    def _flushed_since(self, mark: Tuple[int, int, int], timeout: float = 30.0) -> Optional[Set[int]]:
+        """Ids escritos por este proceso después de la copia `mark`; None si ya no están en el historial."""
+        seq, _, inflight = mark
+        with self._cond:
+            # el INSERT de ese lote pudo confirmarse antes del SELECT: hacen falta sus ids
+            if inflight and not self._cond.wait_for(lambda: self._done >= inflight, timeout=timeout):
+                logger.warning("chat memory read: in-flight batch still unconfirmed after %ss", timeout)
+            if self._flush_seq == seq:
+                return set()
+            if self._flushes[0][0] > seq + 1:
+                return None
+            return {i for s, ids in self._flushes if s > seq for i in ids}
+
+    # ---------------- ChatMemoryPort ----------------
+    def append(self, session_id: str, role: str, content: str) -> None:
+        # Postgres no admite NUL en TEXT: se quita aquí para que el lote no lo rechace
+        row = (session_id, role, content.replace("\x00", ""))
+        with self._cond:
+            self._pending.append(row)
+            if len(self._pending) > self._max_pending:
+                self._trim_pending()
+            if len(self._pending) == 1 or len(self._pending) >= self._batch_size:
+                self._cond.notify_all()
+
+    def get_recent(self, session_id: str, limit: int = 20) -> List[Dict[str, str]]:
+        if limit <= 0:
+            return []
+        return self._read_recent(session_id, limit, history=False)[2]
+
+    def get_history(self, session_id: str, limit: int) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        if limit <= 0:
+            return self.get_summary(session_id)[0], []
+        summary, covered, recent, total = self._read_recent(session_id, limit, history=True)
+        return summary, _uncovered(recent, total, covered, limit)
+
+    def _read_recent(
+        self, session_id: str, limit: int, history: bool
+    ) -> Tuple[Optional[str], int, List[Dict[str, str]], int]:
+        """Últimos `limit` mensajes; con `history` también el resumen y el total, en la misma lectura."""
+        margin = _LATE_MARGIN
+        while True:
+            pending, mark = self._snapshot(session_id)
+            cap = limit + len(pending) + margin
+            if history:
+                summary, covered, total, rows = self._select_history(session_id, mark[1], limit, cap)
+            else:
+                summary, covered, total = None, 0, 0
+                rows = self._select_recent(session_id, mark[1], limit, cap)
+            late = self._flushed_since(mark)
+            if late is None:
+                continue
+            newer = [i for i, _, _ in rows if i > mark[1]]
+            # con el tramo posterior recortado, los mensajes <= flushed_id no son contiguos a él:
+            # solo sirve si quedan `limit` mensajes que no son de esta copia (y entonces todo lo
+            # tardío que está en la tabla cae dentro del recorte, así el total también cuadra)
+            if len(newer) == cap and sum(1 for i in newer if i not in late) < limit:
+                margin *= 2
+                continue
+            break
+        persisted = [{"role": r, "content": c} for i, r, c in sorted(rows) if i not in late]
+        total += len(pending) - sum(1 for i in newer if i in late)
+        return summary, covered, (persisted + pending)[-limit:], total
+
+    def _select_recent(self, session_id: str, flushed_id: int, limit: int, cap: int) -> List[Tuple[int, str, str]]:
+        """Los `cap` mensajes más nuevos con id > flushed_id y los `limit` últimos anteriores."""
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """(SELECT id, role, content FROM chat_messages
+                    WHERE session_id = %s AND id > %s ORDER BY id DESC LIMIT %s)
+                   UNION ALL
+                   (SELECT id, role, content FROM chat_messages
+                    WHERE session_id = %s AND id <= %s ORDER BY id DESC LIMIT %s)""",
+                (session_id, flushed_id, cap, session_id, flushed_id, limit),
+            )
+            return [(int(i), r, c) for i, r, c in cur.fetchall()]
+
+    def _select_history(
+        self, session_id: str, flushed_id: int, limit: int, cap: int
+    ) -> Tuple[Optional[str], int, int, List[Tuple[int, str, str]]]:
+        """Resumen, mensajes de la sesión y las filas de `_select_recent`, en una sola lectura."""
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """SELECT 's', covered, summary, NULL FROM chat_summaries WHERE session_id = %(sid)s
+                   UNION ALL
+                   SELECT 'c', COUNT(*), NULL, NULL FROM chat_messages WHERE session_id = %(sid)s
+                   UNION ALL
+                   (SELECT 'm', id, role, content FROM chat_messages
+                    WHERE session_id = %(sid)s AND id > %(fid)s ORDER BY id DESC LIMIT %(cap)s)
+                   UNION ALL
+                   (SELECT 'm', id, role, content FROM chat_messages
+                    WHERE session_id = %(sid)s AND id <= %(fid)s ORDER BY id DESC LIMIT %(limit)s)""",
+                {"sid": session_id, "fid": flushed_id, "cap": cap, "limit": limit},
+            )
+            result = cur.fetchall()
+        summary, covered = next(((text, int(v)) for kind, v, text, _ in result if kind == "s"), (None, 0))
+        total = next(int(v) for kind, v, _, _ in result if kind == "c")
+        rows = [(int(v), r, c) for kind, v, r, c in result if kind == "m"]
+        return summary, covered, total, rows
+
+    def count(self, session_id: str) -> int:
+        margin = _LATE_MARGIN
+        while True:
+            pending, mark = self._snapshot(session_id)
+            cap = len(pending) + margin
+            total, newer = self._select_count(session_id, mark[1], cap)
+            late = self._flushed_since(mark)
+            if late is None:
+                continue
+            if _late_truncated(newer, cap, late):
+                margin *= 2
+                continue
+            break
+        return total - sum(1 for i in newer if i in late) + len(pending)
+
+    def _select_count(self, session_id: str, flushed_id: int, cap: int) -> Tuple[int, List[int]]:
+        """Mensajes de la sesión y los ids de los `cap` más nuevos con id > flushed_id."""
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """SELECT (SELECT COUNT(*) FROM chat_messages WHERE session_id = %s),
+                          ARRAY(SELECT id FROM chat_messages WHERE session_id = %s AND id > %s ORDER BY id DESC LIMIT %s)""",
+                (session_id, session_id, flushed_id, cap),
+            )
+            total, newer = cur.fetchone()
+            return int(total), [int(i) for i in newer]
+
+    def get_range(self, session_id: str, start: int, end: Optional[int] = None) -> Tuple[List[Dict[str, str]], int]:
+        start = max(0, start)
+        margin = _LATE_MARGIN
+        while True:
+            pending, mark = self._snapshot(session_id)
+            cap = len(pending) + margin
+            # los mensajes de esta copia que ya están en la tabla corren las posiciones siguientes:
+            # se leen `cap` filas de más para cubrir el hueco que dejan
+            rows = None if end is None else max(0, end - start) + cap
+            total, newer, window = self._select_range(session_id, mark[1], start, rows, cap)
+            late = self._flushed_since(mark)
+            if late is None:
+                continue
+            if _late_truncated(newer, cap, late):
+                margin *= 2
+                continue
+            break
+        # posición de cada id de `newer` (vienen del más nuevo al más viejo)
+        late_pos = sorted(total - 1 - k for k, i in enumerate(newer) if i in late)
+        n_persisted = total - len(late_pos)
+        n_total = n_persisted + len(pending)
+        stop = n_total if end is None else min(end, n_total)
+        msgs: List[Dict[str, str]] = []
+        for k, (i, r, c) in enumerate(window):
+            if i in late:
+                continue
+            pos = start + k - bisect.bisect_left(late_pos, start + k)
+            if start <= pos < stop:
+                msgs.append({"role": r, "content": c})
+        return msgs + pending[max(0, start - n_persisted):max(0, stop - n_persisted)], n_total
+
+    def _select_range(
+        self, session_id: str, flushed_id: int, start: int, rows: Optional[int], cap: int
+    ) -> Tuple[int, List[int], List[Tuple[int, str, str]]]:
+        """
+        En una sola lectura: mensajes de la sesión, ids de los `cap` más nuevos con id > flushed_id
+        y `rows` mensajes (todos si es None) a partir de la posición `start`.
+        """
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """SELECT 'c', COUNT(*), NULL, NULL FROM chat_messages WHERE session_id = %(sid)s
+                   UNION ALL
+                   (SELECT 'n', id, NULL, NULL FROM chat_messages
+                    WHERE session_id = %(sid)s AND id > %(fid)s ORDER BY id DESC LIMIT %(cap)s)
+                   UNION ALL
+                   (SELECT 'w', id, role, content FROM chat_messages
+                    WHERE session_id = %(sid)s ORDER BY id OFFSET %(start)s LIMIT %(rows)s)""",
+                {"sid": session_id, "fid": flushed_id, "cap": cap, "start": start, "rows": rows},
+            )
+            result = cur.fetchall()
+        total = next(int(v) for kind, v, _, _ in result if kind == "c")
+        newer = [int(v) for kind, v, _, _ in result if kind == "n"]
+        window = [(int(v), r, c) for kind, v, r, c in result if kind == "w"]
+        return total, newer, window
+
+    def clear(self, session_id: str, timeout: float = 10.0) -> None:
+        with self._cond:
+            # un lote en vuelo con mensajes de la sesión se confirmaría después del DELETE
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: all(row[0] != session_id for row in self._inflight), timeout=timeout)
+            self._pending = [row for row in self._pending if row[0] != session_id]
+        self._delete_session(session_id)
+
+    def _delete_session(self, session_id: str) -> None:
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM chat_messages WHERE session_id = %s", (session_id,))
+            cur.execute("DELETE FROM chat_summaries WHERE session_id = %s", (session_id,))
+
+    def get_summary(self, session_id: str) -> Tuple[Optional[str], int]:
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT summary, covered FROM chat_summaries WHERE session_id = %s", (session_id,))
+            row = cur.fetchone()
+            return (row[0], int(row[1])) if row else (None, 0)
+
+    def set_summary(self, session_id: str, summary: str, covered: int) -> None:
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """INSERT INTO chat_summaries (session_id, summary, covered, updated_at)
+                   VALUES (%s, %s, %s, NOW())
+                   ON CONFLICT (session_id)
+                   DO UPDATE SET summary = EXCLUDED.summary, covered = EXCLUDED.covered, updated_at = NOW()""",
+                (session_id, summary, covered),
+            )
+
+    def replace_summary(self, session_id: str, summary: str, covered: int, expected_covered: int) -> bool:
+        # Otro worker pudo resumir la sesión a la vez: gana el primero, el otro no pisa su resumen
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """INSERT INTO chat_summaries (session_id, summary, covered, updated_at)
+                   VALUES (%s, %s, %s, NOW())
+                   ON CONFLICT (session_id)
+                   DO UPDATE SET summary = EXCLUDED.summary, covered = EXCLUDED.covered, updated_at = NOW()
+                   WHERE chat_summaries.covered = %s""",
+                (session_id, summary, covered, expected_covered),
+            )
+            return cur.rowcount == 1
+
+    async def aappend(self, session_id: str, role: str, content: str) -> None:
+        # Solo encola: no bloquea el event loop
+        self.append(session_id, role, content)
+
+    async def aclose(self) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join(timeout=10.0)
+        self._pool.close()
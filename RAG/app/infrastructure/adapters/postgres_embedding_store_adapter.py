@@ -0,0 +1,128 @@
+# app/infrastructure/adapters/postgres_embedding_store_adapter.py
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from psycopg_pool import ConnectionPool
+
+from app.core.domain.ports.embedding_store_port import EmbeddingStorePort
+from app.infrastructure.adapters.postgres_saveinfo_adapter import _dsn_from_env, _schema_from_env
+
+logger = logging.getLogger(__name__)
+
+# float16 little-endian: 6 KB por vector de 3072 dimensiones (la mitad que float32)
+_DTYPE = np.dtype("<f2")
+# Filas por DELETE al purgar
+_PURGE_BATCH = 10_000
+
+
+class PostgresEmbeddingStoreAdapter(EmbeddingStorePort):
+    """
+    Tabla `chunk_embeddings` en el esquema RAG: clave sha256 (32 bytes) y el vector en float16 como
+    bytea. Compartida por la API y los workers de ingesta de todas las máquinas.
+
+    Las filas de más de `ttl_seconds` se borran al arrancar y, como mucho una vez cada
+    `purge_interval_seconds`, tras una escritura: las claves de modelos o documentos que ya no se
+    usan no se vuelven a escribir nunca.
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        min_size: int = 1,
+        max_size: int = 4,
+        ttl_seconds: float = 30 * 24 * 3600,
+        purge_interval_seconds: float = 3600,
+    ) -> None:
+        self._pool = ConnectionPool(dsn or _dsn_from_env(), min_size=min_size, max_size=max_size, kwargs={"autocommit": True})
+        self._ttl = ttl_seconds
+        self._purge_interval = purge_interval_seconds
+        self._next_purge = 0.0
+        self._purge_lock = threading.Lock()
+        try:
+            self._ensure_schema()
+        except Exception as e:
+            logger.warning("init: no se pudo asegurar la tabla chunk_embeddings: %s", e)
+        self._purge_expired()
+
+    @classmethod
+    def from_env(cls) -> "PostgresEmbeddingStoreAdapter":
+        return cls(
+            ttl_seconds=float(os.getenv("CHUNK_EMBED_CACHE_TTL_SECONDS", str(30 * 24 * 3600))),
+            purge_interval_seconds=float(os.getenv("CHUNK_EMBED_CACHE_PURGE_INTERVAL_SECONDS", "3600")),
+        )
+
+    def _ensure_schema(self) -> None:
+        ddl = f"""
+        CREATE SCHEMA IF NOT EXISTS {_schema_from_env()};
+        CREATE TABLE IF NOT EXISTS chunk_embeddings (
+            key BYTEA PRIMARY KEY,
+            dim INT NOT NULL,
+            vec BYTEA NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        CREATE INDEX IF NOT EXISTS chunk_embeddings_created_idx ON chunk_embeddings (created_at);
+        """
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(ddl)
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        if not keys:
+            return {}
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT key, vec FROM chunk_embeddings WHERE key = ANY(%s)",
+                ([bytes.fromhex(k) for k in keys],),
+            )
+            rows = cur.fetchall()
+        return {
+            bytes(key).hex(): np.frombuffer(bytes(vec), dtype=_DTYPE).astype(np.float32).tolist()
+            for key, vec in rows
+        }
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        rows = []
+        for key, vec in items.items():
+            arr = np.asarray(vec, dtype=_DTYPE)
+            rows.append((bytes.fromhex(key), int(arr.shape[0]), arr.tobytes()))
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.executemany(
+                "INSERT INTO chunk_embeddings (key, dim, vec) VALUES (%s, %s, %s) ON CONFLICT (key) DO NOTHING",
+                rows,
+            )
+        self._purge_expired()
+
+    def _purge_expired(self) -> None:
+        with self._purge_lock:
+            now = time.monotonic()
+            if now < self._next_purge:
+                return
+            self._next_purge = now + self._purge_interval
+        try:
+            deleted = 0
+            with self._pool.connection() as conn, conn.cursor() as cur:
+                # por tandas: un DELETE enorme retendría locks y WAL de una vez
+                while True:
+                    cur.execute(
+                        """DELETE FROM chunk_embeddings WHERE key IN (
+                               SELECT key FROM chunk_embeddings
+                               WHERE created_at < NOW() - make_interval(secs => %s) LIMIT %s)""",
+                        (self._ttl, _PURGE_BATCH),
+                    )
+                    deleted += cur.rowcount
+                    if cur.rowcount < _PURGE_BATCH:
+                        break
+            if deleted:
+                logger.info("chunk embedding cache purged %s expired rows", deleted)
+        except Exception as e:
+            logger.warning("chunk embedding cache purge failed: %s", e)
+
+    async def aclose(self) -> None:
+        self._pool.close()
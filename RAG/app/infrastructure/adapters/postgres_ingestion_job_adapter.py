@@ -0,0 +1,182 @@
+# app/infrastructure/adapters/postgres_ingestion_job_adapter.py
+from __future__ import annotations
+
+import logging
+import uuid
+from typing import Any, Dict, Optional
+
+from psycopg.types.json import Jsonb
+from psycopg_pool import ConnectionPool
+
+from app.core.domain.models import IngestionJob
+from app.core.domain.ports.ingestion_job_port import JOB_DEAD, JOB_DONE, JOB_QUEUED, JOB_RUNNING, IngestionJobPort
+from app.infrastructure.adapters.postgres_saveinfo_adapter import _dsn_from_env, _schema_from_env
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = "id, client_id, agent_id, payload, status, attempts, max_attempts, last_error, result, created_at, started_at, finished_at, run_after"
+
+
+def _job_from_row(row: Optional[tuple]) -> Optional[IngestionJob]:
+    if not row:
+        return None
+    (job_id, client_id, agent_id, payload, status, attempts, max_attempts, last_error, result,
+     created_at, started_at, finished_at, run_after) = row
+    return IngestionJob(
+        id=str(job_id),
+        client_id=client_id,
+        agent_id=agent_id,
+        payload=dict(payload or {}),
+        status=status,
+        attempts=attempts,
+        max_attempts=max_attempts,
+        last_error=last_error,
+        result=dict(result) if result is not None else None,
+        created_at=created_at,
+        started_at=started_at,
+        finished_at=finished_at,
+        run_after=run_after,
+    )
+
+
+class PostgresIngestionJobAdapter(IngestionJobPort):
+    """
+    Tabla `ingestion_jobs` en el esquema RAG. Los workers reclaman con
+    `SELECT ... FOR UPDATE SKIP LOCKED`: varios procesos compiten por la cola sin bloquearse entre sí
+    y sin tomar dos veces el mismo trabajo.
+    """
+
+    def __init__(self, dsn: Optional[str] = None, min_size: int = 1, max_size: int = 4) -> None:
+        self._pool = ConnectionPool(dsn or _dsn_from_env(), min_size=min_size, max_size=max_size, kwargs={"autocommit": True})
+        try:
+            self._ensure_schema()
+        except Exception as e:
+            logger.warning("init: no se pudo asegurar la tabla ingestion_jobs: %s", e)
+
+    def _ensure_schema(self) -> None:
+        ddl = f"""
+        CREATE SCHEMA IF NOT EXISTS {_schema_from_env()};
+        CREATE TABLE IF NOT EXISTS ingestion_jobs (
+            id UUID PRIMARY KEY,
+            client_id TEXT NOT NULL,
+            agent_id TEXT NOT NULL,
+            payload JSONB NOT NULL,
+            status TEXT NOT NULL DEFAULT '{JOB_QUEUED}',
+            attempts INT NOT NULL DEFAULT 0,
+            max_attempts INT NOT NULL DEFAULT 5,
+            last_error TEXT,
+            result JSONB,
+            locked_by TEXT,
+            locked_until TIMESTAMPTZ,
+            run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            started_at TIMESTAMPTZ,
+            finished_at TIMESTAMPTZ,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        -- Solo las filas pendientes/en curso entran en el índice que recorre el reclamo
+        CREATE INDEX IF NOT EXISTS ingestion_jobs_ready_idx
+            ON ingestion_jobs (run_after, created_at) WHERE status IN ('{JOB_QUEUED}', '{JOB_RUNNING}');
+        """
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(ddl)
+
+    def enqueue(self, client_id: str, agent_id: str, payload: Dict[str, Any], max_attempts: int = 5) -> IngestionJob:
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                f"""INSERT INTO ingestion_jobs (id, client_id, agent_id, payload, max_attempts)
+                    VALUES (%s, %s, %s, %s, %s)
+                    RETURNING {_COLUMNS}""",
+                (str(uuid.uuid4()), client_id, agent_id, Jsonb(payload), max_attempts),
+            )
+            return _job_from_row(cur.fetchone())
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[IngestionJob]:
+        # Listos para correr, o "running" cuyo worker dejó vencer el lease (proceso caído) si le
+        # quedan intentos; los que ya no, pasan a `dead` en la misma sentencia
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                f"""WITH expired AS (
+                        UPDATE ingestion_jobs
+                        SET status = '{JOB_DEAD}', last_error = 'lease expired', locked_by = NULL,
+                            locked_until = NULL, finished_at = NOW(), updated_at = NOW()
+                        WHERE status = '{JOB_RUNNING}' AND locked_until < NOW() AND attempts >= max_attempts
+                    )
+                    UPDATE ingestion_jobs
+                    SET status = '{JOB_RUNNING}', attempts = attempts + 1, locked_by = %s,
+                        locked_until = NOW() + make_interval(secs => %s),
+                        started_at = NOW(), updated_at = NOW()
+                    WHERE id = (
+                        SELECT id FROM ingestion_jobs
+                        WHERE (status = '{JOB_QUEUED}' AND run_after <= NOW())
+                           OR (status = '{JOB_RUNNING}' AND locked_until < NOW() AND attempts < max_attempts)
+                        ORDER BY run_after, created_at
+                        FOR UPDATE SKIP LOCKED
+                        LIMIT 1
+                    )
+                    RETURNING {_COLUMNS}""",
+                (worker_id, lease_seconds),
+            )
+            return _job_from_row(cur.fetchone())
+
+    def extend_lease(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                f"""UPDATE ingestion_jobs
+                    SET locked_until = NOW() + make_interval(secs => %s), updated_at = NOW()
+                    WHERE id = %s AND locked_by = %s AND status = '{JOB_RUNNING}'""",
+                (lease_seconds, job_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                f"""UPDATE ingestion_jobs
+                    SET status = '{JOB_DONE}', result = %s, last_error = NULL, locked_by = NULL,
+                        locked_until = NULL, finished_at = NOW(), updated_at = NOW()
+                    WHERE id = %s AND locked_by = %s AND status = '{JOB_RUNNING}'""",
+                (Jsonb(result), job_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry_in_seconds: Optional[float]) -> bool:
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            if retry_in_seconds is None:
+                cur.execute(
+                    f"""UPDATE ingestion_jobs
+                        SET status = '{JOB_DEAD}', last_error = %s, locked_by = NULL, locked_until = NULL,
+                            finished_at = NOW(), updated_at = NOW()
+                        WHERE id = %s AND locked_by = %s AND status = '{JOB_RUNNING}'""",
+                    (error, job_id, worker_id),
+                )
+            else:
+                cur.execute(
+                    f"""UPDATE ingestion_jobs
+                        SET status = '{JOB_QUEUED}', last_error = %s, locked_by = NULL, locked_until = NULL,
+                            run_after = NOW() + make_interval(secs => %s), updated_at = NOW()
+                        WHERE id = %s AND locked_by = %s AND status = '{JOB_RUNNING}'""",
+                    (error, retry_in_seconds, job_id, worker_id),
+                )
+            return cur.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        try:
+            uuid.UUID(job_id)
+        except ValueError:
+            return None
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(f"SELECT {_COLUMNS} FROM ingestion_jobs WHERE id = %s", (job_id,))
+            return _job_from_row(cur.fetchone())
+
+    def count_active(self, client_id: Optional[str] = None) -> int:
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                f"""SELECT COUNT(*) FROM ingestion_jobs
+                    WHERE status IN ('{JOB_QUEUED}', '{JOB_RUNNING}') AND (%(cid)s::text IS NULL OR client_id = %(cid)s)""",
+                {"cid": client_id},
+            )
+            return int(cur.fetchone()[0])
+
+    async def aclose(self) -> None:
+        self._pool.close()
@@ -1,12 +1,23 @@
 # app/infrastructure/adapters/postgres_saveinfo_adapter.py
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
+import logging
 import os
 import uuid
-from typing import Optional
+from contextlib import contextmanager
+from typing import Iterator, Optional
 import psycopg
-from psycopg_pool import ConnectionPool
-from app.core.domain.ports.client_repository_port import ClientRepositoryPort as SaveInfoClientPort
+from psycopg_pool import ConnectionPool, AsyncConnectionPool
+from app.core.domain.models import AgentProfile
+from app.core.domain.ports.client_repository_port import ClientRepositoryPort as SaveInfoClientPort, PromptChangeListener
+
+logger = logging.getLogger(__name__)
+
+# Canal de LISTEN/NOTIFY por el que se avisan los cambios de prompts y ajustes de agentes
+PROMPT_CHANGES_CHANNEL = "prompt_changes"
 
 def _dsn_from_env() -> str:
     host = os.getenv("POSTGRES_HOST", "localhost")
@@ -26,13 +37,18 @@ class PostgresSaveInfoClientAdapter(SaveInfoClientPort):
     def __init__(self, dsn: Optional[str] = None, min_size: int = 1, max_size: int = 5) -> None:
         self._dsn = dsn or _dsn_from_env()
         self._pool = ConnectionPool(self._dsn, min_size=min_size, max_size=max_size, kwargs={"autocommit": True})
+        # El pool async se abre de forma perezosa dentro del event loop que lo usa
+        self._min_size = min_size
+        self._max_size = max_size
+        self._apool: Optional[AsyncConnectionPool] = None
+        self._apool_lock = asyncio.Lock()
 #---------------------------------------------------------------
         # Asegurar que el esquema/tablas necesarias existan
         try:
             self._ensure_schema()
         except Exception as e:
             # No impedir el arranque; registrar y continuar (las operaciones fallarán si realmente falta permiso)
-            print(f"[warn:postgres:init] no se pudo asegurar el esquema/tablas: {e}")
+            logger.warning("init: no se pudo asegurar el esquema/tablas: %s", e)
 
     def _ensure_schema(self) -> None:
         schema = _schema_from_env()
@@ -46,6 +62,7 @@ class PostgresSaveInfoClientAdapter(SaveInfoClientPort):
             id TEXT NOT NULL,
             PRIMARY KEY (client_id, id)
         );
+        ALTER TABLE agents ADD COLUMN IF NOT EXISTS settings JSONB NOT NULL DEFAULT '{{}}'::jsonb;
         CREATE TABLE IF NOT EXISTS documents (
             id UUID PRIMARY KEY,
             client_id TEXT NOT NULL,
@@ -61,6 +78,23 @@ class PostgresSaveInfoClientAdapter(SaveInfoClientPort):
             updated_at TIMESTAMPTZ DEFAULT NOW(),
             PRIMARY KEY (client_id, agent_id)
         );
+        CREATE OR REPLACE FUNCTION notify_prompt_change() RETURNS trigger AS $$
+        DECLARE
+            rec RECORD;
+            agent TEXT;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN rec := OLD; ELSE rec := NEW; END IF;
+            IF TG_TABLE_NAME = 'agents' THEN agent := rec.id; ELSE agent := rec.agent_id; END IF;
+            PERFORM pg_notify('{PROMPT_CHANGES_CHANNEL}', json_build_object('client_id', rec.client_id, 'agent_id', agent)::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        CREATE OR REPLACE TRIGGER prompts_notify_change
+            AFTER INSERT OR UPDATE OR DELETE ON prompts
+            FOR EACH ROW EXECUTE FUNCTION notify_prompt_change();
+        CREATE OR REPLACE TRIGGER agents_notify_change
+            AFTER UPDATE OF settings OR DELETE ON agents
+            FOR EACH ROW EXECUTE FUNCTION notify_prompt_change();
         """
         with self._pool.connection() as conn, conn.cursor() as cur:
             cur.execute(ddl)
@@ -87,8 +121,115 @@ class PostgresSaveInfoClientAdapter(SaveInfoClientPort):
                 (client_id, agent_id, prompt),
             )
 
+    @contextmanager
+    def document_lock(self, client_id: str, agent_id: str, doc_id: str) -> Iterator[None]:
+        # Advisory lock de sesión sobre la conexión que se retiene durante el bloque; si el proceso
+        # muere, Postgres lo suelta al cerrarse la conexión
+        digest = hashlib.sha256(f"doc\x00{client_id}\x00{agent_id}\x00{doc_id}".encode("utf-8")).digest()
+        key = int.from_bytes(digest[:8], "big", signed=True)
+        with self._pool.connection() as conn:
+            conn.execute("SELECT pg_advisory_lock(%s)", (key,))
+            try:
+                yield
+            finally:
+                try:
+                    conn.execute("SELECT pg_advisory_unlock(%s)", (key,))
+                except Exception as e:
+                    # que el pool no reutilice una conexión que podría seguir con el lock
+                    logger.warning("advisory unlock failed, closing connection: %s", e)
+                    conn.close()
+
     def get_prompt_client(self, client_id: str, agent_id: str) -> str | None:
         with self._pool.connection() as conn, conn.cursor() as cur:
             cur.execute("""SELECT prompt FROM prompts WHERE client_id = %s AND agent_id = %s""", (client_id, agent_id))
             row = cur.fetchone()
             return row[0] if row else None
+
+    _PROFILE_SQL = """SELECT p.prompt, a.settings, p.updated_at
+                      FROM agents a
+                      LEFT JOIN prompts p ON p.client_id = a.client_id AND p.agent_id = a.id
+                      WHERE a.client_id = %s AND a.id = %s"""
+
+    @staticmethod
+    def _profile_from_row(row: Optional[tuple]) -> AgentProfile:
+        if not row:
+            return AgentProfile()
+        prompt, settings, updated_at = row
+        return AgentProfile(
+            prompt=prompt,
+            settings=dict(settings or {}),
+            version=updated_at.isoformat() if updated_at is not None else None,
+        )
+
+    def get_agent_profile(self, client_id: str, agent_id: str) -> AgentProfile:
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(self._PROFILE_SQL, (client_id, agent_id))
+            return self._profile_from_row(cur.fetchone())
+
+    async def _get_async_pool(self) -> AsyncConnectionPool:
+        if self._apool is None:
+            async with self._apool_lock:
+                if self._apool is None:
+                    pool = AsyncConnectionPool(
+                        self._dsn,
+                        min_size=self._min_size,
+                        max_size=self._max_size,
+                        kwargs={"autocommit": True},
+                        open=False,
+                    )
+                    await pool.open()
+                    self._apool = pool
+        return self._apool
+
+    async def aget_prompt_client(self, client_id: str, agent_id: str) -> str | None:
+        pool = await self._get_async_pool()
+        async with pool.connection() as conn, conn.cursor() as cur:
+            await cur.execute("""SELECT prompt FROM prompts WHERE client_id = %s AND agent_id = %s""", (client_id, agent_id))
+            row = await cur.fetchone()
+            return row[0] if row else None
+
+    async def aget_agent_profile(self, client_id: str, agent_id: str) -> AgentProfile:
+        pool = await self._get_async_pool()
+        async with pool.connection() as conn, conn.cursor() as cur:
+            await cur.execute(self._PROFILE_SQL, (client_id, agent_id))
+            return self._profile_from_row(await cur.fetchone())
+
+    async def aopen(self) -> None:
+        """Abre el pool async por adelantado (en el arranque) para no pagarlo en el primer request."""
+        await self._get_async_pool()
+
+    async def aclose(self) -> None:
+        if self._apool is not None:
+            await self._apool.close()
+            self._apool = None
+        self._pool.close()
+
+    async def alisten_prompt_changes(self, listener: PromptChangeListener) -> None:
+        """
+        LISTEN sobre PROMPT_CHANGES_CHANNEL con una conexión dedicada (no del pool).
+        Si la conexión se pierde se avisa al listener (que deja de confiar en su caché) y se
+        reconecta con backoff; al reconectar se avisa de nuevo para que invalide todo, porque
+        las notificaciones perdidas mientras tanto no se reenvían.
+        """
+        backoff = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self._dsn, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {PROMPT_CHANGES_CHANNEL}")
+                    listener.on_connected()
+                    logger.info("listening prompt changes")
+                    backoff = 1.0
+                    async for notify in conn.notifies():
+                        try:
+                            data = json.loads(notify.payload)
+                            listener.on_change(str(data["client_id"]), str(data["agent_id"]))
+                        except Exception as e:
+                            logger.warning("notify: payload inválido %r: %s", notify.payload, e)
+            except asyncio.CancelledError:
+                listener.on_disconnected()
+                raise
+            except Exception as e:
+                logger.warning("listen: conexión perdida: %s; reintento en %.0fs", e, backoff)
+            listener.on_disconnected()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
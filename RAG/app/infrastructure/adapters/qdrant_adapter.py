@@ -1,8 +1,113 @@
-from typing import List, Dict, Any
-from qdrant_client import QdrantClient
-from qdrant_client.models import PointStruct, VectorParams, Distance
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Dict, Any, Optional, Union
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.models import (
+    PointStruct,
+    VectorParams,
+    Distance,
+    Filter,
+    FieldCondition,
+    MatchValue,
+    KeywordIndexParams,
+    KeywordIndexType,
+    SearchRequest,
+    SearchParams,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    VectorParamsDiff,
+    Disabled,
+    PointIdsList,
+    FilterSelector,
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+)
+from app.core.domain.models import StorageProfile
 from app.core.domain.ports.vector_port import VectorPort
 
+logger = logging.getLogger(__name__)
+
+# Campos del payload con índice keyword. client_id se marca como tenant para que Qdrant
+# agrupe físicamente los puntos de cada cliente en la colección compartida.
+TENANT_INDEX_FIELDS = {
+    "client_id": KeywordIndexParams(type=KeywordIndexType.KEYWORD, is_tenant=True),
+    "agent_id": KeywordIndexParams(type=KeywordIndexType.KEYWORD),
+    "doc_id": KeywordIndexParams(type=KeywordIndexType.KEYWORD),
+}
+
+
+
+@dataclass(frozen=True)
+class CollectionMeta:
+    size: int
+    distance: Distance
+
+
+class DimensionMismatchError(ValueError):
+    """El vector no tiene la dimensión de la colección."""
+
+
+class _CollectionCache:
+    """
+    Metadatos de colecciones conocidas, compartidos por todo el proceso.
+    Las colecciones inexistentes se recuerdan durante `missing_ttl` segundos para que la búsqueda
+    en una colección vacía/fallback no pague un round-trip extra; si otro worker la crea,
+    se ve como mucho tras ese TTL. Las conocidas caducan a los `known_ttl` segundos, por si otro
+    proceso la borró o la recreó con otra dimensión sin que este lo notara.
+    """
+
+    def __init__(self, missing_ttl: float, known_ttl: float) -> None:
+        self._known: Dict[str, tuple[CollectionMeta, float]] = {}
+        self._missing: Dict[str, float] = {}
+        self._missing_ttl = missing_ttl
+        self._known_ttl = known_ttl
+        self._lock = threading.Lock()
+
+    def lookup(self, name: str) -> tuple[bool, Optional[CollectionMeta]]:
+        """(resuelto, meta). resuelto=False significa que hay que preguntar al servidor."""
+        now = time.monotonic()
+        with self._lock:
+            known = self._known.get(name)
+            if known is not None and known[1] > now:
+                return True, known[0]
+            until = self._missing.get(name)
+            if until is not None and until > now:
+                return True, None
+            return False, None
+
+    def remember(self, name: str, meta: CollectionMeta) -> None:
+        with self._lock:
+            self._known[name] = (meta, time.monotonic() + self._known_ttl)
+            self._missing.pop(name, None)
+
+    def remember_missing(self, name: str) -> None:
+        with self._lock:
+            self._known.pop(name, None)
+            self._missing[name] = time.monotonic() + self._missing_ttl
+
+    def forget(self, name: str) -> None:
+        with self._lock:
+            self._known.pop(name, None)
+            self._missing.pop(name, None)
+
+
+_COLLECTIONS = _CollectionCache(
+    missing_ttl=float(os.getenv("QDRANT_MISSING_COLLECTION_TTL_SECONDS", "30")),
+    known_ttl=float(os.getenv("QDRANT_KNOWN_COLLECTION_TTL_SECONDS", "300")),
+)
+# Puntos por página al recorrer una colección con scroll
+_SCROLL_BATCH = 1024
+
 
 class QdrantVectorAdapter(VectorPort):
     def __init__(
@@ -11,13 +116,151 @@ class QdrantVectorAdapter(VectorPort):
         port: int = 6333,
         grpc: bool = False,
         api_key: str | None = None,
+        profile_resolver: Optional[Callable[[str], StorageProfile]] = None,
     ) -> None:
+        # Perfil de almacenamiento por colección (dimensiones, cuantización, on_disk); sin resolver, "full"
+        self._profile_resolver = profile_resolver
         self.client = QdrantClient(
             host=host,
             port=port,
             api_key=api_key,
             prefer_grpc=grpc,
         )
+        # Cliente async para la ruta de consulta (no bloquea el event loop)
+        self.async_client = AsyncQdrantClient(
+            host=host,
+            port=port,
+            api_key=api_key,
+            prefer_grpc=grpc,
+        )
+
+    # ---------------- Metadatos de colecciones (caché de proceso) ----------------
+    @staticmethod
+    def _meta_from_info(info: Any) -> CollectionMeta:
+        params = info.config.params.vectors
+        return CollectionMeta(size=int(params.size), distance=params.distance)
+
+    def collection_meta(self, collection: str) -> Optional[CollectionMeta]:
+        resolved, meta = _COLLECTIONS.lookup(collection)
+        if resolved:
+            return meta
+        if not self.client.collection_exists(collection):
+            _COLLECTIONS.remember_missing(collection)
+            return None
+        meta = self._meta_from_info(self.client.get_collection(collection))
+        _COLLECTIONS.remember(collection, meta)
+        return meta
+
+    async def acollection_meta(self, collection: str) -> Optional[CollectionMeta]:
+        resolved, meta = _COLLECTIONS.lookup(collection)
+        if resolved:
+            return meta
+        if not await self.async_client.collection_exists(collection):
+            _COLLECTIONS.remember_missing(collection)
+            return None
+        meta = self._meta_from_info(await self.async_client.get_collection(collection))
+        _COLLECTIONS.remember(collection, meta)
+        return meta
+
+    def collection_dim(self, collection: str) -> Optional[int]:
+        meta = self.collection_meta(collection)
+        return meta.size if meta is not None else None
+
+    @staticmethod
+    def _check_dim(collection: str, meta: CollectionMeta, vector: List[float]) -> None:
+        # Falla rápido y con un mensaje claro en vez de un error genérico del servidor
+        if len(vector) != meta.size:
+            raise DimensionMismatchError(
+                f"Dimensión del vector ({len(vector)}) distinta a la de la colección '{collection}' ({meta.size})"
+            )
+
+    @staticmethod
+    def _is_not_found(e: Exception) -> bool:
+        return isinstance(e, UnexpectedResponse) and getattr(e, "status_code", None) == 404
+
+    @staticmethod
+    def _is_already_exists(e: Exception) -> bool:
+        # Qdrant responde 409 (400 en versiones viejas) y el modo local lanza ValueError
+        return "already exists" in str(e).lower()
+
+    @classmethod
+    def _is_stale(cls, e: Exception) -> bool:
+        """Error que puede deberse a metadatos en caché desactualizados (colección borrada o recreada)."""
+        if cls._is_not_found(e) or isinstance(e, DimensionMismatchError):
+            return True
+        return isinstance(e, UnexpectedResponse) and getattr(e, "status_code", None) == 400 and "dimension" in str(e).lower()
+
+    # ---------------- Perfiles de almacenamiento ----------------
+    def profile_for(self, collection: str) -> StorageProfile:
+        return self._profile_resolver(collection) if self._profile_resolver else StorageProfile()
+
+    @staticmethod
+    def _quantization_config(profile: StorageProfile) -> Union[ScalarQuantization, BinaryQuantization, None]:
+        # La versión cuantizada siempre en RAM: es la que recorre el HNSW
+        if profile.quantization == "scalar":
+            return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True))
+        if profile.quantization == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    @staticmethod
+    def _search_params(profile: StorageProfile) -> Optional[SearchParams]:
+        if not profile.quantization:
+            return None
+        # Candidatos por los vectores cuantizados (top_k * oversampling) y reordenados con los originales
+        return SearchParams(quantization=QuantizationSearchParams(rescore=profile.rescore, oversampling=profile.oversampling))
+
+    def create_collection(self, collection: str, size: int, profile: Optional[StorageProfile] = None) -> None:
+        profile = profile or self.profile_for(collection)
+        logger.info("creating collection '%s' size=%s profile=%s", collection, size, profile.name)
+        self.client.create_collection(
+            collection_name=collection,
+            vectors_config=VectorParams(
+                size=size,
+                distance=Distance.COSINE,
+                on_disk=profile.on_disk,
+            ),
+            quantization_config=self._quantization_config(profile),
+        )
+        _COLLECTIONS.remember(collection, CollectionMeta(size=size, distance=Distance.COSINE))
+        self.ensure_payload_indexes(collection)
+
+    def apply_profile(self, collection: str, profile: StorageProfile) -> None:
+        """Cambia cuantización y on_disk de una colección existente sin copiar puntos
+        (Qdrant reconstruye los segmentos en segundo plano). No cambia la dimensión."""
+        logger.info("updating collection '%s' profile=%s", collection, profile.name)
+        self.client.update_collection(
+            collection_name=collection,
+            vectors_config={"": VectorParamsDiff(on_disk=profile.on_disk)},
+            quantization_config=self._quantization_config(profile) or Disabled.DISABLED,
+        )
+
+    def drop_collection(self, collection: str) -> None:
+        logger.info("dropping collection '%s'", collection)
+        self.client.delete_collection(collection)
+        _COLLECTIONS.remember_missing(collection)
+
+    def alias_target(self, alias: str) -> Optional[str]:
+        """Colección a la que apunta `alias`, o None si el nombre no es un alias."""
+        for a in self.client.get_aliases().aliases:
+            if a.alias_name == alias:
+                return a.collection_name
+        return None
+
+    def point_alias(self, alias: str, collection: str) -> None:
+        """Apunta `alias` a `collection` en una sola operación: quien lo use ve una u otra, nunca ninguna."""
+        logger.info("pointing alias '%s' to '%s'", alias, collection)
+        ops: List[Any] = []
+        if self.alias_target(alias) is not None:
+            ops.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+        ops.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=collection, alias_name=alias)))
+        self.client.update_collection_aliases(change_aliases_operations=ops)
+        _COLLECTIONS.forget(alias)
+
+    def ensure_payload_indexes(self, collection: str) -> None:
+        """Crea (idempotente) los índices de payload usados para filtrar por tenant."""
+        for field, schema in TENANT_INDEX_FIELDS.items():
+            self.client.create_payload_index(collection_name=collection, field_name=field, field_schema=schema)
 
     def up_embeddings(
         self,
@@ -26,41 +269,213 @@ class QdrantVectorAdapter(VectorPort):
         payloads: List[Dict[str, Any]],
         collection: str,
     ) -> None:
-        # Verifica que la colección exista y tenga la dimensión adecuada
-        if not self.client.collection_exists(collection):
-            print(f"[qdrant] creating collection '{collection}' size={len(vectors[0])}")
-            self.client.recreate_collection(
-                collection_name=collection,
-                vectors_config=VectorParams(
-                    size=len(vectors[0]),
-                    distance=Distance.COSINE,
-                ),
-            )
+        # Verifica que la colección exista y tenga la dimensión adecuada (sin round-trip si ya es conocida)
+        meta = self._ensure_collection(collection, size=len(vectors[0]))
+        if any(len(v) != meta.size for v in vectors):
+            # la caché pudo quedar vieja: colección recreada o alias movido a otra con otra dimensión
+            _COLLECTIONS.forget(collection)
+            meta = self._ensure_collection(collection, size=len(vectors[0]))
+        for v in vectors:
+            self._check_dim(collection, meta, v)
 
         points = [
             PointStruct(id=ids[i], vector=vectors[i], payload=payloads[i])
             for i in range(len(ids))
         ]
-        print(f"[qdrant] upsert collection='{collection}' n_points={len(points)}")
-        self.client.upsert(collection_name=collection, points=points)
+        logger.debug("upsert collection='%s' n_points=%s", collection, len(points))
+        try:
+            self.client.upsert(collection_name=collection, points=points)
+        except Exception as e:
+            if self._is_not_found(e):
+                # la borraron desde otro proceso: olvidar y recrear
+                _COLLECTIONS.forget(collection)
+                meta = self._ensure_collection(collection, size=len(vectors[0]))
+                for v in vectors:
+                    self._check_dim(collection, meta, v)
+                self.client.upsert(collection_name=collection, points=points)
+            else:
+                raise
 
-    def search(self, vector: List[float], collection: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Busca los puntos más cercanos al vector en la colección indicada."""
-        if not self.client.collection_exists(collection):
-            return []
+    def _ensure_collection(self, collection: str, size: int) -> CollectionMeta:
+        """Metadatos de la colección; la crea si no existe (o si otro proceso la crea a la vez, la usa)."""
+        meta = self.collection_meta(collection)
+        if meta is not None:
+            return meta
+        # La caché negativa es para las búsquedas: antes de escribir se pregunta al servidor,
+        # otro worker pudo crearla hace menos de QDRANT_MISSING_COLLECTION_TTL_SECONDS
+        _COLLECTIONS.forget(collection)
+        meta = self.collection_meta(collection)
+        if meta is not None:
+            return meta
+        try:
+            self.create_collection(collection, size=size)
+            return CollectionMeta(size=size, distance=Distance.COSINE)
+        except Exception as e:
+            if not self._is_already_exists(e):
+                raise
+            logger.info("collection '%s' created concurrently by another worker", collection)
+        _COLLECTIONS.forget(collection)
+        meta = self.collection_meta(collection)
+        if meta is None:
+            raise RuntimeError(f"La colección '{collection}' existe según Qdrant pero no se pudo leer")
+        # quien la creó pudo caerse antes de crear los índices (es idempotente)
+        self.ensure_payload_indexes(collection)
+        return meta
 
-        results = self.client.search(
-            collection_name=collection,
-            query_vector=vector,
-            limit=top_k,
-            with_payload=True,
-            with_vectors=False,
-        )
+    @staticmethod
+    def _build_filter(filters: Optional[Dict[str, Any]]) -> Optional[Filter]:
+        if not filters:
+            return None
+        return Filter(must=[FieldCondition(key=k, match=MatchValue(value=v)) for k, v in filters.items()])
+
+    @staticmethod
+    def _parse_points(results: Any) -> List[Dict[str, Any]]:
         parsed = []
         for p in results:
-            parsed.append({
+            item = {
                 "id": str(getattr(p, "id", "")),
                 "score": float(getattr(p, "score", 0.0)),
                 "payload": getattr(p, "payload", {}) or {},
-            })
-        return parsed
\ No newline at end of file
+            }
+            vector = getattr(p, "vector", None)
+            if vector is not None:
+                item["vector"] = vector
+            parsed.append(item)
+        return parsed
+
+    def search(self, vector: List[float], collection: str, top_k: int = 5, filters: Optional[Dict[str, Any]] = None, with_vectors: bool = False) -> List[Dict[str, Any]]:
+        """Busca los puntos más cercanos al vector en la colección indicada."""
+        # Un segundo intento con metadatos frescos si los de la caché resultan viejos
+        for retry in (False, True):
+            meta = self.collection_meta(collection)
+            if meta is None:
+                return []
+            try:
+                self._check_dim(collection, meta, vector)
+                results = self.client.search(
+                    collection_name=collection,
+                    query_vector=vector,
+                    query_filter=self._build_filter(filters),
+                    search_params=self._search_params(self.profile_for(collection)),
+                    limit=top_k,
+                    with_payload=True,
+                    with_vectors=with_vectors,
+                )
+            except Exception as e:
+                if not retry and self._is_stale(e):
+                    _COLLECTIONS.forget(collection)
+                    continue
+                if self._is_not_found(e):
+                    _COLLECTIONS.remember_missing(collection)
+                    return []
+                raise
+            return self._parse_points(results)
+
+    async def asearch(self, vector: List[float], collection: str, top_k: int = 5, filters: Optional[Dict[str, Any]] = None, with_vectors: bool = False) -> List[Dict[str, Any]]:
+        for retry in (False, True):
+            meta = await self.acollection_meta(collection)
+            if meta is None:
+                return []
+            try:
+                self._check_dim(collection, meta, vector)
+                results = await self.async_client.search(
+                    collection_name=collection,
+                    query_vector=vector,
+                    query_filter=self._build_filter(filters),
+                    search_params=self._search_params(self.profile_for(collection)),
+                    limit=top_k,
+                    with_payload=True,
+                    with_vectors=with_vectors,
+                )
+            except Exception as e:
+                if not retry and self._is_stale(e):
+                    _COLLECTIONS.forget(collection)
+                    continue
+                if self._is_not_found(e):
+                    _COLLECTIONS.remember_missing(collection)
+                    return []
+                raise
+            return self._parse_points(results)
+
+    def scroll(self, collection: str, filters: Optional[Dict[str, Any]] = None, payload_fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        if self.collection_meta(collection) is None:
+            return []
+        points: List[Dict[str, Any]] = []
+        offset = None
+        try:
+            while True:
+                batch, offset = self.client.scroll(
+                    collection_name=collection,
+                    scroll_filter=self._build_filter(filters),
+                    limit=_SCROLL_BATCH,
+                    offset=offset,
+                    with_payload=payload_fields if payload_fields is not None else True,
+                    with_vectors=False,
+                )
+                points.extend({"id": str(p.id), "payload": p.payload or {}} for p in batch)
+                if offset is None:
+                    return points
+        except Exception as e:
+            if self._is_not_found(e):
+                _COLLECTIONS.remember_missing(collection)
+                return []
+            raise
+
+    def delete(self, ids: List[str], collection: str) -> int:
+        if not ids or self.collection_meta(collection) is None:
+            return 0
+        self.client.delete(collection_name=collection, points_selector=PointIdsList(points=list(ids)), wait=True)
+        logger.debug("delete collection='%s' n_points=%s", collection, len(ids))
+        return len(ids)
+
+    def delete_by_filter(self, collection: str, filters: Dict[str, Any]) -> int:
+        if not filters:
+            raise ValueError("delete_by_filter requiere al menos un filtro")
+        if self.collection_meta(collection) is None:
+            return 0
+        flt = self._build_filter(filters)
+        # Qdrant no informa cuántos borró: se cuentan antes (el filtro usa los índices de payload)
+        n = self.client.count(collection_name=collection, count_filter=flt, exact=True).count
+        if n:
+            self.client.delete(collection_name=collection, points_selector=FilterSelector(filter=flt), wait=True)
+        logger.info("deleted collection='%s' filters=%s n_points=%s", collection, filters, n)
+        return n
+
+    async def asearch_batch(
+        self,
+        vectors: List[List[float]],
+        collection: str,
+        top_k: int = 5,
+        filters: Optional[List[Optional[Dict[str, Any]]]] = None,
+        with_vectors: bool = False,
+    ) -> List[List[Dict[str, Any]]]:
+        """Una sola petición search_batch para todos los vectores de la misma colección."""
+        if not vectors:
+            return []
+        per_item = filters or [None] * len(vectors)
+        params = self._search_params(self.profile_for(collection))
+        requests = [
+            SearchRequest(vector=v, filter=self._build_filter(f), params=params, limit=top_k, with_payload=True, with_vector=with_vectors)
+            for v, f in zip(vectors, per_item)
+        ]
+        for retry in (False, True):
+            meta = await self.acollection_meta(collection)
+            if meta is None:
+                return [[] for _ in vectors]
+            try:
+                for v in vectors:
+                    self._check_dim(collection, meta, v)
+                results = await self.async_client.search_batch(collection_name=collection, requests=requests)
+            except Exception as e:
+                if not retry and self._is_stale(e):
+                    _COLLECTIONS.forget(collection)
+                    continue
+                if self._is_not_found(e):
+                    _COLLECTIONS.remember_missing(collection)
+                    return [[] for _ in vectors]
+                raise
+            return [self._parse_points(r) for r in results]
+
+    async def aclose(self) -> None:
+        self.client.close()
+        await self.async_client.close()
@@ -0,0 +1,258 @@
+# app/main/container.py
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+
+from fastapi import Request
+
+from app.application.procces_query_service import ProcessQueryService
+from app.application.process_document_service import ProcessingDocumentService
+from app.application.storage_service import StorageService
+from app.application.semantic_answer_cache import SemanticAnswerCache
+from app.application.context_packer import ContextPacker
+from app.application.conversation_compactor import ConversationCompactor
+from app.application.prompt_cache import PromptCache
+from app.application.reranker import Reranker
+from app.application.ingestion_jobs import IngestionJobService, IngestionWorkerPool
+from app.application import collection_layout, token_counter
+from app.core.domain.ports.chat_memory_port import ChatMemoryPort
+from app.core.domain.ports.chunking_port import ChunkingPort
+from app.core.domain.ports.client_repository_port import ClientRepositoryPort
+from app.core.domain.ports.embedding_port import EmbeddingPort
+from app.core.domain.ports.embedding_store_port import EmbeddingStorePort
+from app.core.domain.ports.ingestion_job_port import IngestionJobPort
+from app.core.domain.ports.storage_port import StoragePort
+from app.core.domain.ports.vector_port import VectorPort
+from app.infrastructure.adapters.llm_adapter import OpenAILLMAdapter
+from app.infrastructure.adapters.openai_embedding_adapter import OpenAIEmbeddingAdapter
+from app.infrastructure.adapters.cached_embedding_adapter import CachedEmbeddingAdapter
+from app.infrastructure.adapters.onnx_embedding_adapter import OnnxEmbeddingAdapter
+from app.infrastructure.adapters.hashing_embedding_adapter import HashingEmbeddingAdapter
+from app.infrastructure.adapters.qdrant_adapter import QdrantVectorAdapter
+from app.infrastructure.adapters.numpy_vector_adapter import NumpyVectorAdapter
+from app.infrastructure.adapters.hybrid_vector_adapter import HybridVectorAdapter
+from app.infrastructure.adapters.postgres_saveinfo_adapter import PostgresSaveInfoClientAdapter
+from app.infrastructure.adapters.minio_storage_adapter import MinioStorageAdapter
+from app.infrastructure.adapters.langchain_chunking_adapter import LangChainChunkingAdapter
+from app.infrastructure.adapters.bounded_chat_memory_adapter import BoundedChatMemoryAdapter
+from app.infrastructure.adapters.postgres_chat_memory_adapter import PostgresChatMemoryAdapter
+from app.infrastructure.adapters.postgres_ingestion_job_adapter import PostgresIngestionJobAdapter
+from app.infrastructure.adapters.inmemory_ingestion_job_adapter import InMemoryIngestionJobAdapter
+from app.infrastructure.adapters.postgres_embedding_store_adapter import PostgresEmbeddingStoreAdapter
+from app.infrastructure.adapters.mmap_embedding_store_adapter import MmapEmbeddingStoreAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class AppContainer:
+    """
+    Construye los adaptadores una sola vez por proceso (lifespan de FastAPI) y los comparte
+    entre requests: clientes HTTP con keep-alive, conexión a Qdrant y pools de Postgres.
+    """
+
+    def __init__(self) -> None:
+        self.llm: Optional[OpenAILLMAdapter] = None
+        self.embedding: Optional[EmbeddingPort] = None
+        self.embedding_cache: Optional[CachedEmbeddingAdapter] = None
+        # Un adaptador por backend configurado (ingesta) y su versión con caché (consultas)
+        self.embedders: Dict[str, EmbeddingPort] = {}
+        self.query_embedders: Dict[str, EmbeddingPort] = {}
+        self.vector: Optional[VectorPort] = None
+        self.repository: Optional[ClientRepositoryPort] = None
+        self.storage: Optional[StoragePort] = None
+        self.chunking: Optional[ChunkingPort] = None
+        self.jobs: Optional[IngestionJobPort] = None
+        self.chunk_embeddings: Optional[EmbeddingStorePort] = None
+
+        self.answer_cache: Optional[SemanticAnswerCache] = None
+        self.chat_memory: Optional[ChatMemoryPort] = None
+        self.prompt_cache: Optional[PromptCache] = None
+        self._prompt_listener: Optional[asyncio.Task] = None
+
+        self.query_service: Optional[ProcessQueryService] = None
+        self.document_service: Optional[ProcessingDocumentService] = None
+        self.storage_service: Optional[StorageService] = None
+        self.ingestion_service: Optional[IngestionJobService] = None
+        self.ingestion_workers: Optional[IngestionWorkerPool] = None
+
+    async def startup(self) -> None:
+        logger.info("building adapters...")
+        self.llm = OpenAILLMAdapter()
+        self._build_embedders()
+        self.vector = self._build_vector_store()
+        # El DDL de _ensure_schema se ejecuta una sola vez aquí, no en cada request
+        self.repository = PostgresSaveInfoClientAdapter(
+            min_size=int(os.getenv("POSTGRES_POOL_MIN", "1")),
+            max_size=int(os.getenv("POSTGRES_POOL_MAX", "5")),
+        )
+        await self.repository.aopen()
+        self.storage = MinioStorageAdapter()
+        self.chunking = LangChainChunkingAdapter()
+        self.chat_memory = self._build_chat_memory()
+        self.jobs = self._build_job_queue()
+        self.chunk_embeddings = self._build_chunk_embedding_store()
+        self._build_services()
+        await self.preload_tokenizers()
+        # Por defecto la API solo encola (app.main.ingestion_worker procesa); en desarrollo se
+        # puede procesar en el mismo proceso con INGEST_INPROCESS_WORKERS=N
+        self.start_ingestion_workers(int(os.getenv("INGEST_INPROCESS_WORKERS", "0")))
+        # Caché de prompts de proceso, invalidada por LISTEN/NOTIFY desde el upsert de `prompts`
+        self._prompt_listener = asyncio.create_task(self.repository.alisten_prompt_changes(self.prompt_cache))
+        logger.info("ready")
+
+    def _build_embedders(self) -> None:
+        # Solo se construyen los backends que usa algún perfil (sin OPENAI_API_KEY se puede correr con onnx/hashing)
+        cache_enabled = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+        for name in collection_layout.configured_embedders():
+            adapter = self._build_embedder(name)
+            self.embedders[name] = adapter
+            # Caché de embeddings de consultas (las preguntas cortas se repiten muchísimo);
+            # el hashing es más barato que la propia caché
+            self.query_embedders[name] = CachedEmbeddingAdapter.from_env(adapter) if cache_enabled and name != "hashing" else adapter
+        default = collection_layout.default_embedder()
+        self.embedding = self.embedders.get(default) or next(iter(self.embedders.values()))
+        query_default = self.query_embedders.get(default) or next(iter(self.query_embedders.values()))
+        if isinstance(query_default, CachedEmbeddingAdapter):
+            self.embedding_cache = query_default
+
+    def _build_services(self) -> None:
+        """Cachés y servicios sobre los adaptadores ya construidos (también lo usa el contenedor de benchmarks)."""
+        # Caché semántica de respuestas: opt-in porque reutiliza respuestas entre usuarios
+        if os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true":
+            self.answer_cache = SemanticAnswerCache.from_env()
+
+        self.prompt_cache = PromptCache(fallback_ttl=float(os.getenv("PROMPT_CACHE_FALLBACK_TTL_SECONDS", "60")))
+
+        # Historial compacto (resumen + turnos recientes) cuando hay memoria de chat
+        compactor = None
+        if self.chat_memory is not None and os.getenv("HISTORY_SUMMARY_ENABLED", "true").lower() == "true":
+            compactor = ConversationCompactor.from_env(self.llm, self.chat_memory, model=self.llm.model)
+
+        # Los servicios también son de vida larga: así la caché de prompts sí obtiene aciertos
+        default = collection_layout.default_embedder()
+        self.query_service = ProcessQueryService(
+            response_llm=self.llm,
+            embedding_port=self.query_embedders.get(default) or next(iter(self.query_embedders.values())),
+            embedding_ports=self.query_embedders,
+            vector_port=self.vector,
+            saveinfo_port=self.repository,
+            prompt_cache=self.prompt_cache,
+            chat_memory=self.chat_memory,
+            answer_cache=self.answer_cache,
+            compactor=compactor,
+            reranker=Reranker.from_env() if os.getenv("RERANK_ENABLED", "true").lower() == "true" else None,
+            context_packer=ContextPacker(
+                token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000")),
+                model=self.llm.model,
+            ),
+        )
+        self.document_service = ProcessingDocumentService(
+            storage_port=self.storage,
+            chunking_port=self.chunking,
+            embeddingPort=self.embedding,
+            embedding_ports=self.embedders,
+            vector_port=self.vector,
+            save_info=self.repository,
+            prompt_cache=self.prompt_cache,
+            embedding_store=self.chunk_embeddings,
+        )
+        self.storage_service = StorageService(self.storage)
+        self.ingestion_service = IngestionJobService(self.jobs, max_attempts=int(os.getenv("INGEST_MAX_ATTEMPTS", "5")))
+
+    async def preload_tokenizers(self) -> None:
+        # Modelo del LLM (presupuesto de contexto e historial) y de cada embedder (lotes de ingesta)
+        models = [self.llm.model] + [getattr(e, "model", None) for e in self.embedders.values()]
+        await asyncio.to_thread(token_counter.preload, *models)
+
+    def start_ingestion_workers(self, concurrency: int) -> None:
+        # 0 = este proceso solo encola (los trabajos los ejecuta app.main.ingestion_worker)
+        if concurrency <= 0:
+            return
+        self.ingestion_workers = IngestionWorkerPool.from_env(self.jobs, self.document_service, concurrency)
+        self.ingestion_service.attach(self.ingestion_workers)
+        self.ingestion_workers.start()
+
+    @staticmethod
+    def _build_job_queue() -> IngestionJobPort:
+        # postgres: durable y compartida entre procesos | memory: solo desarrollo/benchmarks
+        if os.getenv("INGEST_QUEUE_BACKEND", "postgres").strip().lower() == "memory":
+            return InMemoryIngestionJobAdapter()
+        return PostgresIngestionJobAdapter()
+
+    @staticmethod
+    def _build_chunk_embedding_store() -> Optional[EmbeddingStorePort]:
+        # postgres: compartida entre máquinas | mmap: archivos locales (CHUNK_EMBED_CACHE_PATH) | none
+        backend = os.getenv("CHUNK_EMBED_CACHE_BACKEND", "postgres").strip().lower()
+        if backend == "none":
+            return None
+        if backend == "mmap":
+            return MmapEmbeddingStoreAdapter.from_env()
+        return PostgresEmbeddingStoreAdapter.from_env()
+
+    @staticmethod
+    def _build_vector_store() -> VectorPort:
+        # qdrant | local (índice NumPy en disco, sin red) | hybrid (local hasta VECTOR_HYBRID_MAX_LOCAL_POINTS)
+        backend = os.getenv("VECTOR_BACKEND", "qdrant").strip().lower()
+        if backend == "local":
+            return NumpyVectorAdapter.from_env()
+        qdrant = QdrantVectorAdapter(
+            host=os.getenv("QDRANT_HOST", "localhost"),
+            port=int(os.getenv("QDRANT_PORT", "6333")),
+            api_key=os.getenv("QDRANT_API_KEY") or None,
+            profile_resolver=collection_layout.storage_profile,
+        )
+        if backend == "hybrid":
+            return HybridVectorAdapter(
+                local=NumpyVectorAdapter.from_env(),
+                remote=qdrant,
+                max_local_points=int(os.getenv("VECTOR_HYBRID_MAX_LOCAL_POINTS", "5000")),
+            )
+        return qdrant
+
+    @staticmethod
+    def _build_embedder(name: str) -> EmbeddingPort:
+        if name == "onnx":
+            return OnnxEmbeddingAdapter.from_env()
+        if name == "hashing":
+            return HashingEmbeddingAdapter(dimensions=int(os.getenv("HASHING_EMBED_DIMENSIONS", "384")))
+        return OpenAIEmbeddingAdapter(model=os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-large"))
+
+    @staticmethod
+    def _build_chat_memory() -> Optional[ChatMemoryPort]:
+        # memory: buffers acotados en proceso | postgres: persistente con escrituras por lotes | none
+        backend = os.getenv("CHAT_MEMORY_BACKEND", "memory").strip().lower()
+        if backend == "none":
+            return None
+        if backend == "postgres":
+            return PostgresChatMemoryAdapter(
+                batch_size=int(os.getenv("CHAT_MEMORY_BATCH_SIZE", "200")),
+                flush_interval=float(os.getenv("CHAT_MEMORY_FLUSH_SECONDS", "0.2")),
+                max_pending=int(os.getenv("CHAT_MEMORY_MAX_PENDING", "10000")),
+            )
+        return BoundedChatMemoryAdapter.from_env()
+
+    async def shutdown(self) -> None:
+        logger.info("closing adapters...")
+        if self._prompt_listener is not None:
+            self._prompt_listener.cancel()
+            await asyncio.gather(self._prompt_listener, return_exceptions=True)
+        if self.ingestion_workers is not None:
+            await self.ingestion_workers.stop(grace_seconds=float(os.getenv("INGEST_SHUTDOWN_GRACE_SECONDS", "30")))
+        if self.query_service is not None:
+            await self.query_service.drain()
+        adapters = [(f"query_embedder:{k}", v) for k, v in self.query_embedders.items() if v is not self.embedders.get(k)]
+        adapters += [(f"embedder:{k}", v) for k, v in self.embedders.items()]
+        adapters += [(name, getattr(self, name)) for name in ("llm", "vector", "chat_memory", "jobs", "chunk_embeddings", "repository")]
+        for name, adapter in adapters:
+            if adapter is None or not hasattr(adapter, "aclose"):
+                continue
+            try:
+                await adapter.aclose()
+            except Exception as e:
+                logger.warning("close %s failed: %s", name, e)
+        logger.info("closed")
+
+
+def get_container(request: Request) -> AppContainer:
+    return request.app.state.container
@@ -0,0 +1,58 @@
+# app/main/ingestion_worker.py
+"""
+Proceso dedicado de ingesta: reclama trabajos de la cola (ingestion_jobs) y los procesa, fuera del
+proceso de la API para que los PDF grandes no compitan con la latencia del chat.
+
+Uso (desde RAG/):
+    uvicorn app.main.main:app ...     # la API solo encola (INGEST_INPROCESS_WORKERS=0 por defecto)
+    INGEST_WORKER_CONCURRENCY=4 python -m app.main.ingestion_worker
+
+Se pueden lanzar varios procesos (en varias máquinas): SKIP LOCKED reparte los trabajos. SIGTERM/SIGINT
+dejan de reclamar y esperan a los trabajos en curso (INGEST_SHUTDOWN_GRACE_SECONDS).
+"""
+import asyncio
+import logging
+import os
+import signal
+
+from dotenv import load_dotenv
+
+from app.core.logging_config import configure_logging
+from app.main.container import AppContainer
+
+logger = logging.getLogger(__name__)
+
+
+async def run() -> None:
+    # Los workers del contenedor se arrancan aquí, con su propia concurrencia
+    os.environ["INGEST_INPROCESS_WORKERS"] = "0"
+    container = AppContainer()
+    await container.startup()
+    container.start_ingestion_workers(int(os.getenv("INGEST_WORKER_CONCURRENCY", "2")))
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: sin add_signal_handler; Ctrl+C llega como KeyboardInterrupt
+            pass
+    try:
+        await stop.wait()
+    finally:
+        logger.info("stopping ingestion worker...")
+        await container.shutdown()
+
+
+def main() -> None:
+    load_dotenv()
+    configure_logging()
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
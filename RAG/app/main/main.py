@@ -1,18 +1,55 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response
 from app.api.V1.routers.router_document import router as document_router
 from app.api.V1.routers.router_messages import router as messages_router
+from app.main.container import AppContainer
+from app.core import metrics
+from app.core.logging_config import configure_logging
 from dotenv import load_dotenv
 
 
 load_dotenv() 
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Adaptadores y pools viven lo mismo que la aplicación
+    container = AppContainer()
+    app.state.container = container
+    try:
+        await container.startup()
+        yield
+    finally:
+        await container.shutdown()
 
-app = FastAPI(title="AI Workflow Service", debug=True)
+
+app = FastAPI(title="AI Workflow Service", debug=True, lifespan=lifespan)
 
 # Registro de los routers
 app.include_router(document_router)
 app.include_router(messages_router)
 
 @app.get("/health")
-def health():
-    return {"status": "ok"}
+def health(request: Request):
+    container: AppContainer = request.app.state.container
+    caches = {}
+    if container.embedding_cache is not None:
+        caches["query_embeddings"] = container.embedding_cache.stats()
+    if container.answer_cache is not None:
+        caches["answers"] = container.answer_cache.stats()
+    if container.query_service is not None:
+        caches.update(container.query_service.stats())
+    if hasattr(container.vector, "stats"):
+        caches["local_vectors"] = container.vector.stats()
+    if container.ingestion_workers is not None:
+        caches["ingestion_workers"] = container.ingestion_workers.stats()
+    return {"status": "ok", "caches": caches}
+
 
+@app.get("/metrics")
+def prometheus_metrics():
+    # Histogramas por etapa y contadores (formato de exposición de Prometheus)
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type, status_code=200 if metrics.ENABLED else 503)
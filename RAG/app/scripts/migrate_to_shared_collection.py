@@ -0,0 +1,126 @@
+# app/scripts/migrate_to_shared_collection.py
+"""
+Copia las colecciones por cliente (`client_{id}`) a la colección compartida multi-tenant.
+
+Uso (desde RAG/):
+    python -m app.scripts.migrate_to_shared_collection [--target rag_chunks] [--batch 256] [--drop-source] [--dry-run]
+
+Es idempotente: los ids de los puntos se conservan, así que volver a ejecutarlo sobrescribe
+en lugar de duplicar. Después de migrar, arrancar el servicio con QDRANT_STORAGE_MODE=shared.
+"""
+import argparse
+import os
+from typing import List, Optional, Union
+
+from dotenv import load_dotenv
+from qdrant_client.models import PointStruct
+
+from app.application.collection_layout import shared_collection_name, storage_profile
+from app.infrastructure.adapters.qdrant_adapter import QdrantVectorAdapter
+
+LEGACY_PREFIX = "client_"
+
+PointId = Union[int, str]
+
+
+def migrate_collection(adapter: QdrantVectorAdapter, source: str, target: str, batch: int, dry_run: bool) -> List[PointId]:
+    """Copia `source` a `target` y devuelve los ids copiados."""
+    client_id_from_name = source[len(LEGACY_PREFIX):]
+    moved: List[PointId] = []
+    offset = None
+    while True:
+        records, offset = adapter.client.scroll(
+            collection_name=source,
+            limit=batch,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if not records:
+            break
+        points = []
+        for r in records:
+            payload = dict(r.payload or {})
+            # Los puntos viejos siempre llevan client_id, pero por si acaso se deriva del nombre
+            payload.setdefault("client_id", client_id_from_name)
+            payload.setdefault("agent_id", "")
+            payload.setdefault("doc_id", payload.get("source", ""))
+            points.append(PointStruct(id=r.id, vector=r.vector, payload=payload))
+        if not dry_run:
+            adapter.client.upsert(collection_name=target, points=points, wait=True)
+        moved.extend(p.id for p in points)
+        if offset is None:
+            break
+    return moved
+
+
+def missing_in_target(adapter: QdrantVectorAdapter, target: str, ids: List[PointId], batch: int) -> int:
+    """Cuántos de `ids` no están en `target` (se consultan por id, en lotes)."""
+    missing = 0
+    for i in range(0, len(ids), batch):
+        chunk = ids[i:i + batch]
+        found = adapter.client.retrieve(collection_name=target, ids=chunk, with_payload=False, with_vectors=False)
+        missing += len({str(x) for x in chunk} - {str(r.id) for r in found})
+    return missing
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Migrar colecciones client_* a la colección compartida")
+    parser.add_argument("--target", default=shared_collection_name())
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--drop-source", action="store_true", help="Eliminar cada colección origen tras copiarla")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    adapter = QdrantVectorAdapter(
+        host=os.getenv("QDRANT_HOST", "localhost"),
+        port=int(os.getenv("QDRANT_PORT", "6333")),
+        api_key=os.getenv("QDRANT_API_KEY") or None,
+        profile_resolver=storage_profile,
+    )
+    sources = sorted(
+        c.name for c in adapter.client.get_collections().collections
+        if c.name.startswith(LEGACY_PREFIX) and c.name != args.target
+    )
+    print(f"[migrate] {len(sources)} colecciones origen -> '{args.target}'")
+
+    target_size: Optional[int] = None
+    target_meta = adapter.collection_meta(args.target)
+    if target_meta is not None:
+        target_size = target_meta.size
+        adapter.ensure_payload_indexes(args.target)
+
+    total = 0
+    for source in sources:
+        size = adapter.collection_meta(source).size
+        if target_size is None:
+            if not args.dry_run:
+                adapter.create_collection(args.target, size=size)
+            target_size = size
+        if size != target_size:
+            print(f"[migrate][skip] {source}: dim={size} != dim destino={target_size}")
+            continue
+
+        moved = migrate_collection(adapter, source, args.target, args.batch, args.dry_run)
+        total += len(moved)
+        print(f"[migrate] {source}: {len(moved)} puntos")
+
+        if args.drop_source and not args.dry_run:
+            # Solo se borra si cada id copiado está en el destino (un conteo por client_id también
+            # incluye puntos que ya estaban allí) y el origen no recibió puntos durante la copia
+            missing = missing_in_target(adapter, args.target, moved, args.batch)
+            current = adapter.client.count(collection_name=source, exact=True).count
+            if missing == 0 and current == len(moved):
+                adapter.drop_collection(source)
+                print(f"[migrate] {source}: eliminada")
+            elif missing:
+                print(f"[migrate][warn] {source}: faltan {missing} de {len(moved)} puntos en el destino, no se elimina")
+            else:
+                print(f"[migrate][warn] {source}: tiene {current} puntos y se copiaron {len(moved)}, no se elimina")
+
+    print(f"[migrate] listo: {total} puntos {'(dry-run)' if args.dry_run else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# app/scripts/rebuild_collection.py
+"""
+Reconstruye una colección existente con otro perfil de almacenamiento (ver collection_layout).
+
+Uso (desde RAG/):
+    python -m app.scripts.rebuild_collection --collection rag_chunks --profile compact[:512] [--batch 256] [--force] [--dry-run]
+
+- Misma dimensión (solo cambia cuantización / on_disk): se actualiza la colección en sitio.
+- Menos dimensiones: los vectores se recortan y renormalizan (válido para text-embedding-3-*,
+  equivale a pedirlos con `dimensions`; con onnx/hashing hay que re-indexar) en una colección nueva
+  `<colección>__v<fecha>`, y el nombre pasa a ser un alias de Qdrant que apunta a ella. El cambio de
+  alias es atómico: las búsquedas ven la colección vieja o la nueva, nunca una vacía. La primera vez
+  el nombre es una colección y no un alias: se borra justo antes de crear el alias (un instante sin
+  colección en lugar de toda la copia).
+- Más dimensiones no se puede derivar de lo guardado: hay que volver a indexar los documentos.
+
+Lo que se escriba en la colección durante la copia no llegaría a la nueva: el script no corre con
+trabajos de ingesta en cola o en curso para esa colección (--force lo omite) y, antes de cambiar el
+alias, comprueba que la colección sigue teniendo los mismos puntos.
+
+Después, configurar el mismo perfil para la colección (QDRANT_COLLECTION_PROFILES) en el
+servicio para que las consultas se embeban con las nuevas dimensiones.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+from qdrant_client.models import PointStruct
+
+from app.application.collection_layout import (
+    MATRYOSHKA_EMBEDDERS,
+    fit_vector,
+    legacy_collection_name,
+    parse_profile,
+    shared_collection_name,
+    storage_profile,
+)
+from app.infrastructure.adapters.postgres_ingestion_job_adapter import PostgresIngestionJobAdapter
+from app.infrastructure.adapters.qdrant_adapter import QdrantVectorAdapter
+
+LEGACY_PREFIX = legacy_collection_name("")
+
+
+def copy_points(
+    adapter: QdrantVectorAdapter, source: str, target: str, batch: int, dimensions: Optional[int], embedder: str
+) -> int:
+    copied = 0
+    offset = None
+    while True:
+        records, offset = adapter.client.scroll(
+            collection_name=source,
+            limit=batch,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if not records:
+            break
+        points = [
+            PointStruct(id=r.id, vector=fit_vector(list(r.vector), dimensions, embedder), payload=r.payload or {})
+            for r in records
+        ]
+        adapter.client.upsert(collection_name=target, points=points, wait=True)
+        copied += len(points)
+        if offset is None:
+            break
+    return copied
+
+
+def count(adapter: QdrantVectorAdapter, collection: str) -> int:
+    return adapter.client.count(collection_name=collection, exact=True).count
+
+
+def active_jobs(collection: str) -> Optional[int]:
+    """Trabajos de ingesta en cola o en curso que pueden escribir en `collection` (None si no se puede saber)."""
+    if os.getenv("INGEST_QUEUE_BACKEND", "postgres").strip().lower() == "memory":
+        return None
+    # client_<id> solo recibe los trabajos de ese cliente; la compartida (u otra) los de cualquiera
+    client_id = None
+    if collection != shared_collection_name() and collection.startswith(LEGACY_PREFIX):
+        client_id = collection[len(LEGACY_PREFIX):]
+    try:
+        jobs = PostgresIngestionJobAdapter(min_size=1, max_size=1)
+        try:
+            return jobs.count_active(client_id)
+        finally:
+            asyncio.run(jobs.aclose())
+    except Exception as e:
+        print(f"[rebuild][warn] no se pudo consultar la cola de ingesta: {e}")
+        return None
+
+
+def check_quiet(collection: str, force: bool) -> None:
+    active = active_jobs(collection)
+    if active == 0 or force:
+        return
+    if active is None:
+        sys.exit("[rebuild] no se puede comprobar la cola de ingesta; detener la ingesta y usar --force")
+    sys.exit(f"[rebuild] hay {active} trabajos de ingesta en cola o en curso para '{collection}'; reintentar cuando terminen")
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Reconstruir una colección con otro perfil de almacenamiento")
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--profile", required=True, help="full | compact | binary, opcionalmente con ':dims' y '@backend'")
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--force", action="store_true", help="No comprobar la cola de ingesta")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    profile = parse_profile(args.profile)
+    adapter = QdrantVectorAdapter(
+        host=os.getenv("QDRANT_HOST", "localhost"),
+        port=int(os.getenv("QDRANT_PORT", "6333")),
+        api_key=os.getenv("QDRANT_API_KEY") or None,
+        profile_resolver=storage_profile,
+    )
+    meta = adapter.collection_meta(args.collection)
+    if meta is None:
+        sys.exit(f"[rebuild] la colección '{args.collection}' no existe")
+
+    current = adapter.alias_target(args.collection)
+    size = profile.dimensions or meta.size
+    total = count(adapter, args.collection)
+    print(
+        f"[rebuild] '{args.collection}'{f' (alias de {current!r})' if current else ''}: {total} puntos, "
+        f"dim {meta.size} -> {size}, perfil={profile.name}@{profile.embedder}"
+    )
+    if size > meta.size:
+        sys.exit(f"[rebuild] no se puede pasar de {meta.size} a {size} dimensiones: hay que re-indexar los documentos")
+    if size < meta.size and profile.embedder not in MATRYOSHKA_EMBEDDERS:
+        sys.exit(f"[rebuild] los vectores de '{profile.embedder}' no se pueden recortar: hay que re-indexar los documentos")
+    if args.dry_run:
+        return
+
+    if size == meta.size:
+        adapter.apply_profile(current or args.collection, profile)
+        print("[rebuild] listo (actualizada en sitio)")
+        return
+
+    check_quiet(args.collection, args.force)
+    target = f"{args.collection}__v{time.strftime('%Y%m%d%H%M%S')}"
+    adapter.create_collection(target, size=size, profile=profile)
+    copied = copy_points(adapter, args.collection, target, args.batch, size, profile.embedder)
+    if count(adapter, target) < total:
+        adapter.drop_collection(target)
+        sys.exit(f"[rebuild] copia incompleta ({copied}/{total}); la original no se toca")
+    print(f"[rebuild] {copied} puntos en '{target}'")
+
+    # Lo escrito en la original durante la copia se perdería al cambiar el alias
+    check_quiet(args.collection, args.force)
+    if count(adapter, args.collection) != total:
+        adapter.drop_collection(target)
+        sys.exit(f"[rebuild] '{args.collection}' cambió durante la copia; la original no se toca, volver a ejecutar")
+
+    if current is None:
+        # Un nombre no puede ser colección y alias a la vez: la primera vez hay un instante sin colección
+        adapter.drop_collection(args.collection)
+        try:
+            adapter.point_alias(args.collection, target)
+        except Exception as e:
+            sys.exit(f"[rebuild] no se pudo crear el alias '{args.collection}': {e}; los puntos están en '{target}'")
+    else:
+        adapter.point_alias(args.collection, target)
+        adapter.drop_collection(current)
+    print(f"[rebuild] listo: '{args.collection}' -> '{target}' ({copied} puntos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Raíz de los tests del servicio RAG: pytest añade este directorio a sys.path para importar `app`.
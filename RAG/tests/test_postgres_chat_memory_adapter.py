@@ -0,0 +1,227 @@
+import threading
+import time
+
+import psycopg
+import pytest
+
+from app.infrastructure.adapters import postgres_chat_memory_adapter as module
+
+
+class _NullPool:
+    def __init__(self, *args, **kwargs) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class _FakeTableAdapter(module.PostgresChatMemoryAdapter):
+    """Sustituye la tabla chat_messages por una lista; el INSERT confirma antes de volver."""
+
+    def __init__(self, write_delay: float = 0.0, table=None, **kwargs) -> None:
+        self.table = list(table or [])
+        self.write_delay = write_delay
+        self.written = threading.Event()
+        self.inflight_at_delete = []
+        self.rows_read = []
+        self.summaries = {}
+        super().__init__(dsn="postgresql://unused", **kwargs)
+
+    def _ensure_schema(self) -> None:
+        pass
+
+    def _max_id(self):
+        return max((r[0] for r in self.table), default=0)
+
+    def _write(self, batch):
+        ids = []
+        for session_id, role, content in batch:
+            if content == "poison":
+                raise psycopg.DataError("invalid byte sequence")
+        for session_id, role, content in batch:
+            self.table.append((self._max_id() + 1, session_id, role, content))
+            ids.append(self._max_id())
+        self.written.set()
+        # ya confirmado en la base pero todavía en vuelo para el adaptador
+        time.sleep(self.write_delay)
+        return ids
+
+    def _session(self, session_id):
+        return [r for r in self.table if r[1] == session_id]
+
+    def _select_recent(self, session_id, flushed_id, limit, cap):
+        rows = self._session(session_id)
+        newer = [r for r in rows if r[0] > flushed_id][::-1][:cap]
+        older = [r for r in rows if r[0] <= flushed_id][::-1][:limit]
+        self.rows_read.append(len(newer) + len(older))
+        return [(i, role, content) for i, _, role, content in newer + older]
+
+    def _select_history(self, session_id, flushed_id, limit, cap):
+        summary, covered = self.summaries.get(session_id, (None, 0))
+        rows = self._select_recent(session_id, flushed_id, limit, cap)
+        return summary, covered, len(self._session(session_id)), rows
+
+    def _select_count(self, session_id, flushed_id, cap):
+        rows = self._session(session_id)
+        return len(rows), [r[0] for r in rows if r[0] > flushed_id][::-1][:cap]
+
+    def _select_range(self, session_id, flushed_id, start, rows, cap):
+        session = self._session(session_id)
+        window = session[start:] if rows is None else session[start:start + rows]
+        self.rows_read.append(len(window))
+        _, newer = self._select_count(session_id, flushed_id, cap)
+        return len(session), newer, [(i, role, content) for i, _, role, content in window]
+
+    def _delete_session(self, session_id):
+        self.inflight_at_delete.append(len(self._inflight))
+        self.table = [r for r in self.table if r[1] != session_id]
+
+
+@pytest.fixture
+def make_adapter(monkeypatch):
+    monkeypatch.setattr(module, "ConnectionPool", _NullPool)
+    adapters = []
+
+    def make(**kwargs):
+        adapter = _FakeTableAdapter(**kwargs)
+        adapters.append(adapter)
+        return adapter
+
+    yield make
+    for adapter in adapters:
+        adapter.close()
+
+
+def test_reads_during_slow_write_do_not_duplicate(make_adapter):
+    memory = make_adapter(write_delay=0.3, flush_interval=0.01)
+    for i in range(5):
+        memory.append("s1", "user", f"m{i}")
+    assert memory.written.wait(timeout=2.0)
+
+    # el lote está en la tabla y sigue en vuelo
+    assert memory.count("s1") == 5
+    assert [m["content"] for m in memory.get_recent("s1", limit=10)] == [f"m{i}" for i in range(5)]
+
+    memory.flush()
+    assert memory.count("s1") == 5
+    assert [m["content"] for m in memory.get_recent("s1", limit=3)] == ["m2", "m3", "m4"]
+
+
+def test_range_during_slow_write_counts_each_message_once(make_adapter):
+    memory = make_adapter(write_delay=0.3, flush_interval=0.01)
+    for i in range(3):
+        memory.append("s1", "user", f"m{i}")
+    memory.flush()
+    memory.written.clear()
+    for i in range(3, 6):
+        memory.append("s1", "user", f"m{i}")
+    assert memory.written.wait(timeout=2.0)
+
+    msgs, total = memory.get_range("s1", 2)
+    assert total == 6
+    assert [m["content"] for m in msgs] == ["m2", "m3", "m4", "m5"]
+    msgs, total = memory.get_range("s1", 1, 4)
+    assert [m["content"] for m in msgs] == ["m1", "m2", "m3"]
+
+
+def test_poison_row_is_dropped_and_the_rest_is_written(make_adapter):
+    memory = make_adapter(flush_interval=0.01)
+    for content in ("a", "b", "poison", "c"):
+        memory.append("s1", "user", content)
+    memory.flush()
+
+    assert [r[3] for r in memory.table] == ["a", "b", "c"]
+    assert memory.count("s1") == 3
+
+
+def test_pending_queue_is_bounded(make_adapter):
+    memory = make_adapter(batch_size=2, max_pending=4)
+    # sin escritor: los mensajes se quedan en la cola
+    with memory._cond:
+        for i in range(6):
+            memory.append("s1", "user", f"m{i}")
+        assert [row[2] for row in memory._pending] == ["m2", "m3", "m4", "m5"]
+
+
+def test_clear_waits_for_inflight_batch(make_adapter):
+    memory = make_adapter(write_delay=0.3, flush_interval=0.01)
+    memory.append("s1", "user", "old")
+    assert memory.written.wait(timeout=2.0)
+
+    memory.clear("s1")
+
+    assert memory.inflight_at_delete == [0]
+    memory.flush()
+    assert memory.count("s1") == 0
+    assert memory.table == []
+
+
+def _history(session_id, n, first_id=1):
+    return [(first_id + i, session_id, "user", f"h{i}") for i in range(n)]
+
+
+def test_fresh_adapter_reads_a_long_session_without_loading_it(make_adapter):
+    memory = make_adapter(table=_history("s1", 5000))
+
+    assert memory._flushed_id == 5000
+    assert [m["content"] for m in memory.get_recent("s1", limit=3)] == ["h4997", "h4998", "h4999"]
+    assert memory.count("s1") == 5000
+    msgs, total = memory.get_range("s1", 4990, 4993)
+    assert total == 5000
+    assert [m["content"] for m in msgs] == ["h4990", "h4991", "h4992"]
+    assert max(memory.rows_read) <= 3 + module._LATE_MARGIN
+
+
+def test_rows_from_other_processes_are_read_with_a_bounded_query(make_adapter):
+    memory = make_adapter()
+    # otro worker escribió la sesión después del arranque: todo queda por encima de flushed_id
+    memory.table = _history("s1", 1000)
+    memory.append("s1", "user", "mine")
+
+    assert [m["content"] for m in memory.get_recent("s1", limit=2)] == ["h999", "mine"]
+    assert memory.count("s1") == 1001
+    msgs, total = memory.get_range("s1", 998, 1001)
+    assert total == 1001
+    assert [m["content"] for m in msgs] == ["h998", "h999", "mine"]
+    assert max(memory.rows_read) <= 2 + 1 + module._LATE_MARGIN
+
+
+@pytest.mark.parametrize("read", ["count", "get_recent", "get_range"])
+def test_late_rows_beyond_the_margin_are_still_excluded(make_adapter, read):
+    memory = make_adapter(flush_interval=0.01, batch_size=100, table=_history("s1", 10))
+    late = 3 * module._LATE_MARGIN
+    snapshot = memory._snapshot
+
+    def snapshot_then_write(session_id):
+        # entre la copia y el SELECT se confirman más mensajes de los que cubre el margen
+        taken = snapshot(session_id)
+        if len(memory.table) == 10:
+            for i in range(late):
+                memory.append(session_id, "user", f"m{i}")
+            memory.flush()
+        return taken
+
+    memory._snapshot = snapshot_then_write
+    # la lectura que no puede descartar todo lo tardío se repite con una copia nueva
+    if read == "count":
+        assert memory.count("s1") == 10 + late
+    elif read == "get_recent":
+        assert [m["content"] for m in memory.get_recent("s1", limit=2)] == [f"m{late - 2}", f"m{late - 1}"]
+    else:
+        msgs, total = memory.get_range("s1", 8)
+        assert total == 10 + late
+        assert [m["content"] for m in msgs] == ["h8", "h9"] + [f"m{i}" for i in range(late)]
+
+
+def test_history_reads_summary_and_uncovered_messages_together(make_adapter):
+    memory = make_adapter(write_delay=0.3, flush_interval=0.01, table=_history("s1", 1000))
+    memory.summaries["s1"] = ("resumen", 998)
+    memory.append("s1", "user", "nuevo")
+    assert memory.written.wait(timeout=2.0)
+
+    # el mensaje en vuelo ya está en la tabla: cuenta una sola vez
+    summary, recent = memory.get_history("s1", limit=10)
+    assert summary == "resumen"
+    assert [m["content"] for m in recent] == ["h998", "h999", "nuevo"]
+    assert memory.get_history("s1", limit=2)[1] == [{"role": "user", "content": "h999"}, {"role": "user", "content": "nuevo"}]
+    assert max(memory.rows_read) <= 10 + 1 + module._LATE_MARGIN